@@ -0,0 +1 @@
+"""KSPなしで偽のkRPCクライアントを使ってテレメトリ処理を計測するベンチマーク"""
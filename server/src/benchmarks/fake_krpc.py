@@ -0,0 +1,312 @@
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.settings.config import ROCKET_SCHEMAS
+from src.utils.krpc_module.async_krpc_client import AsyncKrpcClient
+
+
+class FakeServer:
+    """偽のkRPCサーバーの通信回数とレイテンシを管理するクラス
+
+    RPCの往復(round_trips)ごとにlatency秒スリープし、1往復に含まれた呼び出し数(calls)も数える。
+    """
+
+    def __init__(self: "FakeServer", latency: float = 0.0) -> None:
+        """Initialize the FakeServer class.
+
+        Args:
+            latency (float): 1往復あたりのレイテンシ（秒）
+        """
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.calls = 0
+        self.started_at = time.monotonic()
+
+    def rpc(self: "FakeServer", calls: int = 1) -> None:
+        """1往復分の通信を記録し、レイテンシ分待機する"""
+        with self._lock:
+            self.round_trips += 1
+            self.calls += calls
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset(self: "FakeServer") -> None:
+        """カウンターをリセットする"""
+        with self._lock:
+            self.round_trips = 0
+            self.calls = 0
+
+    def elapsed(self: "FakeServer") -> float:
+        """サーバー起動からの経過時間（秒）。値が時間とともに変化するフィールドに使う"""
+        return time.monotonic() - self.started_at
+
+
+class Varying:
+    """読み込むたびに関数を評価して値を返すフィールド"""
+
+    def __init__(self: "Varying", function: Callable[[], Any]) -> None:
+        """Initialize the Varying class."""
+        self.function = function
+
+
+class FakeMethod:
+    """呼び出しごとに1往復のRPCが発生するリモートメソッド"""
+
+    def __init__(self: "FakeMethod", server: FakeServer, function: Callable[..., Any]) -> None:
+        """Initialize the FakeMethod class."""
+        self.server = server
+        self.function = function
+
+    def __call__(self: "FakeMethod", *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        """メソッドを呼び出す"""
+        self.server.rpc()
+        return self.function(*args, **kwargs)
+
+    def invoke(self: "FakeMethod", *args: Any) -> Any:  # noqa: ANN401
+        """RPCを記録せずに呼び出す（バッチリクエスト・ストリームから使う）"""
+        return self.function(*args)
+
+
+class RemoteObject:
+    """プロパティを読むたびに1往復のRPCが発生するリモートオブジェクト
+
+    kRPCのクラスと同様に、存在しない属性はAttributeErrorになる。
+    """
+
+    def __init__(self: "RemoteObject", server: FakeServer, **fields: Any) -> None:  # noqa: ANN401
+        """Initialize the RemoteObject class."""
+        object.__setattr__(self, "_server", server)
+        object.__setattr__(self, "_fields", fields)
+
+    def __getattr__(self: "RemoteObject", name: str) -> Any:  # noqa: ANN401
+        """プロパティを読み込む"""
+        fields = object.__getattribute__(self, "_fields")
+        if name not in fields:
+            raise AttributeError(name)
+        value = fields[name]
+        if isinstance(value, FakeMethod):
+            return value
+        object.__getattribute__(self, "_server").rpc()
+        return self.peek(name)
+
+    def peek(self: "RemoteObject", name: str) -> Any:  # noqa: ANN401
+        """RPCを記録せずにプロパティを読み込む（バッチリクエスト・ストリームから使う）"""
+        fields = object.__getattribute__(self, "_fields")
+        if name not in fields:
+            raise AttributeError(name)
+        value = fields[name]
+        return value.function() if isinstance(value, Varying) else value
+
+
+class FakeStream:
+    """add_streamが返すストリーム。最新値はクライアント側にキャッシュされているためRPCは発生しない"""
+
+    def __init__(self: "FakeStream", read: Callable[[], Any]) -> None:
+        """Initialize the FakeStream class."""
+        self._read = read
+        self.rate = 0.0
+
+    def __call__(self: "FakeStream") -> Any:  # noqa: ANN401
+        """最新値を返す"""
+        return self._read()
+
+    def remove(self: "FakeStream") -> None:
+        """ストリームを削除する"""
+
+
+class FakeClient:
+    """krpc.connectが返すクライアントの代わりになる偽のクライアント"""
+
+    def __init__(self: "FakeClient", server: FakeServer, vessel: RemoteObject) -> None:
+        """Initialize the FakeClient class."""
+        self.server = server
+        self.space_center = RemoteObject(server, active_vessel=vessel)
+        self.mech_jeb = RemoteObject(server)
+        self.krpc = RemoteObject(server, current_game_scene="flight")
+
+    def add_stream(self: "FakeClient", function: Callable[..., Any], *args: Any) -> FakeStream:  # noqa: ANN401
+        """ストリームを登録する（登録時に1往復のRPCが発生する）"""
+        self.server.rpc()
+        if function is getattr:
+            obj, attribute = args
+            obj.peek(attribute)  # 存在しない属性はkRPCと同様に登録時にエラーにする
+            return FakeStream(lambda: obj.peek(attribute))
+        return FakeStream(lambda: function.invoke(*args))
+
+    def close(self: "FakeClient") -> None:
+        """接続を閉じる"""
+
+
+class FakeKrpcClient:
+    """KrpcClientの代わりに偽のクライアントを保持するクラス
+
+    batch_readはKrpcClient.batch_readと同様に、全ての呼び出しを1往復で実行したものとして記録する。
+    """
+
+    def __init__(self: "FakeKrpcClient", latency: float = 0.0, extra_parts: int = 0) -> None:
+        """Initialize the FakeKrpcClient class.
+
+        Args:
+            latency (float): 1往復あたりのレイテンシ（秒）
+            extra_parts (int): スキーマのタグを持たないパーツの数（大きな機体の再現用）
+        """
+        self.connection_name = "FakeKrpcConnection"
+        self.server = FakeServer(latency)
+        self.vessel = build_vessel(self.server, extra_parts)
+        self.client = FakeClient(self.server, self.vessel)
+        self.is_connected = True
+        # 偽の接続は再接続しないため世代番号は変わらない
+        self.generation = 1
+        self.game_scene = "flight"
+        self.io = AsyncKrpcClient(self)
+
+    @property
+    def connection_status(self: "FakeKrpcClient") -> bool:
+        """接続状態を返すプロパティ"""
+        return self.is_connected
+
+    def execute_with_reconnect(self: "FakeKrpcClient", function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        """指定された関数を実行する"""
+        return function(*args, **kwargs)
+
+    def batch_read(self: "FakeKrpcClient", reads: dict[str, tuple[Any, ...]]) -> dict[str, Any]:
+        """複数の読み取りを1往復で実行する"""
+        results: dict[str, Any] = dict.fromkeys(reads)
+        calls = 0
+        for key, (function, *args) in reads.items():
+            if function is getattr:
+                obj, attribute = args
+                if obj is None:
+                    continue
+                try:
+                    results[key] = obj.peek(attribute)
+                except AttributeError:
+                    continue
+            else:
+                results[key] = function.invoke(*args)
+            calls += 1
+        if calls:
+            self.server.rpc(calls)
+        return results
+
+
+def build_part(server: FakeServer, config: dict) -> RemoteObject:
+    """ロケットスキーマの設定から偽のパーツを作成する"""
+    part_type = config["part_type"]
+    modules: dict[str, Any] = {"antenna": None, "solar_panel": None, "reaction_wheel": None, "engine": None}
+
+    if part_type == "antenna":
+        modules["antenna"] = RemoteObject(server, power=500.0, packet_interval=0.35, packet_size=2.0, packet_resource_cost=24.0)
+    elif part_type == "solar_panel":
+        modules["solar_panel"] = RemoteObject(server, deployed=False, energy_flow=0.0, sun_exposure=0.87)
+    elif part_type == "reaction_wheel":
+        modules["reaction_wheel"] = RemoteObject(server, active=True, available_torque=((5.0, 5.0, 5.0), (5.0, 5.0, 5.0)), max_torque=5.0)
+    elif part_type == "engine":
+        propellants = [
+            RemoteObject(server, name=name, total_resource_available=Varying(lambda: max(0.0, 8000.0 - 10 * server.elapsed())))
+            for name in ("LqdOxygen", "Kerosene")
+        ]
+        modules["engine"] = RemoteObject(
+            server,
+            active=True,
+            thrust=Varying(lambda: 900_000.0 + 1000 * math.sin(server.elapsed())),
+            available_thrust=936_000.0,
+            max_thrust=936_000.0,
+            max_vacuum_thrust=1_000_000.0,
+            thrust_limit=1.0,
+            isp=295.0,
+            vacuum_specific_impulse=320.0,
+            propellant_names=["LqdOxygen", "Kerosene"],
+            propellant_ratios={"LqdOxygen": 1.1, "Kerosene": 0.9},
+            throttle=1.0,
+            propellants=propellants,
+            specific_impulse_at=FakeMethod(server, lambda pressure: 320.0 - 25.0 * pressure),
+        )
+
+    resources = [
+        RemoteObject(server, name=name, amount=Varying(lambda: max(0.0, 4000.0 - 5 * server.elapsed())), max=4000.0)
+        for name in (("LqdOxygen", "Kerosene") if part_type == "tank" else ("ElectricCharge",))
+    ]
+    return RemoteObject(
+        server,
+        tag=config["tag"],
+        name=config["unit_name"],
+        temperature=Varying(lambda: 300.0 + server.elapsed() % 100),
+        max_temperature=2000.0,
+        dynamic_pressure=Varying(lambda: 1000.0 * server.elapsed() % 30_000),
+        shielded=part_type == "satellite_bus",
+        resources=RemoteObject(
+            server,
+            all=resources,
+            amount=FakeMethod(server, lambda _: 150.0),
+            max=FakeMethod(server, lambda _: 200.0),
+        ),
+        **modules,
+    )
+
+
+def build_vessel(server: FakeServer, extra_parts: int = 0) -> RemoteObject:
+    """ロケットスキーマの全ユニットを持つ偽の機体を作成する"""
+    parts_by_tag = {config["tag"]: build_part(server, config) for config in ROCKET_SCHEMAS}
+    untagged_parts = [build_part(server, {"tag": "", "unit_name": f"part_{i}", "part_type": ""}) for i in range(extra_parts)]
+    all_parts = list(parts_by_tag.values()) + untagged_parts
+
+    def altitude() -> float:
+        return 100.0 * server.elapsed() ** 2
+
+    flight = RemoteObject(
+        server,
+        mean_altitude=Varying(altitude),
+        surface_altitude=Varying(altitude),
+        pitch=Varying(lambda: max(0.0, 90.0 - server.elapsed())),
+        heading=90.0,
+        roll=0.0,
+        speed=Varying(lambda: 200.0 * server.elapsed()),
+        vertical_speed=Varying(lambda: 150.0 * server.elapsed()),
+        horizontal_speed=Varying(lambda: 50.0 * server.elapsed()),
+        latitude=-0.0972,
+        longitude=Varying(lambda: -74.5577 + 0.001 * server.elapsed()),
+        prograde=(0.0, 1.0, 0.0),
+        angle_of_attack=1.5,
+        sideslip_angle=0.2,
+        mach=Varying(lambda: 0.6 * server.elapsed()),
+        dynamic_pressure=Varying(lambda: 20_000.0 + 100 * math.sin(server.elapsed())),
+        atmosphere_density=1.2,
+        static_pressure=Varying(lambda: max(0.0, 101_325.0 - 500 * server.elapsed())),
+        terminal_velocity=300.0,
+        drag_coefficient=0.3,
+    )
+    orbit = RemoteObject(
+        server,
+        body=RemoteObject(server, reference_frame=RemoteObject(server)),
+        speed=Varying(lambda: 2000.0 + 10 * server.elapsed()),
+        apoapsis_altitude=Varying(lambda: 1000.0 * server.elapsed()),
+        periapsis_altitude=-500_000.0,
+        period=1800.0,
+        time_to_apoapsis=60.0,
+        time_to_periapsis=900.0,
+        semi_major_axis=700_000.0,
+        inclination=0.1,
+        eccentricity=0.5,
+        longitude_of_ascending_node=0.0,
+        argument_of_periapsis=0.0,
+    )
+    return RemoteObject(
+        server,
+        orbit=orbit,
+        flight=FakeMethod(server, lambda _: flight),
+        parts=RemoteObject(
+            server,
+            all=all_parts,
+            with_tag=FakeMethod(server, lambda tag: [parts_by_tag[tag]] if tag in parts_by_tag else []),
+        ),
+        control=RemoteObject(server, current_stage=5, activate_next_stage=FakeMethod(server, list)),
+        comms=RemoteObject(server, can_communicate=True, can_transmit_science=True, signal_strength=0.9, signal_delay=0.0, power=500.0),
+        mass=Varying(lambda: max(10_000.0, 50_000.0 - 100 * server.elapsed())),
+        biome="Shores",
+        situation="VesselSituation.flying",
+    )
@@ -0,0 +1,203 @@
+"""テレメトリ処理のホットパスのベンチマーク
+
+KSPなしで偽のkRPCクライアントを使い、以下を計測する。
+    - get_rocket_status / get_vessel_telemetry / get_telemetry の RPC往復数・呼び出し数・レイテンシ(p50/p99)
+      （全セクションを計算する場合と、購読されたセクション・グループだけを計算する場合）
+    - WebSocketのファンアウト（1〜100クライアント）の配信レイテンシ(p50/p99)と1フレームあたりのバイト数
+      （ロケットの状態を毎回全て送る場合と、キーフレーム＋差分で送る場合）
+
+実行例（serverディレクトリで実行する）:
+    python -m src.benchmarks.telemetry_pipeline --latency-ms 1 --iterations 50 --clients 1 10 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.benchmarks.fake_krpc import FakeKrpcClient
+from src.utils.commons.flight_record_buffer import FlightRecordBuffer, TelemetryCursor
+from src.utils.commons.flight_record_store import FlightRecordStore
+from src.utils.commons.frame_encoder import FRAME_ENCODERS, get_frame_encoder
+from src.utils.commons.telemetry_broadcaster import TelemetryBroadcaster
+from src.utils.krpc_module.auto_pilot_manager import FlightManager
+from src.utils.krpc_module.krpc_connection_pool import CONTROL_LANE, TELEMETRY_LANE, KrpcConnectionPool
+
+# ファンアウトで計測する配信方法（飛行記録の差分・全件配信と、ロケットの状態の差分配信の組み合わせ）
+FANOUT_MODES = ("incremental", "incremental+delta", "full", "full+delta")
+
+
+def percentile(samples: list[float], percent: int) -> float:
+    """サンプルのパーセンタイル値を返す"""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+def summarize(name: str, durations: list[float], round_trips: list[int], calls: list[int], **extra: Any) -> dict[str, Any]:  # noqa: ANN401
+    """計測結果を1件の辞書にまとめる"""
+    return {
+        "benchmark": name,
+        "iterations": len(durations),
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "round_trips": statistics.mean(round_trips),
+        "calls": statistics.mean(calls),
+        **extra,
+    }
+
+
+async def measure(
+    name: str,
+    krpc: FakeKrpcClient,
+    function: Callable[[], Awaitable[Any]],
+    iterations: int,
+) -> dict[str, Any]:
+    """関数を繰り返し実行し、1回あたりのレイテンシとRPC数を計測する"""
+    durations, round_trips, calls = [], [], []
+    for _ in range(iterations):
+        krpc.server.reset()
+        start = time.perf_counter()
+        await function()
+        durations.append(time.perf_counter() - start)
+        round_trips.append(krpc.server.round_trips)
+        calls.append(krpc.server.calls)
+    return summarize(name, durations, round_trips, calls)
+
+
+async def measure_fanout(
+    krpc: FakeKrpcClient,
+    clients: int,
+    encoder_name: str,
+    mode: str,
+    iterations: int,
+) -> dict[str, Any]:
+    """broadcastから全クライアントのキューにフレームが届くまでの時間とフレームサイズを計測する
+
+    modeは飛行記録の配信方法（"incremental"・"full"）と、ロケットの状態を差分配信する場合は"+delta"を付けたもの。
+    """
+    incremental = mode.startswith("incremental")
+    delta = mode.endswith("+delta")
+    broadcaster = TelemetryBroadcaster(lambda: FlightManager(krpc_pool(krpc)), interval=0, queue_size=iterations + 1)
+    encoder = get_frame_encoder(encoder_name)
+    subscribers = [broadcaster.subscribe(TelemetryCursor(incremental=incremental), encoder, delta) for _ in range(clients)]
+    # 定期実行のプロデューサーは止め、計測ループから直接broadcastを呼ぶ
+    if broadcaster._producer_task is not None:  # noqa: SLF001
+        broadcaster._producer_task.cancel()  # noqa: SLF001
+    flight_manager = broadcaster.flight_manager
+    durations, round_trips, calls, frame_bytes = [], [], [], []
+    try:
+        for _ in range(iterations):
+            # 配信間隔ごとに飛行記録が1件増える状況を再現する
+            record = flight_manager.flight_record_data() if flight_manager else None
+            if flight_manager and record:
+                flight_manager.flight_records.append(record)
+            krpc.server.reset()
+            start = time.perf_counter()
+            await broadcaster.broadcast()
+            payloads = [subscriber.queue.get_nowait()[2] for subscriber in subscribers]
+            durations.append(time.perf_counter() - start)
+            round_trips.append(krpc.server.round_trips)
+            calls.append(krpc.server.calls)
+            frame_bytes.append(len(payloads[0].encode() if isinstance(payloads[0], str) else payloads[0]))
+    finally:
+        for subscriber in subscribers:
+            await broadcaster.unsubscribe(subscriber)
+        broadcaster.close()
+    return summarize(
+        f"fanout[{clients} clients, {encoder_name}, {mode}]",
+        durations,
+        round_trips,
+        calls,
+        bytes_per_frame=statistics.mean(frame_bytes),
+    )
+
+
+def krpc_pool(krpc: FakeKrpcClient) -> KrpcConnectionPool:
+    """偽のクライアントを全レーンで共有する接続プールを作成する（RPC数は全レーンの合計になる）"""
+    return KrpcConnectionPool({CONTROL_LANE: krpc, TELEMETRY_LANE: krpc})  # type: ignore
+
+
+async def run(latency: float, extra_parts: int, iterations: int, clients: list[int], encoders: list[str]) -> list[dict[str, Any]]:
+    """全ベンチマークを実行する"""
+    krpc = FakeKrpcClient(latency=latency, extra_parts=extra_parts)
+    # 実際のログ・データベースに書き込まないよう、メモリ上のストアと空のバッファを使う
+    FlightManager.shared_record_store = FlightRecordStore("sqlite://")
+    FlightManager.shared_flight_records = FlightRecordBuffer(max(iterations, 1) * 2)
+
+    flight_manager = FlightManager(krpc_pool(krpc))
+    for _ in range(iterations):
+        flight_manager.add_event_log("benchmark event")
+    results = [
+        await measure("get_rocket_status", krpc, lambda: asyncio.to_thread(flight_manager.status_manager.get_rocket_status), iterations),
+        await measure(
+            "get_vessel_telemetry",
+            krpc,
+            lambda: asyncio.to_thread(flight_manager.telemetry_manager.get_vessel_telemetry),
+            iterations,
+        ),
+        await measure("get_telemetry", krpc, flight_manager.get_telemetry, iterations),
+        # 購読されたセクション・グループだけを計算する場合
+        await measure("get_telemetry[clock]", krpc, lambda: flight_manager.get_telemetry(0, {"clock": None}), iterations),
+        await measure(
+            "get_telemetry[rocket_status.main_engine]",
+            krpc,
+            lambda: flight_manager.get_telemetry(0, {"rocket_status": frozenset({"main_engine"})}),
+            iterations,
+        ),
+    ]
+    await flight_manager.close()
+
+    results.extend(
+        [
+            await measure_fanout(krpc, count, encoder_name, mode, iterations)
+            for encoder_name in encoders
+            for mode in FANOUT_MODES
+            for count in clients
+        ],
+    )
+    krpc.io.close()
+    return results
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    """計測結果を表形式で出力する"""
+    header = f"{'benchmark':<52}{'p50 ms':>10}{'p99 ms':>10}{'RTs':>8}{'calls':>8}{'bytes/frame':>14}"
+    print(header)  # noqa: T201
+    print("-" * len(header))  # noqa: T201
+    for result in results:
+        bytes_per_frame = f"{result['bytes_per_frame']:.0f}" if "bytes_per_frame" in result else "-"
+        print(  # noqa: T201
+            f"{result['benchmark']:<52}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['round_trips']:>8.1f}{result['calls']:>8.1f}{bytes_per_frame:>14}",
+        )
+
+
+def main() -> None:
+    """コマンドライン引数を解釈してベンチマークを実行する"""
+    parser = argparse.ArgumentParser(description="Benchmark the telemetry pipeline against a fake kRPC server.")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="1往復あたりのRPCレイテンシ(ミリ秒)")
+    parser.add_argument("--parts", type=int, default=0, help="スキーマのタグを持たない追加パーツの数")
+    parser.add_argument("--iterations", type=int, default=50, help="各ベンチマークの繰り返し回数")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100], help="ファンアウトのクライアント数")
+    parser.add_argument("--formats", nargs="+", default=["json"], choices=list(FRAME_ENCODERS), help="ファンアウトで計測するフレーム形式")
+    parser.add_argument("--json", dest="json_path", help="結果をJSONで保存するパス(リグレッションの比較用)")
+    args = parser.parse_args()
+
+    # FlightManagerが作成するバイナリログは一時ディレクトリに書き込む
+    with tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir):
+        results = asyncio.run(run(args.latency_ms / 1000, args.parts, args.iterations, args.clients, args.formats))
+
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:  # noqa: PTH123
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,35 @@
 import asyncio
 import json
 import logging
+import time
+from pathlib import Path
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-
-from src.model import LaunchCommand
+from fastapi.responses import PlainTextResponse
+
+from src.model import LaunchCommand, ReplayCommand, TelemetryAck
+from src.settings.config import (
+    FLIGHT_RECORD_DB_URL,
+    KRPC_CONNECTION_LANES,
+    REPLAY_LOG_FILE_PATH,
+    TELEMETRY_BROADCAST_INTERVAL,
+    TELEMETRY_QUEUE_SIZE,
+)
+from src.utils.commons.flight_record_buffer import TelemetryCursor
+from src.utils.commons.flight_record_store import FlightRecordStore
+from src.utils.commons.flight_replay import ReplayFlightManager
+from src.utils.commons.frame_encoder import get_frame_encoder
+from src.utils.commons.metrics import REGISTRY
+from src.utils.commons.telemetry_broadcaster import (
+    SEND_DURATION,
+    TelemetryBroadcaster,
+    TelemetrySubscriber,
+    parse_since,
+    parse_subscription,
+)
 from src.utils.krpc_module.auto_pilot_manager import FlightManager
-from src.utils.krpc_module.krpc_client import KrpcClient
+from src.utils.krpc_module.krpc_connection_pool import KrpcConnectionPool
 
 app = FastAPI(title="LaunchOperationsAPI", version="0.1")
 
@@ -22,17 +44,81 @@ app.add_middleware(
 )
 
 logger = logging.getLogger(__name__)
-krpc = KrpcClient("MyKSPConnection")
+# 再生モードではKSPに接続しない
+krpc_pool = None if REPLAY_LOG_FILE_PATH else KrpcConnectionPool.connect(KRPC_CONNECTION_LANES)
+# 再生モードで再生するイベントを読み込むストア（購読者が来るたびにエンジンを作らないよう、プロセスで1つだけ作成する）
+replay_store = FlightRecordStore(FLIGHT_RECORD_DB_URL) if REPLAY_LOG_FILE_PATH else None
+
+
+def create_flight_manager() -> FlightManager | ReplayFlightManager:
+    """最初の購読者が来たときにFlightManagerを作成する（再生モードでは記録済みのログを再生するReplayFlightManager）"""
+    if krpc_pool is None:
+        return ReplayFlightManager(Path(REPLAY_LOG_FILE_PATH), replay_store)
+    return FlightManager(krpc_pool)
+
+
+broadcaster = TelemetryBroadcaster(
+    flight_manager_factory=create_flight_manager,
+    interval=TELEMETRY_BROADCAST_INTERVAL,
+    queue_size=TELEMETRY_QUEUE_SIZE,
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """kRPCの呼び出し・テレメトリ配信のメトリクスをPrometheusのテキスト形式で返す"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.websocket("/ws/launch-management")
 async def websocket_launch_management(websocket: WebSocket) -> None:
-    """Manage the launch process through WebSocket communication."""
-    auto_pilot = FlightManager(krpc)
+    """Manage the launch process through WebSocket communication.
+
+    テレメトリはプロセス内で共有する1つのプロデューサーが取得し、全接続に同じフレームを配信する。
+
+    Query Parameters:
+        mode (str): "full"（デフォルト）は毎回全飛行記録を送信、"incremental"は前回の送信以降の差分のみ送信
+        since (int): incrementalモードでの再開位置（受信済みの最後のシーケンス番号）
+        format (str): フレームの形式。"json"（デフォルト）、"orjson"、"msgpack"（バイナリフレーム）
+        state (str): ロケットの状態の配信方法。"full"（デフォルト）は毎回全状態を送信、
+            "delta"は接続時と一定間隔でキーフレーム(frame_type="keyframe")、それ以外は変化した値だけの差分(frame_type="delta")を送信
+        rate (float): 配信レート（Hz、例: 1、5、20）。省略時はTELEMETRY_BROADCAST_INTERVALごと
+        sections (str): 購読するセクション・フィールドのカンマ区切り。省略時は全て。購読されていない値はサーバーで取得・計算しない
+            セクション: "clock"（時刻のみ）、"rocket_status"、"vessel_telemetry"、"flight_records"
+            rocket_statusとvessel_telemetryはドット区切りで絞り込める（例: "rocket_status.main_engine"、"vessel_telemetry.orbit_info"）
+    """
     await websocket.accept()
 
-    telemetry_task = asyncio.create_task(send_telemetry(websocket, auto_pilot))
-    commands_task = asyncio.create_task(receive_commands(websocket, auto_pilot))
+    try:
+        encoder = get_frame_encoder(websocket.query_params.get("format", "json"))
+        rate, selection = parse_subscription(websocket.query_params.get("rate"), websocket.query_params.get("sections"))
+        acked_sequence = parse_since(websocket.query_params.get("since"))
+    except ValueError as e:
+        logger.warning("Rejected WebSocket connection: %s", e)
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    cursor = TelemetryCursor(
+        incremental=websocket.query_params.get("mode") == "incremental",
+        acked_sequence=acked_sequence,
+    )
+    try:
+        subscriber = broadcaster.subscribe(
+            cursor,
+            encoder,
+            delta=websocket.query_params.get("state") == "delta",
+            rate=rate,
+            selection=selection,
+        )
+    except (ValueError, FileNotFoundError):
+        # 最初の購読者でFlightManager（再生モードではReplayFlightManager）を作成できなかった場合
+        logger.exception("Failed to create the flight manager")
+        await websocket.close(code=1011, reason="Flight manager is not available")
+        return
+    auto_pilot = broadcaster.flight_manager
+
+    telemetry_task = asyncio.create_task(send_telemetry(websocket, subscriber))
+    commands_task = asyncio.create_task(receive_commands(websocket, auto_pilot, cursor))
 
     done, pending = await asyncio.wait(
         [telemetry_task, commands_task],
@@ -46,16 +132,33 @@ async def websocket_launch_management(websocket: WebSocket) -> None:
         except asyncio.CancelledError:
             logger.info("Cancelled pending task")
 
-        # Clean up the FlightManager instance
-    await auto_pilot.close()
+    # 最後の購読者が切断した場合はプロデューサーとFlightManagerを停止する
+    await broadcaster.unsubscribe(subscriber)
 
 
-async def send_telemetry(websocket: WebSocket, auto_pilot: FlightManager) -> None:
-    """Send telemetry data periodically to the connected client."""
+async def send_telemetry(websocket: WebSocket, subscriber: TelemetrySubscriber) -> None:
+    """Send broadcast telemetry frames to the connected client.
+
+    送信が詰まってフレームが溜まった場合は最新のフレームだけを送る。
+    incrementalモードでは初回と取りこぼしが発生したときに、次のフレームの前提となる位置までの記録をバックフィルする。
+    差分配信では、クライアントが持っている状態に差分を適用できない場合にキーフレームを送る。
+    """
+    cursor = subscriber.cursor
     try:
         while True:
-            await websocket.send_json(await auto_pilot.get_telemetry())
-            await asyncio.sleep(1)
+            previous_sequence, sequence, payload, state_update = await subscriber.next_frame()
+            start = time.perf_counter()
+            if cursor.incremental and previous_sequence > cursor.delivered_sequence:
+                backfill = broadcaster.backfill(subscriber, previous_sequence)
+                if backfill is not None:
+                    await send_payload(websocket, backfill)
+            if state_update is not None:
+                payload = broadcaster.resync(subscriber, state_update, payload)
+            await send_payload(websocket, payload)
+            SEND_DURATION.observe(time.perf_counter() - start, subscriber.encoder.name)
+            cursor.delivered(sequence)
+            if state_update is not None:
+                subscriber.state_version = state_update.version
     except WebSocketDisconnect:
         logger.info("WebSocket connection closed by client.")
     except Exception:
@@ -63,12 +166,29 @@ async def send_telemetry(websocket: WebSocket, auto_pilot: FlightManager) -> Non
         raise
 
 
-async def receive_commands(websocket: WebSocket, auto_pilot: FlightManager) -> None:
-    """Receive and handle commands from the connected client."""
+async def send_payload(websocket: WebSocket, payload: str | bytes) -> None:
+    """エンコード済みのフレームをそのまま送信する（再シリアライズは行わない）"""
+    if isinstance(payload, bytes):
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+
+async def receive_commands(websocket: WebSocket, auto_pilot: FlightManager | ReplayFlightManager, cursor: TelemetryCursor) -> None:
+    """Receive and handle commands from the connected client.
+
+    再生モードでは {"command": "replay", "speed": 100, "launch_relative_time": 60} で再生速度の変更・再生位置の移動ができる。
+    """
     try:
         while True:
             message = await websocket.receive_text()
             data = json.loads(message)
+            if data.get("command") == "ack":
+                cursor.ack(TelemetryAck.model_validate(data).sequence)
+                continue
+            if data.get("command") == "replay":
+                control_replay(ReplayCommand.model_validate(data), auto_pilot)
+                continue
             command_data = LaunchCommand.model_validate(data)
 
             if command_data.command == "disconnect":
@@ -87,7 +207,18 @@ async def receive_commands(websocket: WebSocket, auto_pilot: FlightManager) -> N
         raise
 
 
-async def execute_command(command_data: LaunchCommand, auto_pilot: FlightManager) -> None:
+def control_replay(command_data: ReplayCommand, auto_pilot: FlightManager | ReplayFlightManager) -> None:
+    """再生の操作コマンドを実行する（再生モードでない場合や、操作できない値の場合は警告して無視する）"""
+    if not isinstance(auto_pilot, ReplayFlightManager):
+        logger.warning("Ignored replay command: the server is not in replay mode.")
+        return
+    try:
+        auto_pilot.control(command_data)
+    except ValueError as e:
+        logger.warning("Ignored replay command: %s", e)
+
+
+async def execute_command(command_data: LaunchCommand, auto_pilot: FlightManager | ReplayFlightManager) -> None:
     """Execute a received command based on the command type."""
     if command_data.command == "sequence":
         logger.info("Received sequence command for: %s", command_data.launch_date)
@@ -33,3 +33,29 @@ class LaunchCommand(BaseModel):
     launch_date: datetime
     command: str
     target_orbit: TargetOrbit
+
+
+class TelemetryAck(BaseModel):
+    """テレメトリの受信確認を表すクラス
+
+    Attributes:
+        command (str): コマンド（"ack"）
+        sequence (int): クライアントが受信済みの最後のシーケンス番号
+    """
+
+    command: str
+    sequence: int
+
+
+class ReplayCommand(BaseModel):
+    """再生モードの操作コマンドを表すクラス
+
+    Attributes:
+        command (str): コマンド（"replay"）
+        speed (float | None): 再生速度の倍率（1で実時間）。Noneなら変更しない
+        launch_relative_time (int | None): 指定した場合、再生中の飛行のこの打ち上げ相対時刻（秒）に移動する
+    """
+
+    command: str
+    speed: float | None = None
+    launch_relative_time: int | None = None
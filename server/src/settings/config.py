@@ -1,3 +1,5 @@
+import os
+
 from src.utils.commons.read_json import read_json
 
 # KSPロケットの構造を設定したスキーマJSONファイルのパス
@@ -13,3 +15,113 @@ CUTOFF = 3  # カットオフ
 # ログファイルのパス
 # FLIGHT_LOG_FILE_PATH = f"./src/logs/{datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d')}-los-flight.log"
 FLIGHT_LOG_FILE_PATH = "./src/logs/los-flight.log"
+
+# ログのストリーミング読み込みで1つのチャンクに含める最大レコード数と、後ろ方向に読む場合に1回で読み込むバイト数
+LOG_READ_CHUNK_SIZE = 1000
+LOG_READ_BLOCK_SIZE = 1024 * 1024
+
+# メモリ上に保持する飛行記録の最大件数（差分配信・接続時のバックフィルに使用）
+FLIGHT_RECORD_BUFFER_SIZE = 100_000
+
+# kRPCの接続プールのレーンと接続名
+# control: ステージング・スロットル・SAS・MechJebの操作、telemetry: テレメトリ・ステータスの取得
+# 同じ接続名を指定したレーンは1つの接続を共有する
+KRPC_CONNECTION_LANES = {"control": "LOS-Control", "telemetry": "LOS-Telemetry"}
+
+# kRPCの接続確認の間隔（秒）。この間ストリームの更新が届いていれば確認のRPCは送らない
+KRPC_HEALTH_CHECK_INTERVAL = 5.0
+# 再接続の待ち時間（秒）。失敗するたびに2倍にし（上限あり）、ジッターとして0.5〜1.0倍のランダムな係数を掛ける
+KRPC_RECONNECT_BASE_DELAY = 1.0
+KRPC_RECONNECT_MAX_DELAY = 60.0
+
+# kRPC接続ごとのI/Oワーカーに積める最大ジョブ数（超えた呼び出し元は空きが出るまで待つ）
+KRPC_IO_QUEUE_SIZE = 16
+
+# ユニットのステータス遷移の判定に使う値をストリームで購読できない場合に、判定する間隔（秒）
+UNIT_STATE_POLL_INTERVAL = 1.0
+
+# カウントダウン・カウントアップの時計を更新する間隔（秒）
+COUNTDOWN_INTERVAL = 1.0
+
+# 飛行記録をサンプリングするレート（Hz）。最大動圧・ステージング・MECO/SECOの解析用に20〜50Hzを想定
+FLIGHT_RECORDER_SAMPLE_RATE = 20
+# サンプルをまとめてバイナリログに書き込む間隔（秒）
+FLIGHT_RECORDER_FLUSH_INTERVAL = 2.0
+# 書き込み前のサンプルを保持するリングバッファの容量（書き込みが遅れた場合は古いサンプルから破棄）
+FLIGHT_RECORDER_RING_SIZE = 4096
+# サンプルのうちWebSocketクライアントに配信する（メモリ上のバッファに載せる）間隔（秒）
+FLIGHT_RECORD_PUBLISH_INTERVAL = 1.0
+
+# kRPCストリームの更新レート（Hz）。サンプリングレート以上にしないと同じ値を重複して記録する
+TELEMETRY_STREAM_RATE = FLIGHT_RECORDER_SAMPLE_RATE
+
+# パーツの属性のうち、まれにしか変わらない値（展開状態・シールドなど）を取得し直す間隔（秒）
+PART_PROPERTY_SLOW_TTL = 5.0
+
+# テレメトリ・飛行記録の浮動小数点数を丸める既定の桁数
+TELEMETRY_DEFAULT_PRECISION = 2
+# フィールド名ごとの丸める桁数（そのキーの下にネストした値にも適用される）。Noneなら丸めない
+TELEMETRY_PRECISION: dict[str, int | None] = {
+    # 緯度・経度は小数点以下2桁だと赤道上で約1kmの誤差になる
+    "latitude": 6,
+    "longitude": 6,
+    # 軌道要素（角度はラジアン）
+    "inclination": 6,
+    "eccentricity": 6,
+    "longitude_of_ascending_node": 6,
+    "argument_of_periapsis": 6,
+    "atmosphere_density": 4,
+    "drag_coefficient": 4,
+    "signal_strength": 3,
+    "sun_exposure": 3,
+    "throttle": 3,
+    "thrust_limit": 3,
+}
+
+# テレメトリを取得して全WebSocketクライアントに配信する間隔（秒）
+TELEMETRY_BROADCAST_INTERVAL = 1.0
+# クライアントが指定できる配信レートの上限（Hz）。ストリームの更新レートより速くしても同じ値を送るだけになる
+TELEMETRY_MAX_RATE = TELEMETRY_STREAM_RATE
+# クライアントごとに保持する未送信フレームの最大数（超えた分は古いものから破棄）
+TELEMETRY_QUEUE_SIZE = 4
+# 差分配信(state=delta)で全クライアントにキーフレーム（全状態）を送る間隔（秒）
+TELEMETRY_KEYFRAME_INTERVAL = 30.0
+# 差分配信で変化とみなす最小の差（フィールド名ごと。そのキーの下にネストした値にも適用される）。ないフィールドは値が変われば送る
+TELEMETRY_DELTA_EPSILON: dict[str, float] = {
+    "temperature": 1.0,
+    "dynamic_pressure": 10.0,
+    "atmospheric_pressure": 10.0,
+    "atmospheric_drag": 0.01,
+    "terminal_velocity": 0.5,
+    "mass": 1.0,
+    "thrust": 100.0,
+    "energy_flow": 0.01,
+}
+
+# 飛行記録（flight_record_dataの固定フィールド）を保存するバイナリログのパス
+FLIGHT_RECORD_STORE_PATH = "./src/logs/los-flight.bin"
+# バイナリログの書き込み（LogWriter）で、この大きさ（バイト）たまるか、最初の書き込みから最大の待ち時間（秒）がたったらまとめて書き込む
+LOG_WRITER_BATCH_BYTES = 1024 * 1024
+LOG_WRITER_FLUSH_INTERVAL = 1.0
+# 書き込みごとにfsyncしてディスクへの書き込みを待つか（電源断でも失わないが、書き込みは遅くなる）
+LOG_WRITER_FSYNC = False
+# ログファイルを切り替えるサイズ（バイト）。0なら切り替えない（切り替えた古いファイルは<ファイル名>.1, .2, ...）
+LOG_WRITER_MAX_BYTES = 256 * 1024 * 1024
+
+# イベントレコードを保存するSQLiteデータベースのURLと、解放領域を回収する間隔（秒）
+FLIGHT_RECORD_DB_URL = "sqlite:///./flight_record.db"
+FLIGHT_RECORD_DB_COMPACTION_INTERVAL = 600
+
+# 再生モード（KSPに接続せず、記録済みのログからWebSocket APIのテレメトリを配信する）
+# 再生するログファイルのパス（JSON Lines、または拡張子.binのバイナリログ）
+# 環境変数LOS_REPLAY_LOGで指定し、未指定なら通常どおりKSPに接続する
+REPLAY_LOG_FILE_PATH = os.environ.get("LOS_REPLAY_LOG")
+# 再生速度の倍率（1で実時間、10〜1000で高速再生）と上限。倍率は環境変数LOS_REPLAY_SPEEDで指定する
+REPLAY_SPEED = float(os.environ.get("LOS_REPLAY_SPEED", "1"))
+REPLAY_MAX_SPEED = 1000.0
+# ログの最後まで再生したら先頭から繰り返すか（長時間の負荷試験用）
+REPLAY_LOOP = True
+# レコードをまとめて再生する最小の間隔（秒）。高速再生時にレコードごとに待たないようにする
+REPLAY_TICK_INTERVAL = 0.02
+# ログ上の記録の空白がこの秒数を超える場合は待たずに次のレコードまで進める（複数の飛行を含むログの飛行の間など）
+REPLAY_MAX_GAP = 10.0
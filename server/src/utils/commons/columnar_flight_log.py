@@ -0,0 +1,326 @@
+import bisect
+import json
+import logging
+import math
+import mmap
+import struct
+import threading
+from collections.abc import Collection, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from src.settings.config import LOG_READ_CHUNK_SIZE, TELEMETRY_DEFAULT_PRECISION
+from src.utils.commons.log_chunk import LogChunk, RecordFilter
+from src.utils.commons.log_writer import LogWriter
+from src.utils.decorators.round_output import Precision, round_column
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LOSFLOG1"
+# ヘッダー: マジックナンバー(8byte) + スキーマJSONの長さ(uint32) + スキーマJSON（8byte境界までパディング）
+HEADER_PREFIX = struct.Struct("<8sI")
+
+# flight_record_dataの固定フィールド。型は "d"(float64) または "q"(int64) のみ
+# timeはISO 8601文字列ではなくUNIX時間(秒)で保存する
+# sequenceにはFlightRecorderのサンプル番号を保存する
+FLIGHT_RECORD_COLUMNS: list[tuple[str, str]] = [
+    ("sequence", "q"),
+    ("time", "d"),
+    ("launch_relative_time", "q"),
+    ("heading", "d"),
+    ("altitude", "d"),
+    ("latitude", "d"),
+    ("longitude", "d"),
+    ("orbital_speed", "d"),
+    ("apoapsis_altitude", "d"),
+    ("periapsis_altitude", "d"),
+    ("inclination", "d"),
+    ("eccentricity", "d"),
+]
+
+
+class ColumnarFlightLog:
+    """飛行記録を固定長バイナリレコードで追記するログファイルを管理するクラス
+
+    全フィールドが8byteの数値型なので、レコードはfloat64/int64の配列として並ぶ。
+    読み込み時はファイルをメモリマップし、列をコピーせずにmemoryviewのスライスとして取り出せる。
+    追記はLogWriterの書き込みスレッドがファイルを開いたままでまとめて行い、サイズが上限を超えたら新しいファイルに切り替える
+    （読み込みの対象は現在のファイルのみ）。
+    """
+
+    def __init__(
+        self: "ColumnarFlightLog",
+        log_file_path: Path,
+        columns: list[tuple[str, str]] = FLIGHT_RECORD_COLUMNS,
+        precision: Precision | None = None,
+    ) -> None:
+        """Initialize the ColumnarFlightLog class.
+
+        Args:
+            log_file_path (Path): バイナリログファイルのパス
+            columns (list[tuple[str, str]]): (フィールド名, 型) のリスト
+            precision (Precision | None): 指定した場合、読み込むレコードのfloat列をフィールドごとの桁数で丸める
+
+        Raises:
+            ValueError: 既存ファイルのスキーマが指定されたスキーマと一致しない場合
+        """
+        if any(kind not in ("d", "q") for _, kind in columns):
+            msg = "ColumnarFlightLog only supports float64 ('d') and int64 ('q') columns."
+            raise ValueError(msg)
+        self.log_file_path = log_file_path
+        self.columns = columns
+        self.precision = precision
+        self.column_index = {name: i for i, (name, _) in enumerate(columns)}
+        self.record_struct = struct.Struct("<" + "".join(kind for _, kind in columns))
+        self._lock = threading.Lock()
+        self._writer: LogWriter | None = None
+
+        schema = json.dumps({"columns": columns, "record_size": self.record_struct.size}).encode()
+        header = HEADER_PREFIX.pack(MAGIC, len(schema)) + schema
+        header += b"\0" * (-len(header) % 8)
+        self.header = header
+        self.header_size = len(header)
+
+        log_file_path.parent.mkdir(parents=True, exist_ok=True)
+        if log_file_path.exists() and log_file_path.stat().st_size > 0:
+            self._validate_header(header)
+        else:
+            with log_file_path.open("wb") as f:
+                f.write(header)
+
+    def _validate_header(self: "ColumnarFlightLog", header: bytes) -> None:
+        """既存ファイルのヘッダーが現在のスキーマと一致するか確認する"""
+        with self.log_file_path.open("rb") as f:
+            existing = f.read(len(header))
+        if existing != header:
+            msg = f"Schema mismatch in {self.log_file_path}. Move the file aside to start a new log."
+            raise ValueError(msg)
+
+    def pack(self: "ColumnarFlightLog", record: dict[str, Any]) -> bytes:
+        """飛行記録の辞書を固定長レコードに変換する。欠けている値はfloatならNaN、intなら0とする"""
+        values = []
+        for name, kind in self.columns:
+            value = record.get(name)
+            if name == "time" and isinstance(value, str):
+                value = datetime.fromisoformat(value).timestamp()
+            if value is None:
+                value = math.nan if kind == "d" else 0
+            values.append(float(value) if kind == "d" else int(value))
+        return self.record_struct.pack(*values)
+
+    def append(self: "ColumnarFlightLog", records: list[dict[str, Any]]) -> None:
+        """飛行記録をまとめて1回の書き込みで追記する
+
+        Args:
+            records (list[dict[str, Any]]): 追記する飛行記録のリスト
+        """
+        if not records:
+            return
+        self.append_packed(b"".join(self.pack(record) for record in records))
+
+    def append_packed(self: "ColumnarFlightLog", data: bytes) -> None:
+        """packで変換済みのレコードの並びを書き込みスレッドのキューに積む（初回に書き込みスレッドを開始する）
+
+        書き込みは待たないため、書き込みスレッドがファイルに書き込むまでは読み込みに含まれない。
+
+        Args:
+            data (bytes): record_struct.sizeの倍数の長さのバイト列
+        """
+        if not data:
+            return
+        if len(data) % self.record_struct.size:
+            msg = f"Packed data length {len(data)} is not a multiple of the record size {self.record_struct.size}."
+            raise ValueError(msg)
+        with self._lock:
+            if self._writer is None:
+                self._writer = LogWriter(self.log_file_path, self.header)
+            self._writer.write(data)
+
+    def close(self: "ColumnarFlightLog") -> None:
+        """書き込み待ちのレコードを書き込み、書き込みスレッドを停止する（close後に追記すると再び開始する）"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+    def __len__(self: "ColumnarFlightLog") -> int:
+        """書き込み済みの完全なレコード数を返す"""
+        return max(0, self.log_file_path.stat().st_size - self.header_size) // self.record_struct.size
+
+    def open_view(self: "ColumnarFlightLog") -> "ColumnarFlightLogView":
+        """現在のファイル内容をメモリマップしたビューを開く"""
+        return ColumnarFlightLogView(self)
+
+    def read_records(self: "ColumnarFlightLog", interval: float = 0) -> list[dict[str, Any]]:
+        """レコードを飛行記録の辞書として読み込む（起動時のバックフィル用）
+
+        Args:
+            interval (float): 0より大きい場合、time列がこの秒数以上進んだレコードだけに間引く
+        """
+        if len(self) == 0:
+            return []
+        with self.open_view() as view:
+            rows = view.sample_indices("time", interval) if interval > 0 else None
+            return view.records(rows, self.precision)
+
+    def iter_records(
+        self: "ColumnarFlightLog",
+        record_filter: RecordFilter | None = None,
+        offset: int | None = None,
+        reverse: bool = False,
+        chunk_size: int = LOG_READ_CHUNK_SIZE,
+    ) -> Iterator[LogChunk]:
+        """レコードをchunk_size件ずつ飛行記録の辞書に変換するジェネレーター
+
+        メモリマップしたビューからチャンクごとに変換するため、メモリ使用量はチャンクの大きさで決まる。
+        launch_relative_timeの範囲はチャンクごとに列を読んで絞り込み、fieldsを指定した場合はその列だけを変換する。
+        ビューは読み込み開始時点のレコード数を対象にし、ジェネレーターを閉じるまで開いたままにする。
+
+        Args:
+            record_filter (RecordFilter | None): 読み込み時に適用する絞り込み
+            offset (int | None): 前方向ならこのレコード番号から、後ろ方向ならこのレコード番号より前を読む。
+                Noneなら前方向は先頭から、後ろ方向は末尾から
+            reverse (bool): Trueなら末尾から先頭に向かって新しい順に読む
+            chunk_size (int): 1つのチャンクで読み込むレコード数
+
+        Yields:
+            LogChunk: 絞り込み後のレコードとレコード番号の範囲。レコードがないチャンクは返さない
+        """
+        record_filter = record_filter or RecordFilter()
+        if len(self) == 0 or (record_filter.key is not None and record_filter.key not in self.column_index):
+            return
+        with self.open_view() as view:
+            if reverse:
+                stop = view.length if offset is None else min(offset, view.length)
+                ranges = ((max(0, end - chunk_size), end) for end in range(stop, 0, -chunk_size))
+            else:
+                ranges = ((start, min(start + chunk_size, view.length)) for start in range(offset or 0, view.length, chunk_size))
+            for start, stop in ranges:
+                rows: range | list[int] = range(start, stop)
+                if record_filter.has_time_range:
+                    values = view.column("launch_relative_time", start, stop)
+                    try:
+                        rows = [start + index for index, value in enumerate(values) if record_filter.in_range(value)]
+                    finally:
+                        values.release()
+                    if not rows:
+                        continue
+                records = view.records(rows, self.precision, record_filter.fields)
+                if not records:
+                    continue
+                if reverse:
+                    records.reverse()
+                yield LogChunk(records, start, stop)
+
+
+class ColumnarFlightLogView:
+    """メモリマップしたバイナリログを読むビュー
+
+    columnやrange_byが返すmemoryviewはmmapを参照しているため、close前に解放するかコピーすること。
+    """
+
+    def __init__(self: "ColumnarFlightLogView", flight_log: ColumnarFlightLog) -> None:
+        """Initialize the ColumnarFlightLogView class."""
+        self.flight_log = flight_log
+        self.length = len(flight_log)
+        record_size = flight_log.record_struct.size
+        self._file = flight_log.log_file_path.open("rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mmap)[flight_log.header_size : flight_log.header_size + self.length * record_size]
+        self._width = record_size // 8
+
+    def __enter__(self: "ColumnarFlightLogView") -> "ColumnarFlightLogView":
+        """Enter the context."""
+        return self
+
+    def __exit__(self: "ColumnarFlightLogView", *_: object) -> None:
+        """Exit the context."""
+        self.close()
+
+    def close(self: "ColumnarFlightLogView") -> None:
+        """メモリマップを閉じる"""
+        self._data.release()
+        self._mmap.close()
+        self._file.close()
+
+    def column(self: "ColumnarFlightLogView", name: str, start: int = 0, stop: int | None = None) -> memoryview:
+        """指定した列のレコード範囲をコピーせずに返す
+
+        Args:
+            name (str): フィールド名
+            start (int): 開始レコード番号
+            stop (int | None): 終了レコード番号（含まない）。Noneなら最後まで
+
+        Returns:
+            memoryview: 型に応じてfloat64またはint64としてキャストされたビュー
+        """
+        index = self.flight_log.column_index[name]
+        kind = self.flight_log.columns[index][1]
+        stop = self.length if stop is None else min(stop, self.length)
+        values = self._data.cast(kind)
+        return values[start * self._width + index : stop * self._width : self._width]
+
+    def range_by(self: "ColumnarFlightLogView", name: str, low: float, high: float) -> tuple[int, int]:
+        """単調増加する列（sequence, time）で low <= 値 <= high となるレコード範囲を二分探索で求める
+
+        Returns:
+            tuple[int, int]: (開始レコード番号, 終了レコード番号（含まない）)
+        """
+        values = self.column(name)
+        try:
+            return bisect.bisect_left(values, low), bisect.bisect_right(values, high)
+        finally:
+            values.release()
+
+    def sample_indices(self: "ColumnarFlightLogView", name: str, interval: float) -> list[int]:
+        """単調増加する列の値がinterval以上進むごとに1件ずつ選んだレコード番号を返す"""
+        values = self.column(name)
+        try:
+            indices = []
+            next_value = -math.inf
+            for index, value in enumerate(values):
+                if value >= next_value:
+                    indices.append(index)
+                    next_value = value + interval
+            return indices
+        finally:
+            values.release()
+
+    def records(
+        self: "ColumnarFlightLogView",
+        rows: range | list[int] | None = None,
+        precision: Precision | None = None,
+        fields: Collection[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """指定したレコードを飛行記録の辞書に変換する
+
+        列ごとにまとめて読み込み、丸めと欠損値(NaN)の変換も列単位で行う。
+
+        Args:
+            rows (range | list[int] | None): 読み込むレコード番号（連続した範囲のrange、または昇順のリスト）。Noneなら全レコード
+            precision (Precision | None): 指定した場合、float列をフィールドごとの桁数で丸める（ないフィールドは既定の桁数）
+            fields (Collection[str] | None): 指定した場合、この列だけを読み込む
+        """
+        rows = range(self.length) if rows is None else rows
+        if not rows:
+            return []
+        start = rows[0]
+        contiguous = isinstance(rows, range) and rows.step == 1
+        columns: dict[str, list[Any]] = {}
+        for name, kind in self.flight_log.columns:
+            if fields is not None and name not in fields:
+                continue
+            values = self.column(name, start, rows[-1] + 1)
+            try:
+                column = values.tolist() if contiguous else [values[row - start] for row in rows]
+            finally:
+                values.release()
+            if name == "time":
+                column = [datetime.fromtimestamp(value, timezone.utc).isoformat() for value in column]
+            elif kind == "d":
+                # 欠損値(NaN)はJSONで表現できないためNoneに戻す
+                column = round_column(column, None if precision is None else precision.get(name, TELEMETRY_DEFAULT_PRECISION))
+            columns[name] = column
+        names = list(columns)
+        return [dict(zip(names, values, strict=True)) for values in zip(*columns.values(), strict=True)]
@@ -0,0 +1,145 @@
+import bisect
+import contextlib
+import logging
+import math
+import queue
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.utils.commons.flight_record_store import FlightRecordStore
+
+logger = logging.getLogger(__name__)
+
+
+class EventTimeline:
+    """イベントレコードを追記専用のタイムラインとしてメモリ上に保持するクラス
+
+    レコードはFlightRecordBufferが付与したシーケンス番号の順に追加され、シーケンス番号とlaunch_relative_timeで範囲を検索できる。
+    新しいイベントはストア（SQLite）へ専用の書き込みスレッドでまとめて保存するため、追加した側（kRPCのI/Oワーカーなど）は書き込みを待たない。
+    イベントが追加されるとリスナーに通知する（リスナーは追加したスレッドで呼ばれる）。
+    """
+
+    def __init__(self: "EventTimeline", store: "FlightRecordStore | None" = None) -> None:
+        """Initialize the EventTimeline class.
+
+        Args:
+            store (FlightRecordStore | None): イベントを保存するストア。Noneならメモリ上にのみ保持する
+        """
+        self.store = store
+        self._events: list[dict[str, Any]] = []
+        self._sequences: list[int] = []
+        # (launch_relative_time, _eventsの位置) をlaunch_relative_time順に並べた索引
+        self._by_time: list[tuple[int, int]] = []
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        # 書き込みスレッドのキュー（Noneはcloseによる停止の合図）
+        self._pending: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        # 書き込みスレッドの開始と停止を直列にする（停止中に積まれたレコードは次に開始するスレッドが保存する）
+        self._writer_lock = threading.Lock()
+
+    def __len__(self: "EventTimeline") -> int:
+        """保持しているイベント数"""
+        return len(self._events)
+
+    def append(self: "EventTimeline", record: dict[str, Any], persist: bool = True) -> None:
+        """イベントを追加してリスナーに通知する
+
+        Args:
+            record (dict[str, Any]): sequence、launch_relative_timeを含むイベントレコード
+            persist (bool): Trueならストアに保存する（ストアから読み込んだ既存のイベントはFalse）
+        """
+        with self._lock:
+            if self._sequences and record["sequence"] <= self._sequences[-1]:
+                msg = f"Event sequence must increase: {record['sequence']} <= {self._sequences[-1]}"
+                raise ValueError(msg)
+            self._events.append(record)
+            self._sequences.append(record["sequence"])
+            bisect.insort(self._by_time, (record["launch_relative_time"], len(self._events) - 1))
+            listeners = list(self._listeners)
+        if persist:
+            self.persist(record)
+        for listener in listeners:
+            self._notify(listener, record)
+
+    def since(self: "EventTimeline", sequence: int) -> list[dict[str, Any]]:
+        """指定したシーケンス番号より後に追加されたイベントを追加順に返す"""
+        with self._lock:
+            return self._events[bisect.bisect_right(self._sequences, sequence) :]
+
+    def range(self: "EventTimeline", start: int | None = None, end: int | None = None) -> list[dict[str, Any]]:
+        """launch_relative_timeが start <= t <= end のイベントをsequence順に返す（Noneは上限・下限なし）"""
+        low = (-math.inf,) if start is None else (start,)
+        high = (math.inf,) if end is None else (end, math.inf)
+        with self._lock:
+            positions = self._by_time[bisect.bisect_left(self._by_time, low) : bisect.bisect_right(self._by_time, high)]
+            return [self._events[position] for position in sorted(position for _, position in positions)]
+
+    def subscribe(self: "EventTimeline", listener: Callable[[dict[str, Any]], None]) -> None:
+        """イベントが追加されたときに呼ばれるリスナーを登録する"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self: "EventTimeline", listener: Callable[[dict[str, Any]], None]) -> None:
+        """リスナーの登録を解除する"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    @staticmethod
+    def _notify(listener: Callable[[dict[str, Any]], None], record: dict[str, Any]) -> None:
+        """リスナーにイベントを通知する（リスナーの例外は記録して他のリスナーへの通知を続ける）"""
+        try:
+            listener(record)
+        except Exception:
+            logger.exception("Event timeline listener failed")
+
+    def persist(self: "EventTimeline", record: dict[str, Any]) -> None:
+        """レコードを書き込みスレッドのキューに積む（初回に書き込みスレッドを開始する。ストアがなければ何もしない）
+
+        タイムラインに追加しないレコード（画面表示用のログだけのレコード）も、イベントと同じ順序でストアに保存するために使う。
+        """
+        if self.store is None:
+            return
+        self._pending.put(record)
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="event-timeline-writer", daemon=True)
+                self._writer.start()
+
+    def close(self: "EventTimeline") -> None:
+        """キューに積まれたイベントを保存し終えてから書き込みスレッドを停止する
+
+        タイムラインはFlightManagerを作り直しても共有するため、close後にpersistすると書き込みスレッドを再び開始する。
+        """
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            self._pending.put(None)
+            writer.join()
+
+    def _write_loop(self: "EventTimeline") -> None:
+        """キューのイベントをストアに保存し続ける（closeの合図を受け取ったら、それまでのイベントを保存して終了する）
+
+        保存中に積まれたイベントは次の保存でまとめて1回のコミットにする（グループコミット）。
+        """
+        while True:
+            batch = [self._pending.get()]
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    batch.append(self._pending.get_nowait())
+            records = [record for record in batch if record is not None]
+            if records:
+                self._store(records)
+            if len(records) < len(batch):
+                return
+
+    def _store(self: "EventTimeline", records: list[dict[str, Any]]) -> None:
+        """イベントを1回のコミットでストアに保存する（失敗した場合は記録して次の保存を続ける）"""
+        try:
+            self.store.insert_many(records)  # type: ignore[union-attr]
+        except Exception:
+            logger.exception("Failed to persist events %s-%s", records[0].get("sequence"), records[-1].get("sequence"))
@@ -0,0 +1,137 @@
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any
+
+from src.utils.commons.event_timeline import EventTimeline
+
+logger = logging.getLogger(__name__)
+
+
+class FlightRecordBuffer:
+    """飛行記録の末尾をシーケンス番号付きでメモリ上に保持するクラス
+
+    レコードには追加順に1から始まる連番(sequence)を付与する（タイムラインのストアに保存済みのイベントがある場合はその続きから）。
+    クライアントは受信済みの最後のシーケンス番号を送るだけで、それ以降に追加されたレコードのみを取得できる。
+    イベントを含むレコードは、同じシーケンス番号でEventTimelineにも追加する。
+    画面表示用のログ(display_log)だけのレコードはタイムラインには追加せず、タイムラインのストアにだけ保存する。
+    """
+
+    def __init__(self: "FlightRecordBuffer", max_records: int, timeline: EventTimeline | None = None) -> None:
+        """Initialize the FlightRecordBuffer class.
+
+        Args:
+            max_records (int): メモリ上に保持する最大レコード数。超えた分は古いものから破棄される
+            timeline (EventTimeline | None): イベントを追加するタイムライン。Noneならメモリ上にのみ保持するタイムラインを作成する
+        """
+        self._records: deque[dict[str, Any]] = deque(maxlen=max_records)
+        self.timeline = timeline if timeline is not None else EventTimeline()
+        self._lock = threading.Lock()  # add_event_logはスレッドプールからも呼ばれるためロックする
+        self.last_sequence = 0
+
+    def append(self: "FlightRecordBuffer", record: dict[str, Any], persist: bool = True) -> int:
+        """レコードを追加し、付与したシーケンス番号を返す
+
+        Args:
+            record (dict[str, Any]): 追加する飛行記録
+            persist (bool): イベント・画面表示用のログを含むレコードの場合、タイムラインのストアに保存するか
+
+        Returns:
+            int: 付与したシーケンス番号
+        """
+        with self._lock:
+            self.last_sequence += 1
+            record["sequence"] = self.last_sequence
+            self._records.append(record)
+            # スナップショットとイベントの追加がずれないよう、タイムラインへの追加もロック内で行う
+            if "event" in record:
+                self.timeline.append(record, persist)
+            elif "display_log" in record and persist:
+                self.timeline.persist(record)
+            return self.last_sequence
+
+    def extend(self: "FlightRecordBuffer", records: list[dict[str, Any]]) -> None:
+        """既存のログなど複数のレコードをまとめて追加する（イベント・画面表示用のログは保存済みのためストアには保存しない）"""
+        for record in records:
+            self.append(record, persist=False)
+
+    def restore(self: "FlightRecordBuffer", records: list[dict[str, Any]], stored_events: list[dict[str, Any]]) -> None:
+        """起動時に既存のログとストアに保存済みのイベントを読み込む
+
+        シーケンス番号はストアに保存済みの最大値の次から振り直し、ストアのイベントも振り直した番号に付け直す。
+        前回の起動で保存したイベントと、これから追加するイベントのシーケンス番号が重複しないようにするため。
+
+        Args:
+            records (list[dict[str, Any]]): 時刻順に並んだ読み込むレコード（stored_eventsを含む）
+            stored_events (list[dict[str, Any]]): recordsのうちタイムラインのストアから読み込んだイベント
+        """
+        store = self.timeline.store
+        stored_sequences = [record["sequence"] for record in stored_events]
+        if store is not None:
+            with self._lock:
+                self.last_sequence = max(self.last_sequence, store.max_sequence())
+        self.extend(records)
+        if store is not None:
+            store.resequence(dict(zip(stored_sequences, stored_events, strict=True)))
+
+    def snapshot_since(self: "FlightRecordBuffer", sequence: int) -> tuple[list[dict[str, Any]], list[dict[str, Any]], int]:
+        """指定したシーケンス番号より後に追加されたレコードとイベントを同時に取り出す
+
+        Args:
+            sequence (int): クライアントが受信済みの最後のシーケンス番号。0なら保持している全レコード
+
+        Returns:
+            tuple[list[dict[str, Any]], list[dict[str, Any]], int]:
+                - 追加順に並んだ飛行記録のリスト
+                - そのうちイベントを含むレコードのリスト
+                - 取り出した時点の最新シーケンス番号（クライアントが次に受信確認する値）
+        """
+        with self._lock:
+            records = self._slice_since(self._records, sequence)
+            events = self.timeline.since(sequence)
+            return records, events, self.last_sequence
+
+    @staticmethod
+    def _slice_since(records: deque[dict[str, Any]], sequence: int) -> list[dict[str, Any]]:
+        """連番で並んだdequeから指定番号より後の部分だけを取り出す"""
+        if not records:
+            return []
+        # シーケンス番号は連番なので先頭との差分で開始位置が求まる
+        start = max(0, sequence - records[0]["sequence"] + 1)
+        return list(islice(records, start, None))
+
+
+class TelemetryCursor:
+    """WebSocketクライアントごとの受信位置を管理するクラス"""
+
+    def __init__(self: "TelemetryCursor", incremental: bool, acked_sequence: int = 0) -> None:
+        """Initialize the TelemetryCursor class.
+
+        Args:
+            incremental (bool): Trueなら差分配信、Falseなら毎回全レコードを配信する
+            acked_sequence (int): クライアントが受信済みの最後のシーケンス番号（再接続時の再開位置）
+        """
+        self.incremental = incremental
+        self.acked_sequence = acked_sequence
+        self.delivered_sequence = acked_sequence  # 最後に送信したフレームのシーケンス番号
+
+    @property
+    def since(self: "TelemetryCursor") -> int:
+        """次のフレームで送信を開始するシーケンス番号"""
+        return self.delivered_sequence if self.incremental else 0
+
+    def delivered(self: "TelemetryCursor", sequence: int) -> None:
+        """フレームの送信完了を反映する"""
+        self.delivered_sequence = sequence
+
+    def ack(self: "TelemetryCursor", sequence: int) -> None:
+        """クライアントからの受信確認を反映する
+
+        送信済みの位置より前を受信確認した場合は、そこまで巻き戻して次のフレームで再送する。
+        """
+        sequence = max(0, sequence)
+        if sequence < self.delivered_sequence:
+            logger.info("Telemetry cursor rewound from %s to %s", self.delivered_sequence, sequence)
+            self.delivered_sequence = sequence
+        self.acked_sequence = sequence
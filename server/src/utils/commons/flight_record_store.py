@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import JSON, Column, Index, Integer, MetaData, String, Table, bindparam, create_engine, event, func, select, update
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+event_records = Table(
+    "event_records",
+    metadata,
+    Column("sequence", Integer, primary_key=True),
+    Column("time", String, nullable=False),
+    Column("launch_relative_time", Integer, nullable=False),
+    Column("record", JSON, nullable=False),
+    Index("ix_event_records_launch_relative_time", "launch_relative_time"),
+)
+
+# 更新・検索のキーとして使えるインデックス付きの列
+INDEXED_KEYS = ("sequence", "launch_relative_time")
+
+
+class FlightRecordStore:
+    """イベントレコードをSQLiteに保存するクラス
+
+    sequenceを主キー、launch_relative_timeをインデックスとして持つため、
+    レコードの検索と更新はファイル全体を読み書きせずにO(log n)で行える。
+    """
+
+    def __init__(self: "FlightRecordStore", database_url: str) -> None:
+        """Initialize the FlightRecordStore class.
+
+        Args:
+            database_url (str): SQLAlchemyのデータベースURL（例: "sqlite:///./flight_record.db"）
+        """
+        self.engine: Engine = create_engine(database_url)
+        event.listen(self.engine, "connect", self._configure_connection)
+        metadata.create_all(self.engine)
+        self._compaction_thread: threading.Thread | None = None
+
+    @staticmethod
+    def _configure_connection(dbapi_connection: Any, _: Any) -> None:  # noqa: ANN401
+        """SQLiteの接続ごとの設定を行う
+
+        WALモードで書き込み中も読み込みをブロックせず、incremental auto_vacuumで解放領域を後からまとめて回収できるようにする。
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    def insert(self: "FlightRecordStore", record: dict[str, Any]) -> None:
+        """レコードを追加する
+
+        Args:
+            record (dict[str, Any]): sequence、time、launch_relative_timeを含むレコード
+        """
+        self.insert_many([record])
+
+    def insert_many(self: "FlightRecordStore", records: list[dict[str, Any]]) -> None:
+        """複数のレコードを1つのトランザクション（1回のコミット）で追加する
+
+        Args:
+            records (list[dict[str, Any]]): sequence、time、launch_relative_timeを含むレコードのリスト
+        """
+        if not records:
+            return
+        rows = [
+            {
+                "sequence": record["sequence"],
+                "time": record["time"],
+                "launch_relative_time": record["launch_relative_time"],
+                "record": record,
+            }
+            for record in records
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(event_records.insert(), rows)
+
+    def max_sequence(self: "FlightRecordStore") -> int:
+        """保存済みのレコードの最大のシーケンス番号（レコードがなければ0）"""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(event_records.c.sequence))).scalar() or 0
+
+    def resequence(self: "FlightRecordStore", records: dict[int, dict[str, Any]]) -> None:
+        """保存済みのレコードのシーケンス番号を1つのトランザクションで付け直す
+
+        Args:
+            records (dict[int, dict[str, Any]]): 付け直す前のシーケンス番号と、新しいシーケンス番号を付与したレコードの辞書。
+                新しい番号は保存済みのどの番号とも重複しないこと（max_sequenceより大きい番号）
+        """
+        if not records:
+            return
+        rows = [
+            {"old_sequence": old_sequence, "new_sequence": record["sequence"], "new_record": record}
+            for old_sequence, record in records.items()
+        ]
+        statement = (
+            update(event_records)
+            .where(event_records.c.sequence == bindparam("old_sequence"))
+            .values(sequence=bindparam("new_sequence"), record=bindparam("new_record"))
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement, rows)
+
+    def update(self: "FlightRecordStore", key: str, target_value: int, new_data: dict[str, Any]) -> int:
+        """特定のキーと値に一致するレコードをその場で更新する
+
+        Args:
+            key (str): 検索するキー（"sequence" または "launch_relative_time"）
+            target_value (int): 更新したいレコードのキーの値
+            new_data (dict[str, Any]): 更新するデータの辞書
+
+        Returns:
+            int: 更新したレコード数
+        """
+        if key not in INDEXED_KEYS:
+            msg = f"Records can only be updated by an indexed key: {INDEXED_KEYS}"
+            raise ValueError(msg)
+
+        column = event_records.c[key]
+        with self.engine.begin() as conn:
+            rows = conn.execute(select(event_records.c.sequence, event_records.c.record).where(column == target_value)).all()
+            for sequence, record in rows:
+                conn.execute(update(event_records).where(event_records.c.sequence == sequence).values(record={**record, **new_data}))
+        return len(rows)
+
+    def find(self: "FlightRecordStore", key: str, target_value: int) -> list[dict[str, Any]]:
+        """特定のキーと値に一致するレコードを取得する"""
+        if key not in INDEXED_KEYS:
+            msg = f"Records can only be looked up by an indexed key: {INDEXED_KEYS}"
+            raise ValueError(msg)
+        with self.engine.connect() as conn:
+            query = select(event_records.c.record).where(event_records.c[key] == target_value).order_by(event_records.c.sequence)
+            return [row.record for row in conn.execute(query)]
+
+    def range(self: "FlightRecordStore", start: int | None = None, end: int | None = None) -> list[dict[str, Any]]:
+        """launch_relative_timeが start <= t <= end のレコードをsequence順に取得する（Noneは上限・下限なし）"""
+        query = select(event_records.c.record).order_by(event_records.c.sequence)
+        if start is not None:
+            query = query.where(event_records.c.launch_relative_time >= start)
+        if end is not None:
+            query = query.where(event_records.c.launch_relative_time <= end)
+        with self.engine.connect() as conn:
+            return [row.record for row in conn.execute(query)]
+
+    def compact(self: "FlightRecordStore") -> None:
+        """更新で解放されたページを回収し、WALファイルをデータベースに書き戻す"""
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA incremental_vacuum")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def start_compaction(self: "FlightRecordStore", interval: float) -> None:
+        """バックグラウンドで定期的にcompactを実行するスレッドを開始する"""
+        if self._compaction_thread is not None:
+            return
+        self._compaction_thread = threading.Thread(target=self._compaction_loop, args=(interval,), daemon=True)
+        self._compaction_thread.start()
+
+    def _compaction_loop(self: "FlightRecordStore", interval: float) -> None:
+        """compactを定期的に実行する"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("Failed to compact flight record store")
@@ -0,0 +1,324 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Generator, Iterator
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.settings.config import (
+    FLIGHT_RECORD_BUFFER_SIZE,
+    LOG_READ_CHUNK_SIZE,
+    REPLAY_LOOP,
+    REPLAY_MAX_GAP,
+    REPLAY_MAX_SPEED,
+    REPLAY_SPEED,
+    REPLAY_TICK_INTERVAL,
+    TELEMETRY_PRECISION,
+)
+from src.utils.commons.columnar_flight_log import ColumnarFlightLog
+from src.utils.commons.flight_record_buffer import FlightRecordBuffer
+from src.utils.commons.log_manager import LogManager
+from src.utils.commons.telemetry_selection import ALL_PLAN, ComputePlan
+
+if TYPE_CHECKING:
+    from src.model import LaunchCommand, ReplayCommand
+    from src.utils.commons.flight_record_store import FlightRecordStore
+
+logger = logging.getLogger(__name__)
+
+# vessel_telemetryのグループごとに、飛行記録から復元できるフィールド（グループのフィールド名 -> 飛行記録のフィールド名）
+REPLAY_VESSEL_FIELDS: dict[str, dict[str, str]] = {
+    "surface_info": {
+        "altitude_true": "altitude",
+        "heading": "heading",
+        "latitude": "latitude",
+        "longitude": "longitude",
+    },
+    "orbit_info": {
+        "orbital_speed": "orbital_speed",
+        "apoapsis_altitude": "apoapsis_altitude",
+        "periapsis_altitude": "periapsis_altitude",
+        "inclination": "inclination",
+        "eccentricity": "eccentricity",
+    },
+}
+
+
+def record_timestamp(record: dict[str, Any]) -> float:
+    """飛行記録のtime（ISO 8601）をUNIX時間（秒）に変換する"""
+    return datetime.fromisoformat(record["time"]).timestamp()
+
+
+class ReplaySource:
+    """記録済みのログから飛行記録を時刻順に読み込むクラス
+
+    拡張子が.binのファイルはバイナリログ（ColumnarFlightLog）、それ以外はJSON Linesのログとして読む。
+    どちらもチャンクごとに読み込むため、ログの大きさによらずメモリ使用量は一定で、指定した時刻への移動は二分探索で行う。
+    """
+
+    def __init__(self: "ReplaySource", log_file_path: Path, store: "FlightRecordStore | None" = None) -> None:
+        """Initialize the ReplaySource class.
+
+        Args:
+            log_file_path (Path): 再生するログファイルのパス
+            store (FlightRecordStore | None): バイナリログにはイベントが含まれないため、バイナリログと一緒に再生するイベントのストア
+
+        Raises:
+            FileNotFoundError: ログファイルがない場合
+        """
+        if not log_file_path.exists():
+            msg = f"Replay log file not found: {log_file_path}"
+            raise FileNotFoundError(msg)
+        self.log_file_path = log_file_path
+        self.flight_log = ColumnarFlightLog(log_file_path, precision=TELEMETRY_PRECISION) if log_file_path.suffix == ".bin" else None
+        self.events: list[dict[str, Any]] = []
+        if self.flight_log is not None and store is not None:
+            self.events = sorted(store.range(), key=record_timestamp)
+
+    def records(self: "ReplaySource", start_time: float | None = None) -> Generator[dict[str, Any], None, None]:
+        """start_time（UNIX時間）以降の飛行記録を時刻順に返すジェネレーター。Noneならログの先頭から"""
+        if self.flight_log is None:
+            offset = None if start_time is None else self._seek_offset(start_time)
+            for chunk in LogManager.iter_log_records(self.log_file_path, offset=offset):
+                for record in chunk.records:
+                    if start_time is None or record_timestamp(record) >= start_time:
+                        yield record
+            return
+        events = [event for event in self.events if start_time is None or record_timestamp(event) >= start_time]
+        yield from heapq.merge(self._binary_records(start_time), events, key=record_timestamp)
+
+    def _binary_records(self: "ReplaySource", start_time: float | None) -> Iterator[dict[str, Any]]:
+        """バイナリログのstart_time以降のレコードを読み込む（開始位置はtime列の二分探索で求める）"""
+        if self.flight_log is None or len(self.flight_log) == 0:
+            return
+        offset = None
+        if start_time is not None:
+            with self.flight_log.open_view() as view:
+                offset, _ = view.range_by("time", start_time, math.inf)
+        for chunk in self.flight_log.iter_records(offset=offset):
+            yield from chunk.records
+
+    def _seek_offset(self: "ReplaySource", start_time: float) -> int:
+        """JSON Linesのログで、start_timeより前のレコードだけが手前にあるバイト位置を二分探索で求める"""
+        low, high = 0, self.log_file_path.stat().st_size
+        while low < high:
+            middle = (low + high) // 2
+            chunk = next(LogManager.iter_log_records(self.log_file_path, offset=middle, chunk_size=1), None)
+            if chunk is None or record_timestamp(chunk.records[0]) >= start_time:
+                high = middle
+            else:
+                low = chunk.end
+        return low
+
+
+class ReplayFlightManager:
+    """記録済みのログを再生し、FlightManagerの代わりにテレメトリを提供するクラス
+
+    TelemetryBroadcasterが使うFlightManagerのインターフェース（flight_records、get_telemetry、close）を実装するため、
+    KSPに接続せずに/ws/launch-managementのテレメトリ配信（差分配信・イベントの即時配信を含む）をそのまま動かせる。
+    飛行記録はログ上の時刻に合わせて、再生速度の倍率（実時間〜REPLAY_MAX_SPEED倍）でメモリ上のバッファに追加する。
+    ログに記録されていないロケットの状態（rocket_status）はNone、vessel_telemetryは飛行記録から復元できるフィールドのみを返す。
+    """
+
+    def __init__(
+        self: "ReplayFlightManager",
+        log_file_path: Path,
+        store: "FlightRecordStore | None" = None,
+        speed: float = REPLAY_SPEED,
+        loop: bool = REPLAY_LOOP,
+    ) -> None:
+        """Initialize the ReplayFlightManager class.
+
+        Args:
+            log_file_path (Path): 再生するログファイルのパス（JSON Lines、または拡張子.binのバイナリログ）
+            store (FlightRecordStore | None): バイナリログと一緒に再生するイベントのストア
+            speed (float): 再生速度の倍率（1で実時間）
+            loop (bool): ログの最後まで再生したら先頭から繰り返すか
+
+        Raises:
+            FileNotFoundError: ログファイルがない場合
+            ValueError: 再生速度が範囲外の場合
+        """
+        self.source = ReplaySource(log_file_path, store)
+        self.loop = loop
+        self.speed = self._validate_speed(speed)
+        # 再生した飛行記録はメモリ上にのみ保持する（イベントもストアには保存しない）
+        self.flight_records = FlightRecordBuffer(FLIGHT_RECORD_BUFFER_SIZE)
+        self.launch_relative_time = 0
+        self.is_launching = False
+        self.latest: dict[str, Any] | None = None
+        # 再生位置の基準（ログ上の時刻, その時点のtime.monotonic()）。Noneなら次に再生するレコードを基準にする
+        self._anchor: tuple[float, float] | None = None
+        self._seek_to: float | None = None
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _validate_speed(speed: float) -> float:
+        """再生速度の倍率が 0 < speed <= REPLAY_MAX_SPEED であることを確認する"""
+        if not 0 < speed <= REPLAY_MAX_SPEED:
+            msg = f"Invalid replay speed {speed}. Specify a multiplier in (0, {REPLAY_MAX_SPEED}]."
+            raise ValueError(msg)
+        return speed
+
+    def now(self: "ReplayFlightManager") -> float:
+        """再生中のログ上の時刻（UNIX時間）。再生前は現在時刻"""
+        if self._anchor is None:
+            return time.time()
+        log_time, started = self._anchor
+        return log_time + (time.monotonic() - started) * self.speed
+
+    def start(self: "ReplayFlightManager") -> None:
+        """再生のタスクを開始する"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self: "ReplayFlightManager") -> None:
+        """再生のタスクを停止する"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def set_speed(self: "ReplayFlightManager", speed: float) -> None:
+        """再生速度の倍率を変更する（現在の再生位置から新しい速度で進める）"""
+        speed = self._validate_speed(speed)
+        if self._anchor is not None:
+            self._anchor = (self.now(), time.monotonic())
+        self.speed = speed
+        self._changed.set()
+        logger.info("Replay speed set to %sx", speed)
+
+    def seek(self: "ReplayFlightManager", log_time: float) -> None:
+        """ログ上の時刻（UNIX時間）に再生位置を移動する"""
+        self._seek_to = log_time
+        self._changed.set()
+        logger.info("Replay seeking to %s", datetime.fromtimestamp(log_time, timezone.utc).isoformat())
+
+    def seek_launch_relative_time(self: "ReplayFlightManager", launch_relative_time: int) -> None:
+        """再生中の飛行の打ち上げ相対時刻（秒）に再生位置を移動する
+
+        Raises:
+            ValueError: まだレコードを再生していない場合
+        """
+        if self.latest is None:
+            msg = "Cannot seek by launch relative time before any record has been replayed."
+            raise ValueError(msg)
+        launch_time = record_timestamp(self.latest) - self.latest.get("launch_relative_time", 0)
+        self.seek(launch_time + launch_relative_time)
+
+    def control(self: "ReplayFlightManager", command: "ReplayCommand") -> None:
+        """WebSocketクライアントからの再生の操作コマンドを実行する"""
+        if command.speed is not None:
+            self.set_speed(command.speed)
+        if command.launch_relative_time is not None:
+            self.seek_launch_relative_time(command.launch_relative_time)
+
+    async def sequence_start(self: "ReplayFlightManager", command_data: "LaunchCommand") -> None:
+        """再生モードでは打ち上げシーケンスを実行しない"""
+        logger.info("Ignored sequence command for %s in replay mode", command_data.launch_date)
+
+    async def run(self: "ReplayFlightManager") -> None:
+        """ログ上の時刻に合わせて飛行記録を読み込み、バッファに追加し続ける"""
+        pending: deque[dict[str, Any]] = deque()
+        records: Generator[dict[str, Any], None, None] | None = None
+        while True:
+            if records is None or self._seek_to is not None:
+                if records is not None:
+                    records.close()
+                start, self._seek_to = self._seek_to, None
+                records = self.source.records(start)
+                pending.clear()
+                self._anchor = None if start is None else (start, time.monotonic())
+            if not pending:
+                pending.extend(await asyncio.to_thread(self._read_ahead, records))
+                if not pending:
+                    await self._reached_end()
+                    if self.loop:
+                        records.close()
+                        records = None
+                    continue
+
+            next_time = record_timestamp(pending[0])
+            if self._anchor is None or next_time - self.now() > REPLAY_MAX_GAP:
+                # 再生の開始時と、ログ上の記録の空白（飛行の間など）は待たずに次のレコードから進める
+                self._anchor = (next_time, time.monotonic())
+            now = self.now()
+            while pending and record_timestamp(pending[0]) <= now:
+                self.play(pending.popleft())
+            if pending:
+                # 記録の空白の間は待ち続けず、REPLAY_MAX_GAPだけ待ってから次のレコードに進める
+                await self._wait(min(record_timestamp(pending[0]) - now, REPLAY_MAX_GAP) / self.speed)
+
+    @staticmethod
+    def _read_ahead(records: Iterator[dict[str, Any]]) -> list[dict[str, Any]]:
+        """次に再生するレコードをLOG_READ_CHUNK_SIZE件まで読み込む（ファイルの読み込みはスレッドで行う）"""
+        return list(islice(records, LOG_READ_CHUNK_SIZE))
+
+    async def _reached_end(self: "ReplayFlightManager") -> None:
+        """ログの最後まで再生した場合の処理。繰り返さない場合は次の操作（seek）まで待つ"""
+        if self.loop:
+            logger.info("Replay reached the end of %s, restarting", self.source.log_file_path)
+            await asyncio.sleep(REPLAY_TICK_INTERVAL)
+            return
+        logger.info("Replay reached the end of %s", self.source.log_file_path)
+        self._changed.clear()
+        await self._changed.wait()
+
+    async def _wait(self: "ReplayFlightManager", delay: float) -> None:
+        """次のレコードの時刻まで待つ。高速再生時はREPLAY_TICK_INTERVALごとにまとめて再生し、速度の変更・seekがあればすぐに戻る"""
+        self._changed.clear()
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._changed.wait(), max(delay, REPLAY_TICK_INTERVAL))
+
+    def play(self: "ReplayFlightManager", record: dict[str, Any]) -> None:
+        """1件の飛行記録を再生する（イベントを含むレコードはタイムラインのリスナーに通知される）"""
+        record = dict(record)
+        self.launch_relative_time = record.get("launch_relative_time", self.launch_relative_time)
+        self.flight_records.append(record, persist=False)
+        self.latest = record
+
+    async def get_telemetry(self: "ReplayFlightManager", since: int = 0, plan: ComputePlan | None = None) -> dict:
+        """再生中の時刻のテレメトリを返す（FlightManager.get_telemetryと同じ形式）
+
+        Args:
+            since (int): クライアントが受信済みの最後のシーケンス番号。0なら保持している全レコードを返す
+            plan (ComputePlan | None): 取得するセクションとグループ。Noneなら全て
+        """
+        plan = ALL_PLAN if plan is None else plan
+        self.start()
+        telemetry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(self.now(), timezone.utc).isoformat(),
+            "launch_relative_time": self.launch_relative_time,
+            "sequence": self.flight_records.last_sequence,
+        }
+        if "flight_records" in plan:
+            flight_records, event_records, sequence = self.flight_records.snapshot_since(since)
+            telemetry.update(sequence=sequence, flight_records=flight_records, event_records=event_records)
+        if "rocket_status" in plan:
+            telemetry["rocket_status"] = None
+        if "vessel_telemetry" in plan:
+            telemetry["vessel_telemetry"] = self.get_vessel_telemetry(plan["vessel_telemetry"])
+        return telemetry
+
+    def get_vessel_telemetry(self: "ReplayFlightManager", groups: frozenset[str] | None = None) -> dict | None:
+        """最後に再生した飛行記録から、vessel_telemetryのうち復元できるグループとフィールドを返す"""
+        if self.latest is None:
+            return None
+        telemetry = {}
+        for group, fields in REPLAY_VESSEL_FIELDS.items():
+            if groups is None or group in groups:
+                telemetry[group] = {field: self.latest.get(record_field) for field, record_field in fields.items()}
+        orbit_info = telemetry.get("orbit_info")
+        if orbit_info is not None and orbit_info["inclination"] is not None:
+            # 飛行記録の軌道傾斜角はラジアン、orbit_infoは度
+            orbit_info["inclination"] = math.degrees(orbit_info["inclination"])
+        return telemetry
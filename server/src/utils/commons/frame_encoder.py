@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class FrameEncoder:
+    """テレメトリフレームをシリアライズするエンコーダーの基底クラス
+
+    Attributes:
+        name (str): クエリパラメータで指定するエンコーダー名
+        binary (bool): Trueならバイナリフレーム、Falseならテキストフレームとして送信する
+    """
+
+    name = "json"
+    binary = False
+
+    def encode(self: "FrameEncoder", frame: dict[str, Any]) -> str | bytes:
+        """フレームをシリアライズする"""
+        return json.dumps(frame, separators=(",", ":"))
+
+
+class OrjsonFrameEncoder(FrameEncoder):
+    """orjsonでシリアライズするエンコーダー（出力はjsonと互換のテキストフレーム）"""
+
+    name = "orjson"
+
+    def __init__(self: "OrjsonFrameEncoder") -> None:
+        """Initialize the OrjsonFrameEncoder class."""
+        import orjson  # orjsonはオプションの依存関係のため使用時に読み込む
+
+        self._dumps = orjson.dumps
+
+    def encode(self: "OrjsonFrameEncoder", frame: dict[str, Any]) -> str:
+        """フレームをシリアライズする"""
+        return self._dumps(frame).decode()
+
+
+class MsgpackFrameEncoder(FrameEncoder):
+    """MessagePackでシリアライズするエンコーダー（バイナリフレーム）"""
+
+    name = "msgpack"
+    binary = True
+
+    def __init__(self: "MsgpackFrameEncoder") -> None:
+        """Initialize the MsgpackFrameEncoder class."""
+        import msgpack  # msgpackはオプションの依存関係のため使用時に読み込む
+
+        self._packb = msgpack.packb
+
+    def encode(self: "MsgpackFrameEncoder", frame: dict[str, Any]) -> bytes:
+        """フレームをシリアライズする"""
+        return self._packb(frame, use_bin_type=True)
+
+
+FRAME_ENCODERS: dict[str, type[FrameEncoder]] = {
+    encoder.name: encoder for encoder in (FrameEncoder, OrjsonFrameEncoder, MsgpackFrameEncoder)
+}
+
+# 生成済みのエンコーダー。全接続で共有し、同じ形式のフレームは1回だけエンコードする
+_encoder_cache: dict[str, FrameEncoder] = {}
+
+
+def get_frame_encoder(name: str) -> FrameEncoder:
+    """名前に対応するエンコーダーを返す
+
+    Args:
+        name (str): エンコーダー名（"json"、"orjson"、"msgpack"）
+
+    Returns:
+        FrameEncoder: 共有のエンコーダーインスタンス
+
+    Raises:
+        ValueError: 未知のエンコーダー名、または必要なライブラリがインストールされていない場合
+    """
+    if name in _encoder_cache:
+        return _encoder_cache[name]
+
+    encoder_class = FRAME_ENCODERS.get(name)
+    if encoder_class is None:
+        msg = f"Unknown frame format '{name}'. Available: {', '.join(FRAME_ENCODERS)}"
+        raise ValueError(msg)
+    try:
+        encoder = encoder_class()
+    except ImportError as e:
+        msg = f"Frame format '{name}' is not available: {e}"
+        raise ValueError(msg) from e
+
+    _encoder_cache[name] = encoder
+    return encoder
@@ -0,0 +1,77 @@
+import logging
+from collections.abc import Collection
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class RecordFilter:
+    """ログのストリーミング読み込みで、読み込み時に適用するレコードの絞り込み"""
+
+    def __init__(
+        self: "RecordFilter",
+        key: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+        fields: Collection[str] | None = None,
+    ) -> None:
+        """Initialize the RecordFilter class.
+
+        Args:
+            key (str | None): 指定した場合、このキーを含むレコードだけを読み込む（例: "event"）
+            start (int | None): launch_relative_timeの下限（含む）。Noneなら下限なし
+            end (int | None): launch_relative_timeの上限（含む）。Noneなら上限なし
+            fields (Collection[str] | None): 指定した場合、レコードをこのフィールドだけに絞る
+        """
+        self.key = key
+        self.start = start
+        self.end = end
+        self.fields = None if fields is None else frozenset(fields)
+
+    @property
+    def has_time_range(self: "RecordFilter") -> bool:
+        """launch_relative_timeの範囲を指定しているか"""
+        return self.start is not None or self.end is not None
+
+    def in_range(self: "RecordFilter", launch_relative_time: float | None) -> bool:
+        """launch_relative_timeが範囲内か（範囲を指定していない場合は常にTrue）"""
+        if not self.has_time_range:
+            return True
+        if launch_relative_time is None:
+            return False
+        return (self.start is None or self.start <= launch_relative_time) and (self.end is None or launch_relative_time <= self.end)
+
+    def apply(self: "RecordFilter", record: dict[str, Any]) -> dict[str, Any] | None:
+        """条件に一致しないレコードはNone、一致するレコードはフィールドを絞って返す"""
+        if self.key is not None and self.key not in record:
+            return None
+        if not self.in_range(record.get("launch_relative_time")):
+            return None
+        if self.fields is None:
+            return record
+        return {key: value for key, value in record.items() if key in self.fields}
+
+
+class LogChunk:
+    """ログのストリーミング読み込みで返す、レコードのまとまりとログ上の位置
+
+    位置はJSON Linesのログではバイトオフセット、バイナリログではレコード番号で、
+    start <= 位置 < end の範囲を読み込んだ結果がrecordsになる。
+    続きを読む場合は、前方向ならendを、後ろ方向ならstartを次の読み込みのoffsetに渡す。
+    """
+
+    def __init__(self: "LogChunk", records: list[dict[str, Any]], start: int, end: int) -> None:
+        """Initialize the LogChunk class.
+
+        Args:
+            records (list[dict[str, Any]]): 絞り込み後のレコード（後ろ方向の読み込みでは新しい順）
+            start (int): 読み込んだ範囲の開始位置
+            end (int): 読み込んだ範囲の終了位置（含まない）
+        """
+        self.records = records
+        self.start = start
+        self.end = end
+
+    def __len__(self: "LogChunk") -> int:
+        """レコード数"""
+        return len(self.records)
@@ -1,9 +1,12 @@
+import asyncio
 import json
 import logging
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
-import aiofiles
+from src.settings.config import LOG_READ_BLOCK_SIZE, LOG_READ_CHUNK_SIZE
+from src.utils.commons.log_chunk import LogChunk, RecordFilter
 
 logger = logging.getLogger(__name__)
 
@@ -11,120 +14,147 @@ logger = logging.getLogger(__name__)
 class LogManager:
     """ログファイルを管理するクラス"""
 
-    @staticmethod
-    def save_to_log_sync(data: dict[str, Any], log_file_path: Path) -> None:
-        """同期版: ログファイルにデータを保存する"""
-        with log_file_path.open("a") as f:
-            f.write(json.dumps(data) + "\n")
-
-    @staticmethod
-    async def save_to_log_async(data: dict[str, Any], log_file_path: Path) -> None:
-        """非同期版: ログファイルにデータを保存する"""
-        async with aiofiles.open(log_file_path, "a") as f:
-            await f.write(json.dumps(data) + "\n")
-
     @staticmethod
     def read_log_file_sync(log_file_path: Path) -> list[dict[str, Any]]:
         """同期版: ログファイルを読み込み、JSONオブジェクトのリストとして返す関数"""
-        try:
-            with log_file_path.open("r") as file:
-                return [json.loads(line) for line in file]
-        except FileNotFoundError:
-            logger.exception("Log file not found")
-            return []
+        return [record for chunk in LogManager.iter_log_records(log_file_path) for record in chunk.records]
 
     @staticmethod
     async def read_log_file_async(log_file_path: Path) -> list[dict[str, Any]]:
         """非同期版: ログファイルを読み込み、JSONオブジェクトのリストとして返す関数"""
-        try:
-            async with aiofiles.open(log_file_path, "r") as file:
-                return [json.loads(line) async for line in file]
-        except FileNotFoundError:
-            logger.exception("Log file not found")
-            return []
+        return [record async for chunk in LogManager.iterate_async(LogManager.iter_log_records(log_file_path)) for record in chunk.records]
 
     @staticmethod
     async def read_log_file_with_key_async(log_file_path: Path, key: str) -> list[dict[str, Any]]:
         """特定のキーが存在するレコードのみを非同期で取得する関数"""
-        logs = []
-        try:
-            async with aiofiles.open(log_file_path, "r") as file:
-                async for line in file:
-                    line = line.strip()
-                    if not line:  # 空行をスキップ
-                        continue
-                    try:
-                        record = json.loads(line)
-                        if key in record:
-                            logs.append(record)
-                    except json.JSONDecodeError:
-                        logger.warning(f"Skipping invalid JSON line: {line}")
-        except FileNotFoundError:
-            logger.exception("Log file not found")
-        return logs
+        chunks = LogManager.iter_log_records(log_file_path, RecordFilter(key=key))
+        return [record async for chunk in LogManager.iterate_async(chunks) for record in chunk.records]
 
     @staticmethod
-    def truncate_to_seconds(iso_timestamp: str) -> str:
-        """ISO 8601タイムスタンプを秒単位までにトリミングする"""
-        return iso_timestamp[:19]
-
-    @staticmethod
-    def update_log_record_sync(log_file_path: Path, key: str, target_value: str | int, new_data: dict[str, Any]) -> None:
-        """同期版: 特定の時間のログレコードを更新する関数"""
-        logs = []
-        new_record = None
+    def iter_log_records(
+        log_file_path: Path,
+        record_filter: RecordFilter | None = None,
+        offset: int | None = None,
+        reverse: bool = False,
+        chunk_size: int = LOG_READ_CHUNK_SIZE,
+    ) -> Iterator[LogChunk]:
+        """ログファイルをchunk_size件ずつ読み込むジェネレーター
+
+        ファイル全体を読み込まずに1行ずつ（後ろ方向はLOG_READ_BLOCK_SIZEごとに）読むため、メモリ使用量はチャンクの大きさで決まる。
+        書き込み途中の（改行で終わらない）最後の行は読み込まない。不正なJSONの行は警告を出して読み飛ばす。
 
+        Args:
+            log_file_path (Path): JSON Linesのログファイルのパス
+            record_filter (RecordFilter | None): 読み込み時に適用する絞り込み
+            offset (int | None): 前方向ならこのバイト位置から（行の途中なら次の行から）、後ろ方向ならこのバイト位置より前を読む。
+                Noneなら前方向はファイルの先頭から、後ろ方向は末尾から
+            reverse (bool): Trueなら末尾から先頭に向かって新しい順に読む
+            chunk_size (int): 1つのチャンクに含める最大レコード数
+
+        Yields:
+            LogChunk: 絞り込み後のレコードとバイト範囲。レコードがないチャンクは返さない
+        """
+        record_filter = record_filter or RecordFilter()
         try:
-            with log_file_path.open("r") as file:
-                for line in file:
-                    record: dict = json.loads(line)
-                    if record.get(key) == target_value:
-                        new_record = record.copy()
-                        new_record.update(new_data)
-                    logs.append(record)
-                if new_record:
-                    logs.append(new_record)
+            file = log_file_path.open("rb")
         except FileNotFoundError:
             logger.exception("Log file not found")
             return
+        with file:
+            if reverse:
+                yield from LogManager._iter_lines_reverse(file, record_filter, offset, chunk_size)
+            else:
+                yield from LogManager._iter_lines(file, record_filter, offset or 0, chunk_size)
 
+    @staticmethod
+    async def iterate_async(chunks: Iterator[LogChunk]) -> AsyncIterator[LogChunk]:
+        """非同期版: 同期版のジェネレーターをスレッドで1チャンクずつ進め、ファイルの読み込みでイベントループを止めない"""
         try:
-            with log_file_path.open("w") as file:
-                for record in logs:
-                    file.write(json.dumps(record) + "\n")
-        except Exception:
-            logger.exception("Failed to write to log file")
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                yield chunk
+        finally:
+            chunks.close()
 
     @staticmethod
-    async def update_log_record_async(log_file_path: Path, key: str, target_value: str | int, new_data: dict[str, Any]) -> None:
-        """非同期版: 特定のキーと値に基づいてログレコードを更新する関数
+    def _iter_lines(file: IO[bytes], record_filter: RecordFilter, offset: int, chunk_size: int) -> Iterator[LogChunk]:
+        """ログファイルを前方向に読む"""
+        if offset > 0:
+            file.seek(offset - 1)
+            if file.read(1) != b"\n":
+                file.readline()
+        position = start = file.tell()
+        records: list[dict[str, Any]] = []
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            position += len(line)
+            record = LogManager._parse_line(line, record_filter)
+            if record is not None:
+                records.append(record)
+                if len(records) >= chunk_size:
+                    yield LogChunk(records, start, position)
+                    records, start = [], position
+        if records:
+            yield LogChunk(records, start, position)
 
-        Args:
-            log_file_path (Path): ログファイルのパス
-            key (str): 更新したいレコードのキー
-            target_value (Any): 更新したいレコードのキーの値
-            new_data (Dict[str, Any]): 更新するデータの辞書
-        """
-        logs = []
-        new_record = None
+    @staticmethod
+    def _iter_lines_reverse(file: IO[bytes], record_filter: RecordFilter, offset: int | None, chunk_size: int) -> Iterator[LogChunk]:
+        """ログファイルを後ろ方向に、LOG_READ_BLOCK_SIZEずつ読み込みながら新しい順に読む"""
+        size = file.seek(0, 2)
+        position = size if offset is None else min(offset, size)
+        # bufferはファイル上の [position, cursor) の内容で、改行で終わる完全な行だけを保持する
+        cursor = position
+        buffer = b""
+        trimmed = False
+        end = cursor
+        records: list[dict[str, Any]] = []
+        while position > 0 or buffer:
+            if position > 0:
+                read_size = min(LOG_READ_BLOCK_SIZE, position)
+                position -= read_size
+                file.seek(position)
+                buffer = file.read(read_size) + buffer
+            if not trimmed:
+                # 書き込み途中の最後の行を除く
+                newline = buffer.rfind(b"\n")
+                if newline < 0 and position > 0:
+                    continue
+                cursor -= len(buffer) - (newline + 1)
+                buffer = buffer[: newline + 1]
+                end = cursor
+                trimmed = True
+            while buffer:
+                newline = buffer.rfind(b"\n", 0, len(buffer) - 1)
+                if newline < 0 and position > 0:
+                    break
+                line = buffer[newline + 1 :]
+                buffer = buffer[: newline + 1]
+                cursor -= len(line)
+                record = LogManager._parse_line(line, record_filter)
+                if record is not None:
+                    records.append(record)
+                    if len(records) >= chunk_size:
+                        yield LogChunk(records, cursor, end)
+                        records, end = [], cursor
+        if records:
+            yield LogChunk(records, cursor, end)
 
+    @staticmethod
+    def _parse_line(line: bytes, record_filter: RecordFilter) -> dict[str, Any] | None:
+        """1行をJSONとして読み込み、絞り込みを適用する（キーで絞り込む場合、キーを含まない行はJSONとして読み込まない）"""
+        line = line.strip()
+        if not line:  # 空行をスキップ
+            return None
+        if record_filter.key is not None and f'"{record_filter.key}"'.encode() not in line:
+            return None
         try:
-            async with aiofiles.open(log_file_path, "r") as file:
-                async for line in file:
-                    record: dict = json.loads(line)
-                    if record.get(key) == target_value:
-                        new_record = record.copy()
-                        new_record.update(new_data)
-                    logs.append(record)
-                if new_record:
-                    logs.append(new_record)
-        except FileNotFoundError:
-            logger.exception("Log file not found")
-            return
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping invalid JSON line: {line}")
+            return None
+        return record_filter.apply(record) if isinstance(record, dict) else None
 
-        try:
-            async with aiofiles.open(log_file_path, "w") as file:
-                for record in logs:
-                    await file.write(json.dumps(record) + "\n")
-        except Exception:
-            logger.exception("Failed to write to log file")
+    @staticmethod
+    def truncate_to_seconds(iso_timestamp: str) -> str:
+        """ISO 8601タイムスタンプを秒単位までにトリミングする"""
+        return iso_timestamp[:19]
@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import IO
+
+from src.settings.config import LOG_WRITER_BATCH_BYTES, LOG_WRITER_FLUSH_INTERVAL, LOG_WRITER_FSYNC, LOG_WRITER_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+class LogWriter:
+    """ログファイルへの追記を専用のスレッドでまとめて行うクラス
+
+    writeはバイト列をメモリ上のキューに積むだけで、書き込みスレッドがLOG_WRITER_BATCH_BYTESたまるか、
+    最初の書き込みからLOG_WRITER_FLUSH_INTERVAL秒たった時点で、たまったバイト列を1回の書き込みで追記する（グループコミット）。
+    ファイルは開いたままにし、max_bytesを超える場合は<ファイル名>.1, .2, ...に名前を変更して新しいファイルに切り替える。
+    1回のwriteで積んだバイト列は分割せずに同じファイルに書き込む。
+    """
+
+    def __init__(
+        self: "LogWriter",
+        log_file_path: Path,
+        header: bytes = b"",
+        fsync: bool = LOG_WRITER_FSYNC,
+        max_bytes: int = LOG_WRITER_MAX_BYTES,
+    ) -> None:
+        """Initialize the LogWriter class.
+
+        Args:
+            log_file_path (Path): ログファイルのパス
+            header (bytes): 空のファイル（切り替えた新しいファイルを含む）の先頭に書き込むバイト列
+            fsync (bool): 書き込みごとにfsyncしてディスクへの書き込みを待つか
+            max_bytes (int): ファイルを切り替えるサイズ（バイト）。0なら切り替えない
+        """
+        self.log_file_path = log_file_path
+        self.header = header
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self._condition = threading.Condition()
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._first_pending_at = 0.0
+        self._closed = False
+        self._file: IO[bytes] | None = None
+        self._thread = threading.Thread(target=self._write_loop, name=f"log-writer-{log_file_path.name}", daemon=True)
+        self._thread.start()
+
+    def write(self: "LogWriter", data: bytes) -> None:
+        """バイト列を書き込みのキューに積む（書き込みは待たない）
+
+        Raises:
+            ValueError: close済みの場合
+        """
+        with self._condition:
+            if self._closed:
+                msg = f"Log writer for {self.log_file_path} is closed."
+                raise ValueError(msg)
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+                self._condition.notify_all()
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            if self._pending_bytes >= LOG_WRITER_BATCH_BYTES:
+                self._condition.notify_all()
+
+    def close(self: "LogWriter") -> None:
+        """残りのバイト列を書き込み、ファイルを閉じて書き込みスレッドを終了する"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _ready(self: "LogWriter") -> bool:
+        """書き込むべきバイト列があるか（またはcloseされたか）"""
+        if self._closed:
+            return True
+        if not self._pending:
+            return False
+        if self._pending_bytes >= LOG_WRITER_BATCH_BYTES:
+            return True
+        return time.monotonic() >= self._first_pending_at + LOG_WRITER_FLUSH_INTERVAL
+
+    def _write_loop(self: "LogWriter") -> None:
+        """たまったバイト列をまとめて書き込み続ける"""
+        while True:
+            with self._condition:
+                while not self._ready():
+                    timeout = self._first_pending_at + LOG_WRITER_FLUSH_INTERVAL - time.monotonic() if self._pending else None
+                    self._condition.wait(timeout)
+                chunks, self._pending, self._pending_bytes = self._pending, [], 0
+                closing = self._closed
+            if chunks:
+                self._write_batch(chunks)
+            if closing:
+                self._close_file()
+                return
+
+    def _write_batch(self: "LogWriter", chunks: list[bytes]) -> None:
+        """バイト列をまとめて追記する（失敗した場合は記録して次の書き込みを続ける）"""
+        try:
+            f = self._open(sum(len(chunk) for chunk in chunks))
+            f.write(b"".join(chunks))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Failed to write %d bytes to %s", sum(len(chunk) for chunk in chunks), self.log_file_path)
+            self._close_file()
+
+    def _open(self: "LogWriter", size: int) -> IO[bytes]:
+        """書き込み先のファイルを返す。max_bytesを超える場合はファイルを切り替える"""
+        if self._file is None:
+            self._file = self._open_path()
+        if self.max_bytes and self._file.tell() > len(self.header) and self._file.tell() + size > self.max_bytes:
+            self._close_file()
+            self._rotate(self.log_file_path)
+            self._file = self._open_path()
+        return self._file
+
+    def _open_path(self: "LogWriter") -> IO[bytes]:
+        """ファイルを追記モードで開き、空のファイルにはヘッダーを書き込む（ディレクトリがなければ作る）"""
+        self.log_file_path.parent.mkdir(parents=True, exist_ok=True)
+        f = self.log_file_path.open("ab")
+        if f.tell() == 0 and self.header:
+            f.write(self.header)
+        return f
+
+    @staticmethod
+    def _rotate(path: Path) -> None:
+        """ファイルを空いている連番（<ファイル名>.1, .2, ...）に名前を変更する（番号が小さいほど古い）"""
+        index = 1
+        while path.with_name(f"{path.name}.{index}").exists():
+            index += 1
+        path.rename(path.with_name(f"{path.name}.{index}"))
+        logger.info("Rotated log file %s to %s.%d", path, path.name, index)
+
+    def _close_file(self: "LogWriter") -> None:
+        """開いているファイルを閉じる"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
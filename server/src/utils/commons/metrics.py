@@ -0,0 +1,231 @@
+import abc
+import bisect
+import logging
+import math
+import threading
+from collections.abc import Callable
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+MetricT = TypeVar("MetricT", bound="Metric")
+
+# RPCやtickの処理時間に使うヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple[str, ...], extra: str = "") -> str:
+    """Prometheusのラベル表記（{a="x",b="y"}）を作成する"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    """ラベル値をエスケープする"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """サンプル値をPrometheusの数値表記にする"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    """ラベルごとに値を保持するメトリクスの基底クラス"""
+
+    kind = "untyped"
+
+    def __init__(self: "Metric", name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the Metric class.
+
+        Args:
+            name (str): メトリクス名
+            documentation (str): HELPに出力する説明
+            labelnames (tuple[str, ...]): ラベル名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def render(self: "Metric") -> list[str]:
+        """Prometheusのテキスト形式の行を返す"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+    @abc.abstractmethod
+    def samples(self: "Metric") -> list[str]:
+        """サンプル行を返す"""
+
+
+class Counter(Metric):
+    """単調増加するカウンター"""
+
+    kind = "counter"
+
+    def __init__(self: "Counter", name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the Counter class."""
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self: "Counter", *labelvalues: str, amount: float = 1) -> None:
+        """カウンターを増やす"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self: "Counter") -> list[str]:
+        """サンプル行を返す"""
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Gauge(Metric):
+    """現在値を表すゲージ"""
+
+    kind = "gauge"
+
+    def __init__(self: "Gauge", name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the Gauge class."""
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self: "Gauge", value: float, *labelvalues: str) -> None:
+        """値を設定する"""
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def remove(self: "Gauge", *labelvalues: str) -> None:
+        """ラベルの値を削除する（閉じた接続など、存在しなくなったラベルを消すため）"""
+        with self._lock:
+            self._values.pop(labelvalues, None)
+
+    def clear(self: "Gauge") -> None:
+        """全ラベルの値を削除する（切断したクライアントなど、存在しなくなったラベルを消すため）"""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self: "Gauge") -> list[str]:
+        """サンプル行を返す"""
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Histogram(Metric):
+    """値の分布を累積バケットで集計するヒストグラム"""
+
+    kind = "histogram"
+
+    def __init__(
+        self: "Histogram",
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize the Histogram class.
+
+        Args:
+            name (str): メトリクス名
+            documentation (str): HELPに出力する説明
+            labelnames (tuple[str, ...]): ラベル名
+            buckets (tuple[float, ...]): バケットの上限値（昇順）
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # ラベルごとの [バケットごとの件数..., +Infの件数], 合計値
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self: "Histogram", value: float, *labelvalues: str) -> None:
+        """値を1件記録する"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labelvalues)
+            if counts is None:
+                counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+                self._sums[labelvalues] = 0.0
+            counts[index] += 1
+            self._sums[labelvalues] += value
+
+    def samples(self: "Histogram") -> list[str]:
+        """サンプル行を返す"""
+        with self._lock:
+            values = [(labels, list(counts), self._sums[labels]) for labels, counts in self._counts.items()]
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、Prometheusのテキスト形式でまとめて出力するクラス"""
+
+    def __init__(self: "MetricsRegistry") -> None:
+        """Initialize the MetricsRegistry class."""
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+
+    def counter(self: "MetricsRegistry", name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """カウンターを登録する"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self: "MetricsRegistry", name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        """ゲージを登録する"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """ヒストグラムを登録する"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self: "MetricsRegistry", metric: MetricT) -> MetricT:
+        """メトリクスを登録する。同じ名前のメトリクスは登録済みのものを返す"""
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing  # type: ignore
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self: "MetricsRegistry", collector: Callable[[], None]) -> None:
+        """出力の直前に呼び出し、キューの長さなどのゲージを更新する関数を登録する"""
+        self.collectors.append(collector)
+
+    def remove_collector(self: "MetricsRegistry", collector: Callable[[], None]) -> None:
+        """add_collectorで登録した関数の登録を解除する（登録されていない場合は何もしない）"""
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def render(self: "MetricsRegistry") -> str:
+        """全メトリクスをPrometheusのテキスト形式で出力する"""
+        for collector in self.collectors:
+            self._collect(collector)
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _collect(collector: Callable[[], None]) -> None:
+        """ゲージを更新する関数を呼び出す（失敗しても他のメトリクスは出力する）"""
+        try:
+            collector()
+        except Exception:
+            logger.exception("Failed to collect metrics")
+
+
+# プロセス全体で共有するレジストリ（/metricsで出力する）
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,59 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SampleRingBuffer:
+    """固定長のバイナリサンプルを事前確保したバッファに溜めるリングバッファ
+
+    サンプリングのたびにメモリを確保せず、溜まったサンプルはdrainでまとめて取り出してディスクに書き込む。
+    書き込みが追いつかず容量を超えた場合は古いサンプルから上書きする。
+    """
+
+    def __init__(self: "SampleRingBuffer", record_size: int, capacity: int) -> None:
+        """Initialize the SampleRingBuffer class.
+
+        Args:
+            record_size (int): 1サンプルのバイト数
+            capacity (int): 保持できる最大サンプル数
+        """
+        self.record_size = record_size
+        self.capacity = capacity
+        self._buffer = bytearray(record_size * capacity)
+        self._start = 0  # 最も古いサンプルの位置
+        self._count = 0
+        self.dropped_samples = 0
+
+    def __len__(self: "SampleRingBuffer") -> int:
+        """未書き込みのサンプル数を返す"""
+        return self._count
+
+    def push(self: "SampleRingBuffer", sample: bytes) -> None:
+        """サンプルを1件追加する
+
+        Args:
+            sample (bytes): record_sizeバイトのサンプル
+        """
+        if len(sample) != self.record_size:
+            msg = f"Sample size {len(sample)} does not match record size {self.record_size}."
+            raise ValueError(msg)
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+            self.dropped_samples += 1
+        offset = (self._start + self._count) % self.capacity * self.record_size
+        self._buffer[offset : offset + self.record_size] = sample
+        self._count += 1
+
+    def drain(self: "SampleRingBuffer") -> bytes:
+        """溜まったサンプルを古い順に連結して取り出し、バッファを空にする"""
+        if self._count == 0:
+            return b""
+        start = self._start * self.record_size
+        end = start + self._count * self.record_size
+        size = len(self._buffer)
+        # 末尾で折り返している場合は2つの区間を連結する
+        data = bytes(self._buffer[start:end]) if end <= size else bytes(self._buffer[start:]) + bytes(self._buffer[: end - size])
+        self._start = 0
+        self._count = 0
+        return data
@@ -0,0 +1,471 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from src.settings.config import TELEMETRY_MAX_RATE
+from src.utils.commons.flight_record_buffer import TelemetryCursor
+from src.utils.commons.frame_encoder import FrameEncoder
+from src.utils.commons.metrics import REGISTRY
+from src.utils.commons.telemetry_delta import STATE_KEYS, StateUpdate, TelemetryDeltaEncoder
+from src.utils.commons.telemetry_selection import (
+    ALL_SELECTION,
+    SECTION_KEYS,
+    Selection,
+    compute_plan,
+    parse_selection,
+    project,
+    selection_tree,
+)
+
+if TYPE_CHECKING:
+    from src.utils.commons.flight_replay import ReplayFlightManager
+    from src.utils.krpc_module.auto_pilot_manager import FlightManager
+
+logger = logging.getLogger(__name__)
+
+TICK_DURATION = REGISTRY.histogram(
+    "telemetry_tick_seconds",
+    "Time spent per telemetry tick by phase (collect, serialize, total).",
+    ("phase",),
+)
+TICK_OVER_BUDGET = REGISTRY.counter(
+    "telemetry_tick_over_budget_total",
+    "Number of telemetry ticks that took longer than the shortest due channel interval.",
+)
+SEND_DURATION = REGISTRY.histogram("telemetry_send_seconds", "Time spent sending one telemetry frame to one WebSocket client.", ("format",))
+FRAME_BYTES = REGISTRY.histogram(
+    "telemetry_frame_bytes",
+    "Size of encoded telemetry frames.",
+    ("mode", "format"),
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+KEYFRAME_RESYNCS = REGISTRY.counter(
+    "telemetry_keyframe_resyncs_total",
+    "Number of keyframes sent in place of a delta to clients that could not apply it.",
+)
+DROPPED_FRAMES = REGISTRY.counter("telemetry_dropped_frames_total", "Number of frames dropped because a client queue was full.")
+COALESCED_FRAMES = REGISTRY.counter(
+    "telemetry_coalesced_frames_total",
+    "Number of queued frames skipped because a newer frame was ready when the client's socket caught up.",
+)
+EVENT_PUSHES = REGISTRY.counter(
+    "telemetry_event_pushes_total",
+    "Number of times a new event brought forward the next frame of channels subscribed to flight records.",
+)
+CHANNELS = REGISTRY.gauge("telemetry_channels", "Number of active telemetry channels (distinct rate and section subscriptions).")
+SUBSCRIBERS = REGISTRY.gauge("telemetry_subscribers", "Number of connected telemetry subscribers.")
+QUEUE_DEPTH = REGISTRY.gauge("telemetry_queue_depth", "Queued telemetry frames across subscribers.", ("stat",))
+
+
+def parse_subscription(rate: str | None, sections: str | None) -> tuple[float | None, Selection]:
+    """クライアントが指定した配信レートと購読内容を解釈する
+
+    Args:
+        rate (str | None): 配信レート（Hz）。TELEMETRY_MAX_RATEを上限とする。Noneならブロードキャスターの既定の間隔
+        sections (str | None): カンマ区切りのセレクター（parse_selectionを参照）。Noneなら全セクション
+
+    Returns:
+        tuple[float | None, Selection]: (配信レート, 購読内容)
+
+    Raises:
+        ValueError: レートが正の数でない場合、または未知のセクションが指定された場合
+    """
+    requested_rate = None
+    if rate is not None:
+        try:
+            requested_rate = float(rate)
+        except ValueError:
+            requested_rate = math.nan
+        if not requested_rate > 0:
+            msg = f"Invalid telemetry rate '{rate}'. Specify a positive number of Hz."
+            raise ValueError(msg)
+        requested_rate = min(requested_rate, TELEMETRY_MAX_RATE)
+    return requested_rate, parse_selection(sections)
+
+
+def parse_since(since: str | None) -> int:
+    """クライアントが指定した差分配信の再開位置（受信済みの最後のシーケンス番号）を解釈する
+
+    Args:
+        since (str | None): 受信済みの最後のシーケンス番号。Noneなら0（先頭から）
+
+    Returns:
+        int: 受信済みの最後のシーケンス番号
+
+    Raises:
+        ValueError: 0以上の整数でない場合
+    """
+    if since is None:
+        return 0
+    try:
+        acked_sequence = int(since)
+    except ValueError:
+        acked_sequence = -1
+    if acked_sequence < 0:
+        msg = f"Invalid since '{since}'. Specify a non-negative sequence number."
+        raise ValueError(msg)
+    return acked_sequence
+
+
+class TelemetrySubscriber:
+    """ブロードキャストされたフレームを受け取るクライアントごとのキュー"""
+
+    def __init__(  # noqa: PLR0913
+        self: "TelemetrySubscriber",
+        cursor: TelemetryCursor,
+        encoder: FrameEncoder,
+        queue_size: int,
+        delta: bool = False,
+        selection: Selection = ALL_SELECTION,
+    ) -> None:
+        """Initialize the TelemetrySubscriber class.
+
+        Args:
+            cursor (TelemetryCursor): クライアントの受信位置
+            encoder (FrameEncoder): クライアントが指定したフレームのエンコーダー
+            queue_size (int): 未送信フレームを保持する最大数。超えた場合は古いフレームから破棄する
+            delta (bool): Trueならロケットの状態をキーフレームと差分で配信する
+            selection (Selection): 購読するセクション・フィールド
+        """
+        self.cursor = cursor
+        self.encoder = encoder
+        self.delta = delta
+        self.selection = selection
+        self.state_version = 0  # 最後に送信した状態のバージョン（差分配信のみ）
+        # (フレームが前提とする直前のシーケンス番号, フレームのシーケンス番号, エンコード済みフレーム, 差分配信の状態の更新)
+        self.queue: asyncio.Queue[tuple[int, int, str | bytes, StateUpdate | None]] = asyncio.Queue(maxsize=queue_size)
+        self.dropped_frames = 0
+        self.coalesced_frames = 0
+
+    def offer(
+        self: "TelemetrySubscriber",
+        previous_sequence: int,
+        sequence: int,
+        payload: str | bytes,
+        state_update: StateUpdate | None = None,
+    ) -> None:
+        """フレームをキューに積む。送信が追いつかないクライアントは古いフレームを破棄して他を待たせない"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped_frames += 1
+            DROPPED_FRAMES.inc()
+        self.queue.put_nowait((previous_sequence, sequence, payload, state_update))
+
+    async def next_frame(self: "TelemetrySubscriber") -> tuple[int, int, str | bytes, StateUpdate | None]:
+        """次に送信するフレームを返す
+
+        ソケットの送信が遅れてキューに複数のフレームが溜まっている場合は、最新のフレームだけを返して残りを読み飛ばす。
+        読み飛ばした飛行記録はバックフィルで、状態の差分はキーフレームで補われる。
+        """
+        frame = await self.queue.get()
+        while not self.queue.empty():
+            frame = self.queue.get_nowait()
+            self.coalesced_frames += 1
+            COALESCED_FRAMES.inc()
+        return frame
+
+
+class TelemetryChannel:
+    """同じ配信間隔で同じセクション・フィールドを購読するクライアントのグループ
+
+    配信時刻・飛行記録の配信位置・状態の差分をチャンネルごとに管理するため、
+    レートの低いクライアントにも直前の配信以降の飛行記録と、そのまま適用できる差分が届く。
+    """
+
+    def __init__(self: "TelemetryChannel", interval: float, selection: Selection) -> None:
+        """Initialize the TelemetryChannel class.
+
+        Args:
+            interval (float): 配信間隔（秒）
+            selection (Selection): 配信するセクション・フィールド
+        """
+        self.interval = interval
+        self.selection = selection
+        self.tree = selection_tree(selection)
+        self.subscribers: set[TelemetrySubscriber] = set()
+        self.next_due = 0.0
+        self.last_sequence = 0
+        self.delta_encoder = TelemetryDeltaEncoder()
+
+    def schedule(self: "TelemetryChannel", now: float) -> None:
+        """次の配信時刻を設定する。処理が遅れて配信時刻を過ぎていた場合はまとめて配信せずに読み飛ばす"""
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = now + self.interval
+
+    def frame(self: "TelemetryChannel", telemetry: dict, since: int) -> dict:
+        """tickで取得したテレメトリから、このチャンネルが購読するフィールドと配信位置以降の飛行記録だけのフレームを作成する
+
+        Args:
+            telemetry (dict): get_telemetryの結果
+            since (int): get_telemetryに渡した飛行記録の開始位置
+        """
+        frame = {key: value for key, value in telemetry.items() if not any(key in keys for keys in SECTION_KEYS.values())}
+        frame["previous_sequence"] = self.last_sequence
+        for section, subtree in self.tree.items():
+            for key in SECTION_KEYS[section]:
+                frame[key] = project(telemetry.get(key), subtree)
+        if "flight_records" in self.tree and self.last_sequence > since:
+            frame["flight_records"] = [record for record in frame["flight_records"] if record["sequence"] > self.last_sequence]
+            frame["event_records"] = [record for record in frame["event_records"] if record["sequence"] > self.last_sequence]
+        return frame
+
+    def update_state(self: "TelemetryChannel", frame: dict, records_frame: Callable[[bool], dict]) -> StateUpdate | None:
+        """差分配信の購読者がいればロケットの状態のバージョンを進め、差分を作成する"""
+        if self.tree.keys().isdisjoint(STATE_KEYS) or not any(subscriber.delta for subscriber in self.subscribers):
+            # 次に差分配信の購読者が来たときは古い状態との差分ではなくキーフレームから始める
+            self.delta_encoder.reset()
+            return None
+        delta = self.delta_encoder.update({key: frame[key] for key in STATE_KEYS if key in frame})
+        return StateUpdate(self.delta_encoder.version, delta, records_frame)
+
+
+class TelemetryBroadcaster:
+    """1つのプロデューサーでテレメトリを取得し、全WebSocketクライアントに配信するクラス
+
+    クライアントは配信レートと購読内容ごとのチャンネルにまとめ、
+    kRPCからの取得・計算はtickごとに1回（配信時刻を迎えたチャンネルが購読するセクション・グループのみ）、
+    エンコードはチャンネル内の配信モードと形式の組み合わせごとに1回だけ行い、同じエンコード済みフレームを各クライアントのキューに配る。
+    incrementalモードのフレームは直前の配信以降の飛行記録のみを含み、取りこぼしたクライアントには送信時にバックフィルする。
+    deltaを指定したクライアントには、ロケットの状態をキーフレームとその後の差分（変化した値だけのマージパッチ）で配信する。
+    イベントタイムラインに新しいイベントが追加されると、飛行記録を購読するチャンネルは配信時刻を待たずにすぐ配信する。
+    """
+
+    def __init__(
+        self: "TelemetryBroadcaster",
+        flight_manager_factory: Callable[[], "FlightManager | ReplayFlightManager"],
+        interval: float,
+        queue_size: int,
+    ) -> None:
+        """Initialize the TelemetryBroadcaster class.
+
+        Args:
+            flight_manager_factory (Callable[[], FlightManager | ReplayFlightManager]): 最初の購読者が来たときにFlightManagerを生成する関数
+            interval (float): レートを指定しないクライアントにテレメトリを配信する間隔（秒）
+            queue_size (int): クライアントごとのキューの最大フレーム数
+        """
+        self.flight_manager_factory = flight_manager_factory
+        self.interval = interval
+        self.queue_size = queue_size
+        self.flight_manager: FlightManager | ReplayFlightManager | None = None
+        self.subscribers: set[TelemetrySubscriber] = set()
+        self.channels: dict[tuple[float, Selection], TelemetryChannel] = {}
+        self._channel_of: dict[TelemetrySubscriber, TelemetryChannel] = {}
+        self._producer_task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        REGISTRY.add_collector(self.collect_metrics)
+
+    def subscribe(  # noqa: PLR0913
+        self: "TelemetryBroadcaster",
+        cursor: TelemetryCursor,
+        encoder: FrameEncoder,
+        delta: bool = False,
+        rate: float | None = None,
+        selection: Selection = ALL_SELECTION,
+    ) -> TelemetrySubscriber:
+        """クライアントを購読者として登録し、必要ならプロデューサーを起動する
+
+        Args:
+            cursor (TelemetryCursor): クライアントの受信位置
+            encoder (FrameEncoder): フレームのエンコーダー
+            delta (bool): Trueならロケットの状態を差分で配信する
+            rate (float | None): 配信レート（Hz）。Noneなら既定の間隔
+            selection (Selection): 購読するセクション・フィールド
+
+        Raises:
+            ValueError: 最初の購読者でFlightManagerを作成できない場合（kRPCに接続していない、再生速度の指定が不正など）
+            FileNotFoundError: 再生モードで再生するログファイルがない場合
+        """
+        if self.flight_manager is None:
+            self.flight_manager = self.flight_manager_factory()
+            self._loop = asyncio.get_running_loop()
+            self.flight_manager.flight_records.timeline.subscribe(self.on_event)
+        subscriber = TelemetrySubscriber(cursor, encoder, self.queue_size, delta, selection)
+        interval = self.interval if rate is None else 1 / rate
+        channel = self.channels.get((interval, selection))
+        if channel is None:
+            channel = self.channels[(interval, selection)] = TelemetryChannel(interval, selection)
+            # 新しいチャンネルはすぐに配信を始めるため、待機中のプロデューサーを起こす
+            self._wakeup.set()
+        channel.subscribers.add(subscriber)
+        self._channel_of[subscriber] = channel
+        self.subscribers.add(subscriber)
+        if self._producer_task is None:
+            self._producer_task = asyncio.create_task(self.produce())
+        return subscriber
+
+    async def unsubscribe(self: "TelemetryBroadcaster", subscriber: TelemetrySubscriber) -> None:
+        """購読を解除し、購読者がいなくなったらプロデューサーとFlightManagerを停止する"""
+        self.subscribers.discard(subscriber)
+        channel = self._channel_of.pop(subscriber, None)
+        if channel is not None:
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers:
+                del self.channels[(channel.interval, channel.selection)]
+        if self.subscribers:
+            return
+        if self._producer_task is not None:
+            self._producer_task.cancel()
+            try:
+                await self._producer_task
+            except asyncio.CancelledError:
+                logger.info("Telemetry producer stopped")
+            self._producer_task = None
+        if self.flight_manager is not None:
+            self.flight_manager.flight_records.timeline.unsubscribe(self.on_event)
+            await self.flight_manager.close()
+            self.flight_manager = None
+
+    def on_event(self: "TelemetryBroadcaster", _record: dict) -> None:
+        """イベントタイムラインのリスナー（イベントを追加したスレッドから呼ばれる）"""
+        if self._loop is None:
+            return
+        with contextlib.suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(self.push_event)
+
+    def push_event(self: "TelemetryBroadcaster") -> None:
+        """飛行記録を購読するチャンネルの配信時刻を現在に前倒しし、プロデューサーを起こす"""
+        now = time.perf_counter()
+        pushed = False
+        for channel in self.channels.values():
+            if ("flight_records",) in channel.selection and channel.next_due > now:
+                channel.next_due = now
+                pushed = True
+        if pushed:
+            EVENT_PUSHES.inc()
+            self._wakeup.set()
+
+    async def produce(self: "TelemetryBroadcaster") -> None:
+        """配信時刻を迎えたチャンネルにテレメトリを配り、次に配信時刻を迎えるチャンネルまで待つ"""
+        while True:
+            try:
+                await self.broadcast()
+            except Exception:
+                logger.exception("Error producing telemetry")
+
+            next_due = min((channel.next_due for channel in self.channels.values()), default=time.perf_counter() + self.interval)
+            self._wakeup.clear()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), max(0, next_due - time.perf_counter()))
+
+    async def broadcast(self: "TelemetryBroadcaster") -> None:
+        """配信時刻を迎えたチャンネルが購読する分だけテレメトリを取得・計算してエンコードし、購読者のキューに積む"""
+        if self.flight_manager is None:
+            return
+        start = time.perf_counter()
+        due = [channel for channel in self.channels.values() if channel.next_due <= start]
+        if not due:
+            return
+        for channel in due:
+            channel.schedule(start)
+        since = min(channel.last_sequence for channel in due)
+        plan = compute_plan(channel.selection for channel in due)
+        telemetry = await self.flight_manager.get_telemetry(since, plan)
+        collected = time.perf_counter()
+
+        # 全レコードを含むフレーム（fullモード）用のスナップショットは、tickごとに必要になったときに1回だけ取り出す
+        snapshot = functools.cache(lambda: self.flight_manager.flight_records.snapshot_since(0))
+        for channel in due:
+            self.broadcast_channel(channel, telemetry, since, snapshot)
+
+        end = time.perf_counter()
+        TICK_DURATION.observe(collected - start, "collect")
+        TICK_DURATION.observe(end - collected, "serialize")
+        TICK_DURATION.observe(end - start, "total")
+        if end - start > min(channel.interval for channel in due):
+            TICK_OVER_BUDGET.inc()
+
+    def broadcast_channel(
+        self: "TelemetryBroadcaster",
+        channel: TelemetryChannel,
+        telemetry: dict,
+        since: int,
+        snapshot: Callable[[], tuple[list, list, int]],
+    ) -> None:
+        """1つのチャンネルのフレームをエンコードし、購読者のキューに積む"""
+        frame = channel.frame(telemetry, since)
+        previous_sequence = channel.last_sequence
+        channel.last_sequence = frame["sequence"]
+
+        frames: dict[bool, dict] = {}
+
+        def records_frame(incremental: bool) -> dict:
+            if incremental not in frames:
+                frames[incremental] = frame if incremental else self.full_frame(frame, snapshot())
+            return frames[incremental]
+
+        state_update = channel.update_state(frame, records_frame)
+        payloads: dict[tuple[bool, bool, str], str | bytes] = {}
+        for subscriber in list(channel.subscribers):
+            incremental = subscriber.cursor.incremental
+            delta = subscriber.delta and state_update is not None
+            key = (incremental, delta, subscriber.encoder.name)
+            if key not in payloads:
+                mode = "incremental" if incremental else "full"
+                if delta:
+                    payloads[key] = state_update.payload(incremental, subscriber.encoder)
+                    mode += "-keyframe" if state_update.delta is None else "-delta"
+                else:
+                    payloads[key] = subscriber.encoder.encode(records_frame(incremental))
+                FRAME_BYTES.observe(len(payloads[key]), mode, subscriber.encoder.name)
+            subscriber.offer(previous_sequence, channel.last_sequence, payloads[key], state_update if delta else None)
+
+    def resync(
+        self: "TelemetryBroadcaster",
+        subscriber: TelemetrySubscriber,
+        state_update: StateUpdate,
+        payload: str | bytes,
+    ) -> str | bytes:
+        """差分を適用できない購読者（接続直後、フレームを破棄した場合）には、差分の代わりにキーフレームを返す"""
+        if state_update.applies_to(subscriber.state_version):
+            return payload
+        KEYFRAME_RESYNCS.inc()
+        return state_update.keyframe(subscriber.cursor.incremental, subscriber.encoder)
+
+    def collect_metrics(self: "TelemetryBroadcaster") -> None:
+        """購読者数とキューの長さのゲージを更新する（/metricsの出力時に呼ばれる）"""
+        depths = [subscriber.queue.qsize() for subscriber in self.subscribers]
+        SUBSCRIBERS.set(len(depths))
+        CHANNELS.set(len(self.channels))
+        QUEUE_DEPTH.set(max(depths, default=0), "max")
+        QUEUE_DEPTH.set(sum(depths), "total")
+
+    def close(self: "TelemetryBroadcaster") -> None:
+        """メトリクスの収集を解除する（購読者がいない状態で呼ぶ）"""
+        REGISTRY.remove_collector(self.collect_metrics)
+
+    def full_frame(self: "TelemetryBroadcaster", frame: dict, snapshot: tuple[list, list, int]) -> dict:
+        """差分フレームを、保持している全飛行記録を含むフレームに置き換える"""
+        if "flight_records" not in frame:
+            return frame
+        flight_records, event_records, sequence = snapshot
+        return {**frame, "sequence": sequence, "flight_records": flight_records, "event_records": event_records}
+
+    def backfill(self: "TelemetryBroadcaster", subscriber: TelemetrySubscriber, until: int) -> str | bytes | None:
+        """購読者が取りこぼした飛行記録だけを含むフレームを作成する
+
+        Args:
+            subscriber (TelemetrySubscriber): バックフィルする購読者
+            until (int): 次に送信するフレームが前提とするシーケンス番号。これより後の記録は含めない
+
+        Returns:
+            str | bytes | None: エンコード済みのバックフィルフレーム
+        """
+        if self.flight_manager is None or ("flight_records",) not in subscriber.selection:
+            return None
+        since = subscriber.cursor.since
+        flight_records, event_records, _ = self.flight_manager.flight_records.snapshot_since(since)
+        return subscriber.encoder.encode(
+            {
+                "sequence": until,
+                "previous_sequence": since,
+                "flight_records": [record for record in flight_records if record["sequence"] <= until],
+                "event_records": [record for record in event_records if record["sequence"] <= until],
+            },
+        )
@@ -0,0 +1,189 @@
+import copy
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.settings.config import TELEMETRY_DELTA_EPSILON, TELEMETRY_KEYFRAME_INTERVAL
+from src.utils.commons.frame_encoder import FrameEncoder
+
+logger = logging.getLogger(__name__)
+
+# 差分配信の対象とするフレームのキー（ロケットの状態）。それ以外のキーは毎フレームそのまま送る
+STATE_KEYS = ("rocket_status", "vessel_telemetry")
+
+
+def _escape_pointer(key: str) -> str:
+    """JSON Pointerのパス要素をエスケープする"""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _changed(old: Any, new: Any, epsilon: float) -> bool:  # noqa: ANN401
+    """値がepsilonを超えて変化したか判定する（数値のリストは要素ごとに比較する）"""
+    if isinstance(old, bool) or isinstance(new, bool):
+        return old != new
+    if isinstance(old, int | float) and isinstance(new, int | float):
+        if math.isnan(old) or math.isnan(new):
+            return not (math.isnan(old) and math.isnan(new))
+        return abs(new - old) > epsilon
+    if isinstance(old, list | tuple) and isinstance(new, list | tuple):
+        return len(old) != len(new) or any(_changed(a, b, epsilon) for a, b in zip(old, new, strict=True))
+    return old != new
+
+
+def diff_state(
+    reference: dict[str, Any],
+    state: dict[str, Any],
+    removed: list[str],
+    epsilon: dict[str, float] = TELEMETRY_DELTA_EPSILON,
+) -> dict[str, Any]:
+    """referenceとstateの差分をマージパッチとして返し、referenceに同じ変更を適用する
+
+    辞書は再帰的に比較し、リストを含むそれ以外の値は葉として丸ごと置き換える。
+    差分は変化した葉だけを元と同じ入れ子で含む辞書（JSON Merge Patch形式）で、削除したキーはJSON Pointerでremovedに追加する。
+    葉の値がNoneに変わった場合も削除と区別できるよう、削除はマージパッチのnullではなくremovedで表す。
+    epsilonはフィールド名ごとの変化とみなす最小の差で、そのキーの下にネストした値にも適用する。
+    変化がepsilon以下の値はreferenceを更新しないため、少しずつ変化する値も累積した差がepsilonを超えた時点で送られる。
+
+    Args:
+        reference (dict[str, Any]): 差分を受信しているクライアントが持っている状態
+        state (dict[str, Any]): 最新の状態
+        removed (list[str]): 削除したキーのJSON Pointerを追加するリスト
+        epsilon (dict[str, float]): フィールド名ごとの変化とみなす最小の差
+
+    Returns:
+        dict[str, Any]: 変化した値だけを含む辞書
+    """
+
+    def diff(reference: dict[str, Any], state: dict[str, Any], path: str, field_epsilon: float) -> dict[str, Any]:
+        """pathの辞書の差分を返す（field_epsilonはepsilonにないフィールドの最小の差）"""
+        changes: dict[str, Any] = {}
+        for key, value in state.items():
+            child_epsilon = epsilon.get(key, field_epsilon)
+            if key not in reference:
+                changes[key] = value
+                reference[key] = copy.deepcopy(value)
+                continue
+            old = reference[key]
+            if isinstance(old, dict) and isinstance(value, dict):
+                child_changes = diff(old, value, f"{path}/{_escape_pointer(key)}", child_epsilon)
+                if child_changes:
+                    changes[key] = child_changes
+            elif _changed(old, value, child_epsilon):
+                changes[key] = value
+                reference[key] = copy.deepcopy(value)
+        for key in [key for key in reference if key not in state]:
+            removed.append(f"{path}/{_escape_pointer(key)}")
+            del reference[key]
+        return changes
+
+    return diff(reference, state, "", 0.0)
+
+
+class TelemetryDeltaEncoder:
+    """ロケットの状態の差分を作成し、状態のバージョンを管理するクラス
+
+    差分を受信している全クライアントは同じ差分の列を適用するため、クライアントが持っている状態（reference）は1つだけ保持する。
+    キーフレーム（全状態）はkeyframe_intervalごとに全クライアントへ送り、referenceを最新の状態に揃える。
+    """
+
+    def __init__(
+        self: "TelemetryDeltaEncoder",
+        keyframe_interval: float = TELEMETRY_KEYFRAME_INTERVAL,
+        epsilon: dict[str, float] = TELEMETRY_DELTA_EPSILON,
+    ) -> None:
+        """Initialize the TelemetryDeltaEncoder class.
+
+        Args:
+            keyframe_interval (float): 全クライアントにキーフレームを送る間隔（秒）
+            epsilon (dict[str, float]): フィールド名ごとの変化とみなす最小の差
+        """
+        self.keyframe_interval = keyframe_interval
+        self.epsilon = epsilon
+        self.reference: dict[str, Any] = {}
+        self.version = 0
+        self._next_keyframe = 0.0
+
+    def update(self: "TelemetryDeltaEncoder", state: dict[str, Any]) -> tuple[dict[str, Any], list[str]] | None:
+        """最新の状態を反映してバージョンを1つ進める
+
+        Returns:
+            tuple[dict[str, Any], list[str]] | None: 1つ前のバージョンからの差分（マージパッチ, 削除したキーのJSON Pointer）。
+                キーフレームを送る時刻ならNone
+        """
+        self.version += 1
+        now = time.monotonic()
+        if now >= self._next_keyframe:
+            self.reference = copy.deepcopy(state)
+            self._next_keyframe = now + self.keyframe_interval
+            return None
+        removed: list[str] = []
+        return diff_state(self.reference, state, removed, self.epsilon), removed
+
+    def reset(self: "TelemetryDeltaEncoder") -> None:
+        """差分を受信しているクライアントがいなくなったとき、次の更新をキーフレームにする"""
+        self.reference = {}
+        self._next_keyframe = 0.0
+
+
+class StateUpdate:
+    """1tick分の状態の更新。差分フレームとキーフレームを、必要になったときに配信モードと形式の組み合わせごとに1回だけエンコードする
+
+    差分フレーム(frame_type="delta")のクライアントでの適用方法:
+        1. removeの各JSON Pointerが指すキーを削除する
+        2. patchを状態に再帰的にマージする（辞書同士はキーごとにマージし、それ以外の値は置き換える）
+
+    Attributes:
+        version (int): 状態のバージョン
+        delta (tuple[dict[str, Any], list[str]] | None): 1つ前のバージョンからの差分。Noneなら全クライアントにキーフレームを送る
+    """
+
+    def __init__(
+        self: "StateUpdate",
+        version: int,
+        delta: tuple[dict[str, Any], list[str]] | None,
+        records_frame: Callable[[bool], dict[str, Any]],
+    ) -> None:
+        """Initialize the StateUpdate class.
+
+        Args:
+            version (int): 状態のバージョン
+            delta (tuple[dict[str, Any], list[str]] | None): 1つ前のバージョンからの差分。Noneならキーフレーム
+            records_frame (Callable[[bool], dict[str, Any]]): 配信モード(incremental)ごとのフレームを返す関数
+        """
+        self.version = version
+        self.delta = delta
+        self.records_frame = records_frame
+        self._payloads: dict[tuple[str, bool, str], str | bytes] = {}
+
+    @property
+    def base_version(self: "StateUpdate") -> int | None:
+        """差分が前提とするバージョン。キーフレームならNone"""
+        return None if self.delta is None else self.version - 1
+
+    def applies_to(self: "StateUpdate", state_version: int) -> bool:
+        """クライアントが持っているバージョンにこの更新を適用できるか"""
+        return self.delta is None or self.base_version == state_version
+
+    def payload(self: "StateUpdate", incremental: bool, encoder: FrameEncoder) -> str | bytes:
+        """差分フレーム（キーフレームを送る時刻ならキーフレーム）をエンコードして返す"""
+        if self.delta is None:
+            return self.keyframe(incremental, encoder)
+        key = ("delta", incremental, encoder.name)
+        if key not in self._payloads:
+            patch, removed = self.delta
+            frame = {name: value for name, value in self.records_frame(incremental).items() if name not in STATE_KEYS}
+            frame.update(frame_type="delta", state_version=self.version, base_version=self.base_version, patch=patch)
+            if removed:
+                frame["remove"] = removed
+            self._payloads[key] = encoder.encode(frame)
+        return self._payloads[key]
+
+    def keyframe(self: "StateUpdate", incremental: bool, encoder: FrameEncoder) -> str | bytes:
+        """全状態を含むキーフレームをエンコードして返す"""
+        key = ("keyframe", incremental, encoder.name)
+        if key not in self._payloads:
+            frame = {**self.records_frame(incremental), "frame_type": "keyframe", "state_version": self.version}
+            self._payloads[key] = encoder.encode(frame)
+        return self._payloads[key]
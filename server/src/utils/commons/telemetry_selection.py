@@ -0,0 +1,89 @@
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 購読できるセクションと、フレームに含まれるキー
+# clockは時刻(time, launch_relative_time)だけを受け取るクライアント用で、時刻は全てのフレームに含まれる
+SECTION_KEYS: dict[str, tuple[str, ...]] = {
+    "clock": (),
+    "rocket_status": ("rocket_status",),
+    "vessel_telemetry": ("vessel_telemetry",),
+    "flight_records": ("flight_records", "event_records"),
+}
+# 中のグループ・フィールドまで指定できるセクション
+NARROWABLE_SECTIONS = frozenset({"rocket_status", "vessel_telemetry"})
+
+# 購読内容。セクションから始まるパス（例: ("rocket_status", "main_engine", "thrust")）の集合
+Selection = frozenset[tuple[str, ...]]
+# tickで取得・計算するセクションと、その中のグループ（Noneなら全グループ）
+ComputePlan = dict[str, frozenset[str] | None]
+
+ALL_SELECTION: Selection = frozenset((section,) for section in SECTION_KEYS)
+ALL_PLAN: ComputePlan = dict.fromkeys(SECTION_KEYS)
+
+
+def parse_selection(selectors: str | None) -> Selection:
+    """カンマ区切りのセレクターを購読内容に変換する
+
+    セレクターはセクション名から始まり、rocket_statusとvessel_telemetryはドット区切りでグループ・フィールドまで指定できる。
+    例: "clock,rocket_status.main_engine,vessel_telemetry.orbit_info.apoapsis_altitude"
+
+    Args:
+        selectors (str | None): カンマ区切りのセレクター。Noneなら全セクション
+
+    Returns:
+        Selection: 購読内容。上位のパスが指定されている場合、その下のパスは含めない
+
+    Raises:
+        ValueError: 未知のセクション、または絞り込めないセクションを絞り込んだ場合
+    """
+    if selectors is None:
+        return ALL_SELECTION
+    paths = set()
+    for selector in selectors.split(","):
+        selector = selector.strip()  # noqa: PLW2901
+        if not selector:
+            continue
+        path = tuple(selector.split("."))
+        if path[0] not in SECTION_KEYS or "" in path or (len(path) > 1 and path[0] not in NARROWABLE_SECTIONS):
+            msg = f"Unknown telemetry selector '{selector}'. Sections: {', '.join(SECTION_KEYS)}"
+            raise ValueError(msg)
+        paths.add(path)
+    if not paths:
+        msg = f"No telemetry sections selected. Sections: {', '.join(SECTION_KEYS)}"
+        raise ValueError(msg)
+    return frozenset(path for path in paths if not any(path[:i] in paths for i in range(1, len(path))))
+
+
+def selection_tree(selection: Selection) -> dict[str, Any]:
+    """購読内容を入れ子の辞書にする。値がNoneのキーはその下を全て含む"""
+    tree: dict[str, Any] = {}
+    for path in selection:
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = None
+    return tree
+
+
+def project(value: Any, tree: dict[str, Any] | None) -> Any:  # noqa: ANN401
+    """値から購読されたキーだけを取り出す（treeがNoneなら値をそのまま返す）"""
+    if tree is None or not isinstance(value, dict):
+        return value
+    return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+def compute_plan(selections: Iterable[Selection]) -> ComputePlan:
+    """複数の購読内容をまとめ、取得・計算が必要なセクションとグループを求める"""
+    plan: ComputePlan = {}
+    for path in sorted(set().union(*selections), key=len):
+        section = path[0]
+        if len(path) == 1:
+            plan[section] = None
+        elif section not in plan:
+            plan[section] = frozenset({path[1]})
+        elif plan[section] is not None:
+            plan[section] |= {path[1]}
+    return plan
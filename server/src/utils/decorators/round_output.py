@@ -1,41 +1,98 @@
- # ruff: noqa
-
+from collections.abc import Callable
 from functools import wraps
+from itertools import repeat
 from typing import Any
 
+from src.settings.config import TELEMETRY_DEFAULT_PRECISION, TELEMETRY_PRECISION
+
+# フィールド名ごとの丸める桁数。Noneなら丸めない
+Precision = dict[str, int | None]
+
 
-def round_output(func):
-    """デコレーター関数で、関数からの出力を再帰的に丸めます。
+def round_output(
+    func: Callable[..., Any] | None = None,
+    *,
+    precision: Precision = TELEMETRY_PRECISION,
+    ndigits: int | None = TELEMETRY_DEFAULT_PRECISION,
+) -> Callable[..., Any]:
+    """関数からの出力に含まれる浮動小数点数を丸めるデコレーター
+
+    `@round_output` と `@round_output(precision=..., ndigits=...)` のどちらでも使える。
+    出力の辞書・リストは作り直さずにその場で書き換える。
 
     Args:
         func: 丸める対象のデータを出力する関数。
+        precision: フィールド名ごとの丸める桁数。
+        ndigits: precisionにないフィールドの丸める桁数。
 
     Returns:
-        同じ型の丸められたデータ。
+        同じオブジェクトで、浮動小数点数が丸められたデータ。
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs) -> Any:
-        result = func(*args, **kwargs)
-        return round_recursive(result, 2)
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            return round_in_place(func(*args, **kwargs), precision, ndigits)
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
 
-    return wrapper
 
+def round_in_place(
+    data: Any,  # noqa: ANN401
+    precision: Precision = TELEMETRY_PRECISION,
+    ndigits: int | None = TELEMETRY_DEFAULT_PRECISION,
+) -> Any:  # noqa: ANN401
+    """データ構造内の浮動小数点数をその場で丸めます。
 
-def round_recursive(data, ndigits):
-    """データ構造内の浮動小数点数を再帰的に丸めます。
+    キー名がprecisionにある場合はその桁数を、そのキーの下にネストした辞書・リストにも適用します。
+    浮動小数点数だけのリスト（履歴の配列など）は要素ごとの型判定をせずにまとめて丸めます。
 
     Args:
         data: 丸めるデータ（辞書、リスト、浮動小数点数など）。
-        ndigits: 丸める小数点の桁数。
+        precision: フィールド名ごとの丸める桁数。
+        ndigits: precisionにないフィールドの丸める桁数。Noneなら丸めない。
 
     Returns:
-        同じ構造を持つデータで、浮動小数点数が指定された桁数で丸められています。
+        辞書・リストは同じオブジェクト、浮動小数点数は丸めた値。
     """
     if isinstance(data, dict):
-        return {k: round_recursive(v, ndigits) for k, v in data.items()}
+        _round_dict(data, precision, ndigits)
     elif isinstance(data, list):
-        return [round_recursive(v, ndigits) for v in data]
-    elif isinstance(data, float):
+        _round_list(data, precision, ndigits)
+    elif isinstance(data, float) and ndigits is not None:
         return round(data, ndigits)
     return data
+
+
+def _round_dict(data: dict[str, Any], precision: Precision, ndigits: int | None) -> None:
+    """辞書の値をその場で丸める（キー名がprecisionにある場合はその桁数を下の階層にも適用する）"""
+    for key, value in data.items():
+        digits = precision.get(key, ndigits)
+        if isinstance(value, float):
+            if digits is not None:
+                data[key] = round(value, digits)
+        elif isinstance(value, dict | list):
+            round_in_place(value, precision, digits)
+
+
+def _round_list(data: list[Any], precision: Precision, ndigits: int | None) -> None:
+    """リストの要素をその場で丸める（浮動小数点数だけのリストはまとめて丸める）"""
+    if ndigits is not None and all(isinstance(value, float) for value in data):
+        data[:] = map(round, data, repeat(ndigits))
+        return
+    for index, value in enumerate(data):
+        if isinstance(value, float):
+            if ndigits is not None:
+                data[index] = round(value, ndigits)
+        elif isinstance(value, dict | list):
+            round_in_place(value, precision, ndigits)
+
+
+def round_column(values: list[float], ndigits: int | None) -> list[float | None]:
+    """列の値をまとめて丸め、欠損値(NaN)をNoneにします（バイナリログの列の読み込み用）。"""
+    if ndigits is not None:
+        values = list(map(round, values, repeat(ndigits)))
+    # NaNは自分自身と等しくならない
+    return [value if value == value else None for value in values]  # noqa: PLR0124
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from src.settings.config import KRPC_IO_QUEUE_SIZE
+from src.utils.commons.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from src.utils.krpc_module.krpc_client import KrpcClient
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+IO_PENDING = REGISTRY.gauge("krpc_io_pending", "kRPC jobs queued or running on the connection's I/O worker.", ("connection",))
+IO_WAIT = REGISTRY.histogram("krpc_io_wait_seconds", "Time a kRPC job waited in the I/O worker queue.", ("connection",))
+IO_RUN = REGISTRY.histogram("krpc_io_run_seconds", "Time the I/O worker spent running one kRPC job.", ("connection",))
+IO_BACKPRESSURE = REGISTRY.counter(
+    "krpc_io_backpressure_total",
+    "Number of submissions that had to wait because the I/O worker queue was full.",
+    ("connection",),
+)
+
+
+class AsyncKrpcClient:
+    """kRPC接続ごとに1本のI/Oワーカースレッドで呼び出しを直列に実行する非同期ファサード
+
+    kRPCの呼び出しは全てワーカーのキューに積み、結果はFutureとしてawaitする。
+    イベントループのスレッドではゲームとのソケット通信を一切行わないため、RPCが詰まってもWebSocketの送受信は止まらない。
+    kRPCのクライアントは1本のRPC接続をロックで直列化しているため、ワーカーを1本にしてもスループットは変わらない。
+    キューに積める件数はmax_pendingまでで、超えた呼び出し元は空きが出るまで待たされる（バックプレッシャー）。
+    """
+
+    def __init__(self: "AsyncKrpcClient", krpc: "KrpcClient", max_pending: int = KRPC_IO_QUEUE_SIZE) -> None:
+        """Initialize the AsyncKrpcClient class.
+
+        Args:
+            krpc (KrpcClient): RPCを実行するKrpcClient
+            max_pending (int): 待機中・実行中を合わせた最大ジョブ数
+        """
+        self.krpc = krpc
+        self.max_pending = max_pending
+        self.pending = 0
+        self._slots = asyncio.Semaphore(max_pending)
+        self._queue: queue.SimpleQueue[tuple[Callable[[], Any], asyncio.AbstractEventLoop, asyncio.Future, float] | None] = (
+            queue.SimpleQueue()
+        )
+        self._labels = (krpc.connection_name,)
+        self._thread = threading.Thread(target=self._worker, name=f"krpc-io-{krpc.connection_name}", daemon=True)
+        self._thread.start()
+        REGISTRY.add_collector(self.collect_metrics)
+
+    async def run(self: "AsyncKrpcClient", function: Callable[..., T], *args: Any, **kwargs: Any) -> T:  # noqa: ANN401
+        """RPCを含む同期関数をI/Oワーカーで実行し、結果を待つ
+
+        Args:
+            function (Callable[..., T]): 実行する関数（kRPCのメソッドや、複数のRPCを行う関数）
+            *args (Any): 関数に渡す位置引数
+            **kwargs (Any): 関数に渡すキーワード引数
+
+        Returns:
+            T: 関数の戻り値
+        """
+        if self._slots.locked():
+            IO_BACKPRESSURE.inc(*self._labels)
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending += 1
+        self._queue.put((functools.partial(function, *args, **kwargs), loop, future, time.perf_counter()))
+        return await future
+
+    async def get(self: "AsyncKrpcClient", obj: Any, attribute: str) -> Any:  # noqa: ANN401
+        """リモートオブジェクトのプロパティを読み込む"""
+        return await self.run(getattr, obj, attribute)
+
+    async def set(self: "AsyncKrpcClient", obj: Any, attribute: str, value: Any) -> None:  # noqa: ANN401
+        """リモートオブジェクトのプロパティを設定する"""
+        await self.run(setattr, obj, attribute, value)
+
+    async def batch_read(self: "AsyncKrpcClient", reads: dict[str, tuple[Any, ...]]) -> dict[str, Any]:
+        """KrpcClient.batch_readをI/Oワーカーで実行する（複数の読み取りを1往復で取得する）"""
+        return await self.run(self.krpc.batch_read, reads)
+
+    def _worker(self: "AsyncKrpcClient") -> None:
+        """キューのジョブを1件ずつ実行し、結果を呼び出し元のイベントループに返す"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            function, loop, future, queued_at = job
+            started_at = time.perf_counter()
+            IO_WAIT.observe(started_at - queued_at, *self._labels)
+            result, error = None, None
+            # 呼び出し元がキャンセル済みならRPCを送らずに捨てる
+            if not future.cancelled():
+                try:
+                    result = function()
+                except Exception as e:  # noqa: BLE001
+                    error = e
+                IO_RUN.observe(time.perf_counter() - started_at, *self._labels)
+            try:
+                loop.call_soon_threadsafe(self._complete, future, result, error)
+            except RuntimeError:
+                logger.warning("Event loop closed before a kRPC job completed.")
+
+    def _complete(self: "AsyncKrpcClient", future: asyncio.Future, result: Any, error: Exception | None) -> None:  # noqa: ANN401
+        """イベントループのスレッドでFutureに結果を設定し、キューの空きを返す"""
+        self.pending -= 1
+        self._slots.release()
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def collect_metrics(self: "AsyncKrpcClient") -> None:
+        """キューの長さのゲージを更新する（/metricsの出力時に呼ばれる）"""
+        IO_PENDING.set(self.pending, *self._labels)
+
+    def close(self: "AsyncKrpcClient") -> None:
+        """キューに積まれたジョブを実行し終えてからワーカーを停止し、メトリクスの収集を解除する"""
+        self._queue.put(None)
+        self._thread.join()
+        REGISTRY.remove_collector(self.collect_metrics)
+        IO_PENDING.remove(*self._labels)
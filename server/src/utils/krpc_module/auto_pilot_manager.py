@@ -2,19 +2,38 @@ import asyncio
 import logging
 import math
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from krpc.services.spacecenter import SASMode
+from krpc.services.spacecenter import Control, SASMode
 
 from src.model import LaunchCommand
-from src.settings.config import FLIGHT_LOG_FILE_PATH, GO, ROCKET_SCHEMAS
+from src.settings.config import (
+    COUNTDOWN_INTERVAL,
+    FLIGHT_LOG_FILE_PATH,
+    FLIGHT_RECORD_BUFFER_SIZE,
+    FLIGHT_RECORD_DB_COMPACTION_INTERVAL,
+    FLIGHT_RECORD_DB_URL,
+    FLIGHT_RECORD_PUBLISH_INTERVAL,
+    FLIGHT_RECORD_STORE_PATH,
+    GO,
+    ROCKET_SCHEMAS,
+    TELEMETRY_PRECISION,
+)
+from src.utils.commons.columnar_flight_log import ColumnarFlightLog
+from src.utils.commons.event_timeline import EventTimeline
+from src.utils.commons.flight_record_buffer import FlightRecordBuffer
+from src.utils.commons.flight_record_store import FlightRecordStore
 from src.utils.commons.log_manager import LogManager
-from src.utils.krpc_module.krpc_client import KrpcClient
+from src.utils.commons.telemetry_selection import ALL_PLAN, ComputePlan
+from src.utils.decorators.round_output import round_in_place
+from src.utils.krpc_module.flight_recorder import FlightRecorder
+from src.utils.krpc_module.krpc_connection_pool import KrpcConnectionPool
 from src.utils.krpc_module.rocket_status_manager import RocketStatusManager
 from src.utils.krpc_module.telemetry_manager import TelemetryManager
+from src.utils.krpc_module.unit_state_machine import UnitStateMachine
 from src.utils.krpc_module.vessel_manager import VesselManager
 
 logger = logging.getLogger(__name__)
@@ -24,39 +43,101 @@ LAUNCH_WARNING_THRESHOLD = -5
 class FlightManager:
     """ロケットの飛行を管理するクラス"""
 
-    def __init__(self: "FlightManager", krpc: KrpcClient) -> None:
-        """Initialize the FlightManager class."""
-        if krpc.client is None:
+    # 全てのWebSocket接続で共有する飛行記録の末尾バッファとイベントレコードのストア
+    shared_flight_records: FlightRecordBuffer | None = None
+    shared_record_store: FlightRecordStore | None = None
+
+    def __init__(self: "FlightManager", krpc_pool: KrpcConnectionPool) -> None:
+        """Initialize the FlightManager class.
+
+        テレメトリ・ステータスの取得はtelemetryレーン、ステージング・スロットル・SAS・MechJebの操作はcontrolレーンの接続で行う。
+        """
+        krpc = krpc_pool.telemetry
+        if krpc.client is None or krpc_pool.control.client is None:
             msg = "KRPC client is not available."
             raise ValueError(msg)
-        self.vessel_manager = VesselManager(krpc.client, ROCKET_SCHEMAS)
-        self.telemetry_manager = TelemetryManager(self.vessel_manager)
+        self.krpc = krpc
+        self.control = krpc_pool.control
+        # イベントループから行うRPCは全て接続ごとのI/Oワーカーを経由させる
+        self.async_krpc = krpc.io
+        self.control_io = self.control.io
+        self._vessel_control: Control | None = None
+        # 再接続を検知するための接続の世代番号
+        self.connection_generation = (self.krpc.generation, self.control.generation)
+        self.vessel_manager = VesselManager(krpc, ROCKET_SCHEMAS)
+        self.telemetry_manager = TelemetryManager(self.vessel_manager, krpc)
         self.launch_relative_time = 0
         self.status_manager = RocketStatusManager(self)
+        # 飛行記録はバイナリログ、イベントはSQLiteのストアに保存する（JSON Linesのログは過去の記録の読み込みのみ）
         self.log_file_path = Path(FLIGHT_LOG_FILE_PATH)
-        self.executor = ThreadPoolExecutor()
+        self.flight_log = ColumnarFlightLog(Path(FLIGHT_RECORD_STORE_PATH), precision=TELEMETRY_PRECISION)
+        if FlightManager.shared_record_store is None:
+            FlightManager.shared_record_store = FlightRecordStore(FLIGHT_RECORD_DB_URL)
+            FlightManager.shared_record_store.start_compaction(FLIGHT_RECORD_DB_COMPACTION_INTERVAL)
+        self.record_store = FlightManager.shared_record_store
+        # 既存のログはプロセス内で一度だけ読み込み、以降はメモリ上の末尾バッファから配信する
+        if FlightManager.shared_flight_records is None:
+            stored_events = self.record_store.range()
+            timeline = EventTimeline(self.record_store)
+            FlightManager.shared_flight_records = FlightRecordBuffer(FLIGHT_RECORD_BUFFER_SIZE, timeline)
+            FlightManager.shared_flight_records.restore(self.load_flight_records(stored_events), stored_events)
+        self.flight_records = FlightManager.shared_flight_records
+        self.recorder = FlightRecorder(self)
+        self.unit_states = UnitStateMachine(self)
         self.is_launching = False
 
+    def load_flight_records(self: "FlightManager", stored_events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """バイナリログの飛行記録、ストアのイベント、過去のJSON Linesログを時刻順にまとめて読み込む
+
+        バイナリログは高レートで記録されているため、配信間隔に間引いて読み込む。
+
+        Args:
+            stored_events (list[dict[str, Any]]): ストアから読み込んだイベント
+        """
+        records = self.flight_log.read_records(FLIGHT_RECORD_PUBLISH_INTERVAL)
+        records.extend(stored_events)
+        if self.log_file_path.exists():
+            records.extend(self.load_legacy_records())
+        return sorted(records, key=lambda record: record["time"])
+
+    def load_legacy_records(self: "FlightManager") -> list[dict[str, Any]]:
+        """過去のJSON Linesログをチャンクごとに読み込む
+
+        メモリ上のバッファに残るのは末尾のFLIGHT_RECORD_BUFFER_SIZE件だけなので、それより前のレコードはイベントを含むものだけを残す。
+        """
+        tail: deque[dict[str, Any]] = deque(maxlen=FLIGHT_RECORD_BUFFER_SIZE)
+        events: list[dict[str, Any]] = []
+        for chunk in LogManager.iter_log_records(self.log_file_path):
+            for record in chunk.records:
+                if len(tail) == tail.maxlen and "event" in tail[0]:
+                    events.append(tail[0])
+                tail.append(record)
+        return events + list(tail)
+
     async def close(self: "FlightManager") -> None:
         """クリーンアップ処理を実行する"""
-        self.executor.shutdown(wait=True)
+        await self.recorder.stop()
+        await self.unit_states.stop()
+        self.telemetry_manager.close()
+        self.vessel_manager.close()
+        # 書き込み待ちのサンプルをバイナリログに、イベントをストアに保存する
+        await asyncio.to_thread(self.flight_log.close)
+        await asyncio.to_thread(self.flight_records.timeline.close)
         # 必要に応じて他のクリーンアップ処理を追加する
 
     async def countdown_and_countup(self: "FlightManager", launch_date: datetime) -> None:
-        """カウントダウンとカウントアップを開始する"""
+        """カウントダウンとカウントアップを開始する
+
+        飛行記録の記録はFlightRecorderが独自のレートで行うため、ここでは時計の更新のみを行う。
+        """
         target_time = time.perf_counter()
         while True:
             now = datetime.now(timezone.utc)
             time_diff = now - launch_date
             self.launch_relative_time = math.floor(time_diff.total_seconds())
 
-            # フライトデータの記録
-            data = self.flight_record_data()
-            if data:
-                await LogManager.save_to_log_async(data, self.log_file_path)
-
             # 次のループの目標時間を計算
-            target_time += 1.0
+            target_time += COUNTDOWN_INTERVAL
             sleep_time = max(0, target_time - time.perf_counter())
 
             await asyncio.sleep(sleep_time)
@@ -69,16 +150,19 @@ class FlightManager:
         """ロケットの打ち上げシーケンスを開始する"""
         # ユニットを初期化
         self.vessel_manager.set_all_units_status(GO)
+        # ユニットのステータス遷移はストリームの更新で判定する（テレメトリを要求するクライアントがいなくても検知する）
+        self.unit_states.start()
         # カウントダウンとカウントアップを開始
         countdown_task = asyncio.create_task(self.countdown_and_countup(command_data.launch_date))
+        self.recorder.start()
 
         try:
             # 打ち上げ時刻まで待機
             while True:
                 if LAUNCH_WARNING_THRESHOLD <= self.launch_relative_time <= 0:
-                    self.add_event_log(f"Launch in T{self.launch_relative_time} seconds")
+                    await self.add_event_log_async(f"Launch in T{self.launch_relative_time} seconds")
                 if self.launch_relative_time > 0:
-                    self.add_event_log(
+                    await self.add_event_log_async(
                         f"Launch countdown complete: T+{self.launch_relative_time} seconds",
                     )
                     break
@@ -91,6 +175,8 @@ class FlightManager:
             )
         finally:
             countdown_task.cancel()
+            await self.recorder.stop()
+            await self.unit_states.stop()
 
     async def execute_autopilot(
         self: "FlightManager",
@@ -98,8 +184,57 @@ class FlightManager:
         max_q_altitude: int,
     ) -> None:
         """オートパイロットを実行する"""
-        vessel = self.vessel_manager.vessel
-        mechjeb = self.vessel_manager.mech_jeb
+        await self.control_io.run(self.configure_ascent_autopilot, command_data)
+        # 監視のための読み取りはテレメトリ用の接続から取得したオブジェクトで行う
+        ascent_autopilot = await self.async_krpc.get(self.vessel_manager.mech_jeb, "ascent_autopilot")
+
+        await self.activate_next_stage_async()
+        self.is_launching = True
+        # フェアリングは打ち上げ中にアクティブになる
+        self.unit_states.notify()
+        logger.info("Rocket Lift off - Stage activated")
+
+        max_q_passed = False
+        await self.add_event_log_async(display_log="Rocket Lift off - Stage activated")
+        try:
+            while True:
+                # オートパイロットの状態と高度を1往復で取得する
+                values = await self.async_krpc.batch_read(
+                    {
+                        "enabled": (getattr, ascent_autopilot, "enabled"),
+                        "surface_altitude": (getattr, self.vessel_manager.flight_info, "surface_altitude"),
+                    },
+                )
+                if values["enabled"] is None:
+                    # 読み取りに失敗した場合（再接続中など）は終了と見なさず、新しい接続のオブジェクトを取り直して続ける
+                    await asyncio.sleep(1)
+                    await self.ensure_connection_state()
+                    ascent_autopilot = await self.async_krpc.get(self.vessel_manager.mech_jeb, "ascent_autopilot")
+                    continue
+                if not values["enabled"]:
+                    break
+                if (values["surface_altitude"] or 0) > max_q_altitude and not max_q_passed:
+                    max_q_passed = True
+                    await self.add_event_log_async(display_log="Max Q Passed - Maximum dynamic pressure altitude reached")
+                await asyncio.sleep(1)
+        finally:
+            control = await self.control_io.run(self.vessel_control)
+            await self.control_io.set(control, "throttle", 0)
+            await asyncio.sleep(3)
+            await self.activate_next_stage_async()
+            await self.control_io.set(control, "sas", True)  # noqa: FBT003
+            await asyncio.sleep(4)  # 姿勢が安定するまで待機
+            await self.control_io.set(control, "sas_mode", SASMode.anti_radial)  # アンチラジアル
+            await self.add_event_log_async(display_log="Launch successful! The rocket has triumphantly reached the target orbit! ")
+            self.is_launching = False
+
+    def configure_ascent_autopilot(self: "FlightManager", command_data: LaunchCommand) -> Any:  # noqa: ANN401
+        """MechJebの上昇オートパイロットを設定して有効にする（controlレーンのI/Oワーカーで実行する）
+
+        Returns:
+            Any: MechJebのAscentAutopilot
+        """
+        mechjeb = self.control.client.mech_jeb  # type: ignore
         target = command_data.target_orbit
 
         # Get the ascent autopilot module
@@ -116,76 +251,98 @@ class FlightManager:
         ascent_autopilot.auto_deploy_antennas = True
         ascent_autopilot.autostage = True
         ascent_autopilot.enabled = True
-
-        await self.activate_next_stage_async()
-        self.is_launching = True
-        logger.info("Rocket Lift off - Stage activated")
-
-        max_q_passed = False
-        self.add_event_log(display_log="Rocket Lift off - Stage activated")
-        try:
-            while ascent_autopilot.enabled:
-                if self.vessel_manager.flight_info.surface_altitude > max_q_altitude and not max_q_passed:
-                    max_q_passed = True
-                    self.add_event_log(display_log="Max Q Passed - Maximum dynamic pressure altitude reached")
-                await asyncio.sleep(1)
-        finally:
-            vessel = self.vessel_manager.vessel
-            vessel.control.throttle = 0
-            await asyncio.sleep(3)
-            await self.activate_next_stage_async()
-            vessel.control.sas = True
-            await asyncio.sleep(4)  # 姿勢が安定するまで待機
-            vessel.control.sas_mode = SASMode.anti_radial  # アンチラジアル
-            self.add_event_log(display_log="Launch successful! The rocket has triumphantly reached the target orbit! ")
-            self.is_launching = False
+        return ascent_autopilot
 
     async def activate_next_stage_async(self: "FlightManager") -> None:
         """次のステージを非同期でアクティブにする関数"""
-        await asyncio.get_event_loop().run_in_executor(
-            self.executor,
-            self.vessel_manager.vessel.control.activate_next_stage,
-        )
-
-    async def get_telemetry(self: "FlightManager") -> dict:
-        """Get telemetry data for the rocket."""
-        return {
+        await self.control_io.run(self.activate_next_stage)
+        # ステージングでパーツ構成が変わるのでタグインデックスを作り直させる
+        self.vessel_manager.invalidate_part_index()
+
+    def vessel_control(self: "FlightManager") -> Control:
+        """controlレーンの接続から取得した機体のControlを返す（controlレーンのI/Oワーカーで実行する）"""
+        if self._vessel_control is None:
+            self._vessel_control = self.control.client.space_center.active_vessel.control
+        return self._vessel_control
+
+    def activate_next_stage(self: "FlightManager") -> list:
+        """controlレーンの接続で次のステージをアクティブにする"""
+        return self.vessel_control().activate_next_stage()
+
+    async def ensure_connection_state(self: "FlightManager") -> None:
+        """再接続していた場合やアクティブな機体が切り替わった場合、古い接続・機体に紐づくストリーム・タグインデックス・制御オブジェクトを作り直す"""
+        generation = (self.krpc.generation, self.control.generation)
+        if not self.krpc.is_connected:
+            return
+        if generation == self.connection_generation and not self.vessel_manager.active_vessel_changed():
+            return
+        await self.async_krpc.run(self.rebuild_connection_state)
+        self.connection_generation = generation
+
+    def rebuild_connection_state(self: "FlightManager") -> None:
+        """新しい接続・アクティブな機体でVesselManager・TelemetryManager・RocketStatusManagerを作り直す（telemetryレーンのI/Oワーカーで実行する）
+
+        ユニットのステータスは打ち上げシーケンスの進行状況なので、作り直した後も引き継ぐ。
+        """
+        old_vessel_manager = self.vessel_manager
+        old_telemetry_manager = self.telemetry_manager
+        self.vessel_manager = VesselManager(self.krpc, ROCKET_SCHEMAS)
+        for name, unit in self.vessel_manager.units_by_name.items():
+            old_unit = old_vessel_manager.units_by_name.get(name)
+            if old_unit is not None:
+                unit.status = old_unit.status
+        self.telemetry_manager = TelemetryManager(self.vessel_manager, self.krpc)
+        self.status_manager = RocketStatusManager(self)
+        self._vessel_control = None
+        # 再接続した場合、古い接続のストリームは接続ごと閉じられているため、削除に失敗しても無視される
+        old_telemetry_manager.close()
+        old_vessel_manager.close()
+        # 新しい接続のストリームにコールバックを登録し直させる
+        self.unit_states.notify()
+        logger.info("Rebuilt vessel state for the active vessel on the current kRPC connection.")
+
+    async def get_telemetry(self: "FlightManager", since: int = 0, plan: ComputePlan | None = None) -> dict:
+        """Get telemetry data for the rocket.
+
+        計算計画に含まれないセクション・グループはkRPCから取得せず、計算もしない。
+        ユニットのステータス遷移（点火・カットオフなどのイベント）はUnitStateMachineが判定するため、ここでは判定しない。
+
+        Args:
+            since (int): クライアントが受信済みの最後のシーケンス番号。0なら保持している全レコードを返す
+            plan (ComputePlan | None): 取得するセクションとグループ。Noneなら全て
+        """
+        plan = ALL_PLAN if plan is None else plan
+        await self.ensure_connection_state()
+        telemetry: dict[str, Any] = {
             "time": datetime.now(timezone.utc).isoformat(),
             "launch_relative_time": self.launch_relative_time,
-            "flight_records": await LogManager.read_log_file_async(self.log_file_path),
-            "event_records": await LogManager.read_log_file_with_key_async(self.log_file_path, "event"),
-            "rocket_status": await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.status_manager.get_rocket_status,
-            ),
-            "vessel_telemetry": await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.telemetry_manager.get_vessel_telemetry,
-            ),
+            "sequence": self.flight_records.last_sequence,
         }
+        if "flight_records" in plan:
+            flight_records, event_records, sequence = self.flight_records.snapshot_since(since)
+            telemetry.update(sequence=sequence, flight_records=flight_records, event_records=event_records)
+        if "rocket_status" in plan:
+            telemetry["rocket_status"] = await self.async_krpc.run(self.status_manager.get_rocket_status, plan["rocket_status"])
+        if "vessel_telemetry" in plan:
+            telemetry["vessel_telemetry"] = await self.async_krpc.run(self.telemetry_manager.get_vessel_telemetry, plan["vessel_telemetry"])
+        return telemetry
 
     def flight_record_data(self: "FlightManager") -> dict[str, Any] | None:
         """飛行データを記録する"""
         try:
-            finfo = self.vessel_manager.flight_info
-            orbit = self.vessel_manager.orbit
             return {
                 "time": datetime.now(timezone.utc).isoformat(),
                 "launch_relative_time": self.launch_relative_time,
-                "heading": finfo.heading,
-                "altitude": finfo.surface_altitude,
-                "latitude": finfo.latitude,
-                "longitude": finfo.longitude,
-                "orbital_speed": orbit.speed,
-                "apoapsis_altitude": orbit.apoapsis_altitude,
-                "periapsis_altitude": orbit.periapsis_altitude,
-                "inclination": orbit.inclination,
-                "eccentricity": orbit.eccentricity,
+                **self.telemetry_manager.streams.snapshot("flight_record"),
             }
         except Exception:
             logger.exception("Error recording flight data")
             return None
 
+    async def add_event_log_async(self: "FlightManager", msg: str | None = None, display_log: str | None = None) -> None:
+        """イベントログをI/Oワーカーで追加する（ストリームが使えない場合のRPCとSQLiteへの書き込みでイベントループを止めない）"""
+        await self.async_krpc.run(self.add_event_log, msg, display_log)
+
     def add_event_log(self: "FlightManager", msg: str | None = None, display_log: str | None = None) -> None:
         """イベントログを追加する"""
         flight_data = self.flight_record_data()
@@ -201,4 +358,5 @@ class FlightManager:
 
         if new_data:
             flight_data.update(new_data)
-            LogManager.save_to_log_sync(flight_data, self.log_file_path)
+            # イベントはタイムラインの書き込みスレッドがストアに保存する
+            self.flight_records.append(round_in_place(flight_data))
@@ -48,6 +48,26 @@ class FlightDynamics:
         # 大気抵抗による加速度を計算
         return self.calculate_atmospheric_drag() / mass
 
+    @staticmethod
+    def atmospheric_drag_acceleration(air_density: float, speed: float, drag_coefficient: float, mass: float) -> float:
+        """取得済みの値から大気抵抗による加速度を計算する
+
+        calculate_atmospheric_drag_accelerationと同じ計算を、ストリームなどで取得済みの値を使ってRPCなしで行う。
+
+        Args:
+            air_density (float): 大気密度（kg/m^3）
+            speed (float): 対地速度（m/s）
+            drag_coefficient (float): 抗力係数
+            mass (float): 船体の質量（kg）
+
+        Returns:
+            float: 大気抵抗による加速度 [m/s^2]
+        """
+        if mass <= 0:
+            return 0
+        area = 5.917
+        return 0.5 * air_density * speed**2 * area * drag_coefficient / mass
+
     def calculate_delta_v(self: "FlightDynamics", isp: float, fuel_mass: float, m0: float) -> float:
         """宇宙船のデルタVを計算する
 
@@ -0,0 +1,110 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from src.settings.config import (
+    FLIGHT_RECORD_PUBLISH_INTERVAL,
+    FLIGHT_RECORDER_FLUSH_INTERVAL,
+    FLIGHT_RECORDER_RING_SIZE,
+    FLIGHT_RECORDER_SAMPLE_RATE,
+)
+from src.utils.commons.sample_ring_buffer import SampleRingBuffer
+from src.utils.decorators.round_output import round_in_place
+
+if TYPE_CHECKING:
+    from src.utils.krpc_module.auto_pilot_manager import FlightManager
+
+logger = logging.getLogger(__name__)
+
+
+class FlightRecorder:
+    """カウントダウンの時計とは独立したレートで飛行記録をサンプリングするクラス
+
+    サンプルはkRPCストリームのキャッシュから読み、固定長レコードに変換してリングバッファに溜める。
+    リングバッファはflush_intervalごとにまとめてバイナリログへ書き込む。
+    WebSocketクライアントにはpublish_intervalごとのサンプルだけをメモリ上のバッファ経由で配信する。
+    """
+
+    def __init__(
+        self: "FlightRecorder",
+        flight_manager: "FlightManager",
+        sample_rate: float = FLIGHT_RECORDER_SAMPLE_RATE,
+        flush_interval: float = FLIGHT_RECORDER_FLUSH_INTERVAL,
+        publish_interval: float = FLIGHT_RECORD_PUBLISH_INTERVAL,
+    ) -> None:
+        """Initialize the FlightRecorder class.
+
+        Args:
+            flight_manager (FlightManager): 飛行記録の取得元と配信先を持つFlightManager
+            sample_rate (float): サンプリングレート（Hz）
+            flush_interval (float): バイナリログに書き込む間隔（秒）
+            publish_interval (float): WebSocketクライアントに配信する間隔（秒）
+        """
+        self.flight_manager = flight_manager
+        self.flight_log = flight_manager.flight_log
+        self.sample_interval = 1 / sample_rate
+        self.flush_interval = flush_interval
+        self.publish_interval = publish_interval
+        # リングバッファの容量はFLIGHT_RECORDER_RING_SIZE（書き込みが遅れた場合は古いサンプルから破棄）
+        self.ring = SampleRingBuffer(self.flight_log.record_struct.size, FLIGHT_RECORDER_RING_SIZE)
+        self.sample_count = 0
+        self._next_publish = 0.0
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self: "FlightRecorder") -> None:
+        """サンプリングと書き込みのタスクを開始する"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self.sample_loop()), asyncio.create_task(self.flush_loop())]
+
+    async def stop(self: "FlightRecorder") -> None:
+        """タスクを停止し、残っているサンプルを書き込む"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self.flush()
+        if self.ring.dropped_samples:
+            logger.warning("Flight recorder dropped %s samples because flushing fell behind.", self.ring.dropped_samples)
+
+    async def sample_loop(self: "FlightRecorder") -> None:
+        """sample_intervalごとにサンプルを記録する"""
+        target_time = time.perf_counter()
+        while True:
+            self.sample()
+            target_time += self.sample_interval
+            await asyncio.sleep(max(0, target_time - time.perf_counter()))
+
+    async def flush_loop(self: "FlightRecorder") -> None:
+        """flush_intervalごとに溜まったサンプルを書き込む"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush flight samples")
+
+    def sample(self: "FlightRecorder") -> None:
+        """飛行記録を1件サンプリングしてリングバッファに積み、配信間隔に達していればクライアントにも配信する"""
+        data = self.flight_manager.flight_record_data()
+        if data is None:
+            return
+        self.sample_count += 1
+        # バイナリログのsequence列にはサンプル番号を記録する
+        self.ring.push(self.flight_log.pack({**data, "sequence": self.sample_count}))
+
+        now = time.monotonic()
+        if now >= self._next_publish:
+            # バイナリログには丸める前の値を記録し、配信するレコードだけを丸める
+            self.flight_manager.flight_records.append(round_in_place(data))
+            self._next_publish = now + self.publish_interval
+
+    def flush(self: "FlightRecorder") -> None:
+        """リングバッファのサンプルをまとめてバイナリログの書き込みスレッドに渡す（ファイルへの書き込みは待たない）"""
+        data = self.ring.drain()
+        if data:
+            self.flight_log.append_packed(data)
@@ -1,23 +1,66 @@
+import functools
 import logging
+import random
+import sys
 import threading
 import time
 from typing import Any, Callable
 
 import krpc
+import krpc.schema.KRPC_pb2 as KRPC
+from krpc.client import Client
+from krpc.decoder import Decoder
 from krpc.error import ConnectionError, RPCError
 
+from src.settings.config import KRPC_HEALTH_CHECK_INTERVAL, KRPC_RECONNECT_BASE_DELAY, KRPC_RECONNECT_MAX_DELAY
+from src.utils.commons.metrics import REGISTRY
+from src.utils.krpc_module.async_krpc_client import AsyncKrpcClient
+
 logger = logging.getLogger(__name__)
 
+RPC_LABELS = ("service", "procedure", "caller")
+RPC_CALLS = REGISTRY.counter(
+    "krpc_rpc_calls_total",
+    "Number of kRPC procedure calls (including calls inside batched requests).",
+    RPC_LABELS,
+)
+RPC_ERRORS = REGISTRY.counter("krpc_rpc_errors_total", "Number of kRPC round-trips that raised an error.", RPC_LABELS)
+RPC_DURATION = REGISTRY.histogram("krpc_rpc_duration_seconds", "Latency of one kRPC round-trip.", RPC_LABELS)
+RECONNECTS = REGISTRY.counter("krpc_reconnects_total", "Number of kRPC reconnect attempts by result.", ("connection", "result"))
+STREAM_READS = REGISTRY.counter("krpc_stream_reads_total", "Number of values read from kRPC stream caches.", ("section", "caller"))
+
+
+def rpc_caller() -> str:
+    """RPCを呼び出したアプリケーション側のクラス名（なければモジュール名）を返す
+
+    呼び出し元のフレームをさかのぼり、krpcライブラリとこのモジュール以外で最初に見つかったsrc配下のフレームを呼び出し元とする。
+    """
+    frame = sys._getframe(2)  # noqa: SLF001
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.") and module != __name__:
+            instance = frame.f_locals.get("self")
+            return type(instance).__name__ if instance is not None else module.rsplit(".", 1)[-1]
+        frame = frame.f_back
+    return "unknown"
+
 
 class KrpcClient:
     """KRPCクライアントを管理するクラス"""
 
-    def __init__(self: "KrpcClient", connection_name: str, check_interval: int = 5) -> None:
+    def __init__(self: "KrpcClient", connection_name: str, check_interval: float = KRPC_HEALTH_CHECK_INTERVAL) -> None:
         """Initialize the KrpcClient class."""
         self.connection_name = connection_name
         self.client = None
         self.is_connected = False  # 接続状態を追跡
         self.check_interval = check_interval  # 接続状態のチェック間隔（秒）
+        self.game_scene: Any = None  # シーン変更のストリーム（なければ接続確認のRPC）で更新するゲームシーン
+        self.last_heartbeat = 0.0  # 最後にストリームの更新またはRPCの応答を受け取った時刻（time.monotonic）
+        self.generation = 0  # 接続し直すたびに増える番号。ストリームやインデックスを作り直す判定に使う
+        self.reconnect_attempts = 0
+        self._scene_stream: Any = None
+        # イベントループからのRPCはこの接続専用のI/Oワーカーで直列に実行する
+        self.io = AsyncKrpcClient(self)
         self.initialize(connection_name)
         self.monitor_thread = threading.Thread(target=self.monitor_connection, daemon=True)
         self.monitor_thread.start()
@@ -26,7 +69,10 @@ class KrpcClient:
         """KRPCクライアントを初期化するメソッド"""
         self.close_existing_client()  # 既存のクライアントを閉じる
         try:
+            self.instrument()
             self.client = krpc.connect(name=connection_name)
+            self.watch_connection(self.client)
+            self.generation += 1
             self.is_connected = True  # 接続成功を記録
             logger.info("KRPC connected successfully.")
         except Exception:
@@ -39,14 +85,65 @@ class KrpcClient:
         """接続状態を返すプロパティ"""
         return self.is_connected
 
+    @property
+    def is_flight_scene(self: "KrpcClient") -> bool:
+        """キャッシュしたゲームシーンがフライトシーンかどうか"""
+        return getattr(self.game_scene, "name", self.game_scene) == "flight"
+
+    def watch_connection(self: "KrpcClient", client: Any) -> None:  # noqa: ANN401
+        """ストリームの更新を接続の生存確認に使い、ゲームシーンをストリームでキャッシュする
+
+        テレメトリのストリームが更新されている間は、接続確認のためのRPCを送らない。
+        """
+        self.last_heartbeat = time.monotonic()
+        client.add_stream_update_callback(self._on_stream_update)
+        try:
+            self._scene_stream = client.add_stream(getattr, client.krpc, "current_game_scene")
+            self._scene_stream.add_callback(self._on_scene_change)
+            self.game_scene = self._scene_stream()
+        except (RPCError, AttributeError):
+            logger.warning("Failed to add game scene stream, refreshing the scene on health checks instead.")
+            self._scene_stream = None
+            self.game_scene = client.krpc.current_game_scene
+
+    def _on_stream_update(self: "KrpcClient") -> None:
+        """ストリームの更新を受け取った時刻を記録する（ストリームのスレッドから呼ばれる）"""
+        self.last_heartbeat = time.monotonic()
+
+    def _on_scene_change(self: "KrpcClient", scene: Any) -> None:  # noqa: ANN401
+        """ゲームシーンの変更を反映する（ストリームのスレッドから呼ばれる）"""
+        if scene != self.game_scene:
+            logger.info("Game scene changed: %s -> %s", self.game_scene, scene)
+        self.game_scene = scene
+
+    def heartbeat(self: "KrpcClient") -> None:
+        """ゲームシーンを取得する軽いRPCで接続を確認し、キャッシュしたシーンも更新する"""
+        if self.client is None:
+            msg = "KRPC client is not available."
+            raise ConnectionError(msg)
+        self.game_scene = self.client.krpc.current_game_scene
+        self.last_heartbeat = time.monotonic()
+
+    def backoff_delay(self: "KrpcClient") -> float:
+        """再接続までの待ち時間を返す（指数バックオフ＋ジッター）"""
+        delay = min(KRPC_RECONNECT_MAX_DELAY, KRPC_RECONNECT_BASE_DELAY * 2**self.reconnect_attempts)
+        return delay * random.uniform(0.5, 1.0)  # noqa: S311
+
     def reconnect(self: "KrpcClient") -> None:
         """再接続を試みるメソッド"""
         logger.info("Attempting to reconnect to KRPC...")
-        self.initialize(self.connection_name)
+        try:
+            self.initialize(self.connection_name)
+        except Exception:
+            RECONNECTS.inc(self.connection_name, "failure")
+            raise
+        RECONNECTS.inc(self.connection_name, "success")
+        self.reconnect_attempts = 0
 
     def close_existing_client(self: "KrpcClient") -> None:
         """既存のクライアントを閉じるメソッド"""
         if self.client is not None:
+            self._scene_stream = None
             try:
                 self.client.close()
                 logger.info("Existing KRPC client closed.")
@@ -56,33 +153,32 @@ class KrpcClient:
                 self.client = None
 
     def disconnect(self: "KrpcClient") -> None:
-        """接続を閉じるメソッド"""
+        """接続を閉じるメソッド（I/Oワーカーも停止する）"""
         if self.client:
             self.client.close()
             self.is_connected = False
             logger.info("KRPC connection closed successfully.")
+        self.io.close()
 
     def monitor_connection(self: "KrpcClient") -> None:
-        """接続状態を定期的にチェックするメソッド"""
+        """接続状態を定期的にチェックするメソッド
+
+        check_intervalの間にストリームの更新が届いていればRPCは送らない。
+        届いていなければ軽いRPCで確認し、失敗した場合は指数バックオフとジッターを入れて再接続を繰り返す。
+        """
         while True:
+            delay = self.check_interval
             try:
-                # 接続状態をチェックする簡単なRPCを実行
-                if self.is_connected:
-                    if self.client and hasattr(self.client, "space_center") and self.client.space_center:
-                        _ = self.client.space_center.active_vessel
-                    else:
-                        logger.warning("Space Center is not available.")
-                        self.is_connected = False
-                        self.reconnect()
-                else:
+                if not self.is_connected:
                     self.reconnect()
-            except (RPCError, ConnectionError) as e:
-                logger.warning("Connection lost: %s. Attempting to reconnect...", e)
+                elif time.monotonic() - self.last_heartbeat >= self.check_interval:
+                    self.heartbeat()
+            except Exception as e:  # noqa: BLE001
                 self.is_connected = False
-                self.reconnect()
-            except Exception:
-                logger.exception("Unexpected error")
-            time.sleep(self.check_interval)
+                delay = self.backoff_delay()
+                self.reconnect_attempts += 1
+                logger.warning("KRPC connection check failed: %s. Retrying in %.1f seconds...", e, delay)
+            time.sleep(delay)
 
     def execute_with_reconnect(self: "KrpcClient", function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any | None:  # noqa: ANN401
         """接続が失われた場合に再接続を試みながら指定された関数を実行する
@@ -100,14 +196,13 @@ class KrpcClient:
             if not self.is_connected:
                 self.reconnect()
 
-            # ゲームシーンをチェック
-            if self.client and hasattr(self.client, "krpc") and self.client.krpc:
-                scene = self.client.krpc.current_game_scene
-                if scene == "flight":
-                    return function(*args, **kwargs)
-                logger.warning("Function %s not executed: Invalid game scene '%s'.", function.__name__, scene)
-            else:
+            # ゲームシーンをチェック（キャッシュした値を使うためRPCは発生しない）
+            if self.client is None:
                 logger.warning("KRPC client is not available.")
+            elif self.is_flight_scene:
+                return function(*args, **kwargs)
+            else:
+                logger.warning("Function %s not executed: Invalid game scene '%s'.", function.__name__, self.game_scene)
             return None
         except RPCError:
             logger.exception("RPCError occurred: attempting to reconnect...")
@@ -116,3 +211,87 @@ class KrpcClient:
         except Exception:
             logger.exception("Unexpected error")
             raise
+
+    @staticmethod
+    def instrument() -> None:
+        """全クライアントのRPCの呼び出し数・エラー数・レイテンシを記録するようにする（2回目以降は何もしない）
+
+        kRPCのサービスのプロパティ・メソッドは全てClient._invokeを経由する。
+        動的に生成されるサービス（MechJebなど）はClientの初期化中に_invokeをバインドするため、
+        接続後にインスタンスの_invokeを置き換えても計測されない。そのため接続前にClientクラスの_invokeを置き換える。
+        """
+        invoke = Client._invoke  # noqa: SLF001
+        if getattr(invoke, "instrumented", False):
+            return
+
+        @functools.wraps(invoke)
+        def instrumented_invoke(client: Client, service: str, procedure: str, *args: Any) -> Any:  # noqa: ANN401
+            labels = (service, procedure, rpc_caller())
+            start = time.perf_counter()
+            try:
+                return invoke(client, service, procedure, *args)
+            except Exception:
+                RPC_ERRORS.inc(*labels)
+                raise
+            finally:
+                RPC_DURATION.observe(time.perf_counter() - start, *labels)
+                RPC_CALLS.inc(*labels)
+
+        instrumented_invoke.instrumented = True  # type: ignore[attr-defined]
+        Client._invoke = instrumented_invoke  # type: ignore[method-assign]  # noqa: SLF001
+
+    def batch_read(self: "KrpcClient", reads: dict[str, tuple[Any, ...]]) -> dict[str, Any]:
+        """複数の読み取りRPCを1回のリクエストにまとめて実行する
+
+        kRPCのRequestは複数のProcedureCallを持てるため、1スナップショット分の読み取りを1往復で取得できる。
+
+        Args:
+            reads (dict[str, tuple[Any, ...]]): キーと、add_streamと同じ形式の呼び出しの辞書
+                - (getattr, obj, "attribute"): プロパティの読み取り
+                - (obj.method, *args): 引数付きのメソッド呼び出し
+
+        Returns:
+            dict[str, Any]: キーと値の辞書。対象がNone・存在しない属性・サーバー側でエラーになった呼び出しはNone
+        """
+        results: dict[str, Any] = dict.fromkeys(reads)
+        client = self.client
+        if client is None or not reads:
+            return results
+
+        keys = []
+        request = KRPC.Request()
+        return_types = []
+        for key, (func, *args) in reads.items():
+            if func is getattr and args[0] is None:
+                continue
+            try:
+                call = client.get_call(func, *args)
+                return_type = client._get_return_type(func, *args)  # noqa: SLF001
+            except AttributeError:
+                # getattr(obj, key, default)と同様に、存在しない属性はデフォルト値(None)のままにする
+                continue
+            keys.append(key)
+            request.calls.append(call)
+            return_types.append(return_type)
+
+        if not keys:
+            return results
+
+        caller = rpc_caller()
+        start = time.perf_counter()
+        with client._rpc_connection_lock:  # noqa: SLF001
+            client._rpc_connection.send_message(request)  # noqa: SLF001
+            response = client._rpc_connection.receive_message(KRPC.Response)  # noqa: SLF001
+        RPC_DURATION.observe(time.perf_counter() - start, "batch", "batch_read", caller)
+        for call in request.calls:
+            RPC_CALLS.inc(call.service, call.procedure, caller)
+        if response.HasField("error"):
+            RPC_ERRORS.inc("batch", "batch_read", caller)
+            raise client._build_error(response.error)  # noqa: SLF001
+
+        for key, result, return_type in zip(keys, response.results, return_types, strict=True):
+            if result.HasField("error"):
+                logger.debug("Batched read %s failed: %s", key, result.error.description)
+                continue
+            results[key] = Decoder.decode(client, result.value, return_type)
+        return results
@@ -0,0 +1,62 @@
+import logging
+
+from src.utils.krpc_module.krpc_client import KrpcClient
+
+logger = logging.getLogger(__name__)
+
+# 飛行制御（ステージング・スロットル・SAS・MechJeb）用のレーン
+CONTROL_LANE = "control"
+# テレメトリ・ステータスの取得用のレーン
+TELEMETRY_LANE = "telemetry"
+
+
+class KrpcConnectionPool:
+    """用途（レーン）ごとに名前付きのkRPC接続を保持するクラス
+
+    レーンごとに別のソケットとI/Oワーカーを持つため、重いテレメトリのスナップショットが制御コマンドを待たせない。
+    同じ接続名を指定したレーンは1つの接続を共有する。
+    """
+
+    def __init__(self: "KrpcConnectionPool", clients: dict[str, KrpcClient]) -> None:
+        """Initialize the KrpcConnectionPool class.
+
+        Args:
+            clients (dict[str, KrpcClient]): レーン名と接続の辞書。controlとtelemetryのレーンが必要
+        """
+        missing = {CONTROL_LANE, TELEMETRY_LANE} - clients.keys()
+        if missing:
+            msg = f"kRPC connection pool is missing lanes: {', '.join(sorted(missing))}"
+            raise ValueError(msg)
+        self.clients = clients
+
+    @classmethod
+    def connect(cls: type["KrpcConnectionPool"], lanes: dict[str, str]) -> "KrpcConnectionPool":
+        """レーンごとにkRPCに接続してプールを作成する
+
+        Args:
+            lanes (dict[str, str]): レーン名とkRPCの接続名の辞書
+        """
+        connections: dict[str, KrpcClient] = {}
+        for connection_name in dict.fromkeys(lanes.values()):
+            connections[connection_name] = KrpcClient(connection_name)
+        logger.info("kRPC connection pool opened %s connections for lanes %s", len(connections), ", ".join(lanes))
+        return cls({lane: connections[connection_name] for lane, connection_name in lanes.items()})
+
+    def lane(self: "KrpcConnectionPool", name: str) -> KrpcClient:
+        """指定されたレーンの接続を返す"""
+        return self.clients[name]
+
+    @property
+    def control(self: "KrpcConnectionPool") -> KrpcClient:
+        """飛行制御用の接続"""
+        return self.clients[CONTROL_LANE]
+
+    @property
+    def telemetry(self: "KrpcConnectionPool") -> KrpcClient:
+        """テレメトリ取得用の接続"""
+        return self.clients[TELEMETRY_LANE]
+
+    def disconnect(self: "KrpcConnectionPool") -> None:
+        """全ての接続を閉じる"""
+        for client in {id(client): client for client in self.clients.values()}.values():
+            client.disconnect()
@@ -0,0 +1,226 @@
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Literal
+
+from krpc.error import ConnectionError, RPCError
+
+from src.settings.config import PART_PROPERTY_SLOW_TTL, TELEMETRY_STREAM_RATE
+from src.utils.krpc_module.krpc_client import STREAM_READS, rpc_caller
+
+if TYPE_CHECKING:
+    from src.utils.krpc_module.krpc_client import KrpcClient
+
+logger = logging.getLogger(__name__)
+
+# 属性の種類
+#   static: パーツごとに1回だけ取得する（最大温度・真空比推力・推進剤・リソースの最大量など飛行中に変わらない値）
+#   slow: slow_ttlごとに取得し直す（展開状態・シールドなど、まれにしか変わらない値）
+#   live: kRPCストリームでキャッシュされた最新値を読む（推力・温度・リソースの残量など）
+#   poll: 毎回バッチRPCで取得する（大気圧に応じた比推力など、引数が毎回変わる呼び出し）
+PropertyKind = Literal["static", "slow", "live", "poll"]
+# 属性名 -> (種類, add_stream・batch_readと同じ形式の呼び出し)
+PropertyCalls = dict[str, tuple[PropertyKind, tuple[Any, ...]]]
+
+
+class PartProperties:
+    """1つのパーツ（kRPCのオブジェクトの同一性）についてキャッシュした属性値とストリーム"""
+
+    def __init__(self: "PartProperties", obj: Any) -> None:  # noqa: ANN401
+        """Initialize the PartProperties class.
+
+        Args:
+            obj (Any): キャッシュの対象のパーツ（通信システムの場合は機体）
+        """
+        self.obj = obj
+        # staticとslowの属性のキャッシュした値
+        self.cached: dict[str, Any] = {}
+        self.slow_expires: dict[str, float] = {}
+        self.live: dict[str, Callable[[], Any]] = {}
+        # ストリームを登録できなかったliveの属性（pollとして扱う）
+        self.polled: set[str] = set()
+        self.streams: list[Any] = []
+        # liveの属性ごとに、値の更新時に呼ばれるコールバック
+        self.callbacks: dict[str, Callable[[Any], None]] = {}
+
+    def close(self: "PartProperties") -> None:
+        """登録したコールバックとストリームを削除する"""
+        for attr, callback in self.callbacks.items():
+            self._remove_callback(self.live[attr], callback)
+        self.callbacks.clear()
+        for stream in self.streams:
+            self._remove_stream(stream)
+        self.streams.clear()
+        self.live.clear()
+
+    @staticmethod
+    def _remove_callback(stream: Any, callback: Callable[[Any], None]) -> None:  # noqa: ANN401
+        """ストリームからコールバックを削除する（削除済みで見つからない場合は警告のみ）"""
+        try:
+            stream.remove_callback(callback)
+        except ValueError:
+            logger.warning("Failed to remove part property callback.")
+
+    @staticmethod
+    def _remove_stream(stream: Any) -> None:  # noqa: ANN401
+        """ストリームを削除する（切断済みなどで削除できない場合は警告のみ）"""
+        try:
+            stream.remove()
+        except (RPCError, ConnectionError):
+            logger.warning("Failed to remove part property stream.")
+
+
+class PartPropertyCache:
+    """パーツの属性値を種類ごとにキャッシュし、足りない値だけをバッチRPCで取得するクラス
+
+    キャッシュはユニット名などのキーごとに保持し、キーに対応するパーツの同一性が変わった場合
+    （切り離し・ステージング後のタグインデックスの作り直し）は破棄して、ストリームも削除する。
+    """
+
+    def __init__(
+        self: "PartPropertyCache",
+        krpc: "KrpcClient",
+        slow_ttl: float = PART_PROPERTY_SLOW_TTL,
+        rate: float = TELEMETRY_STREAM_RATE,
+    ) -> None:
+        """Initialize the PartPropertyCache class.
+
+        Args:
+            krpc (KrpcClient): 値を取得する接続
+            slow_ttl (float): slowの属性を取得し直す間隔（秒）
+            rate (float): liveの属性のストリームの更新レート（Hz）。0の場合はゲームの物理フレームごとに更新される
+        """
+        self.krpc = krpc
+        self.slow_ttl = slow_ttl
+        self.rate = rate
+        self.entries: dict[str, PartProperties] = {}
+
+    def sync(self: "PartPropertyCache", objects: dict[str, Any]) -> None:
+        """キーごとの現在のパーツを反映し、パーツが変わった・なくなったキーのキャッシュを破棄する
+
+        Args:
+            objects (dict[str, Any]): キーと現在のパーツの辞書。パーツがNoneならキャッシュを破棄する
+        """
+        for key, obj in objects.items():
+            entry = self.entries.get(key)
+            if entry is not None and (obj is None or entry.obj != obj):
+                self.invalidate(key)
+            if obj is not None and key not in self.entries:
+                self.entries[key] = PartProperties(obj)
+
+    def invalidate(self: "PartPropertyCache", key: str) -> None:
+        """キーのキャッシュを破棄し、ストリームを削除する"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry.close()
+            logger.debug("Invalidated part property cache for %s.", key)
+
+    def read(self: "PartPropertyCache", requests: dict[str, PropertyCalls]) -> dict[str, Any]:
+        """キーごとの属性値を取得する
+
+        キャッシュにないstatic・期限切れのslow・pollの属性は1回のバッチRPCでまとめて取得する。
+        liveの属性は初回にストリームを登録し、以降はキャッシュされた最新値を読む（登録に失敗した属性はpollとして扱う）。
+
+        Args:
+            requests (dict[str, PropertyCalls]): キー（syncで登録したもの）ごとの取得する属性
+
+        Returns:
+            dict[str, Any]: "キー.属性名"と値の辞書（batch_readと同じ形式）
+        """
+        now = time.monotonic()
+        values = self.krpc.batch_read(self._pending_reads(requests, now))
+        self._store(requests, values, now)
+        return self._results(requests, values)
+
+    def _pending_reads(self: "PartPropertyCache", requests: dict[str, PropertyCalls], now: float) -> dict[str, tuple[Any, ...]]:
+        """バッチRPCで取得する呼び出し（キャッシュにないstatic・期限切れのslow・poll、ストリームのないlive）を返す
+
+        liveの属性は初回にストリームを登録する。
+        """
+        reads: dict[str, tuple[Any, ...]] = {}
+        live_reads = 0
+        for key, calls in requests.items():
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            for attr, (kind, call) in calls.items():
+                if kind == "live" and attr not in entry.live and attr not in entry.polled:
+                    self._add_stream(entry, attr, call)
+                if attr in entry.live:
+                    live_reads += 1
+                elif kind in ("live", "poll") or attr not in entry.cached or entry.slow_expires.get(attr, math.inf) <= now:
+                    reads[f"{key}.{attr}"] = call
+        if live_reads:
+            STREAM_READS.inc("part_properties", rpc_caller(), amount=live_reads)
+        return reads
+
+    def _store(self: "PartPropertyCache", requests: dict[str, PropertyCalls], values: dict[str, Any], now: float) -> None:
+        """バッチRPCで取得したstatic・slowの値をキャッシュする"""
+        for path, value in values.items():
+            key, attr = path.split(".", 1)
+            kind = requests[key][attr][0]
+            if kind in ("static", "slow"):
+                self.entries[key].cached[attr] = value
+            if kind == "slow":
+                self.entries[key].slow_expires[attr] = now + self.slow_ttl
+
+    def _results(self: "PartPropertyCache", requests: dict[str, PropertyCalls], values: dict[str, Any]) -> dict[str, Any]:
+        """バッチRPCで取得した値・ストリームの最新値・キャッシュした値を"キー.属性名"の辞書にまとめる"""
+        results: dict[str, Any] = {}
+        for key, calls in requests.items():
+            entry = self.entries.get(key)
+            for attr in calls:
+                path = f"{key}.{attr}"
+                if path in values:
+                    results[path] = values[path]
+                elif entry is None:
+                    results[path] = None
+                elif attr in entry.live:
+                    results[path] = entry.live[attr]()
+                else:
+                    results[path] = entry.cached.get(attr)
+        return results
+
+    def _add_stream(self: "PartPropertyCache", entry: PartProperties, attr: str, call: tuple[Any, ...]) -> None:
+        """liveの属性のストリームを登録する。対象のオブジェクトがNoneの呼び出しや、登録に失敗した属性は登録しない"""
+        func, *args = call
+        client = self.krpc.client
+        if client is None:
+            return
+        if func is getattr and args[0] is None:
+            entry.polled.add(attr)
+            return
+        try:
+            stream = client.add_stream(func, *args)
+            if self.rate:
+                stream.rate = self.rate
+        except (RPCError, AttributeError):
+            logger.warning("Failed to add stream for part property %s, falling back to polling.", attr)
+            entry.polled.add(attr)
+            return
+        entry.streams.append(stream)
+        entry.live[attr] = stream
+
+    def watch(self: "PartPropertyCache", key: str, attr: str, callback: Callable[[Any], None]) -> bool:
+        """liveの属性のストリームが更新されたときに呼ばれるコールバックを登録する
+
+        コールバックはkRPCのストリームを受信するスレッドで呼ばれる。キャッシュが破棄されるとコールバックも削除される。
+        先にreadで属性を読み込み、ストリームを登録しておく必要がある。
+
+        Returns:
+            bool: 登録できた（または登録済みの）場合はTrue。ストリームがない属性はFalse（呼び出し元がポーリングする）
+        """
+        entry = self.entries.get(key)
+        stream = entry.live.get(attr) if entry is not None else None
+        if entry is None or stream is None or not hasattr(stream, "add_callback"):
+            return False
+        if attr not in entry.callbacks:
+            stream.add_callback(callback)
+            entry.callbacks[attr] = callback
+        return True
+
+    def close(self: "PartPropertyCache") -> None:
+        """全てのキャッシュを破棄し、登録したストリームを削除する"""
+        for key in list(self.entries):
+            self.invalidate(key)
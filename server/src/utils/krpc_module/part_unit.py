@@ -4,7 +4,7 @@ from krpc.services.spacecenter import Part, Vessel
 class PartUnit:
     """ロケットのパーツを管理するユニットクラス"""
 
-    def __init__(self: "PartUnit", vessel: Vessel, config: dict)-> None:
+    def __init__(self: "PartUnit", vessel: Vessel, config: dict, part: Part | None = None)-> None:
         """Initialize the PartUnit class.
 
         Status:
@@ -20,15 +20,13 @@ class PartUnit:
         self.part_type: str = config["part_type"]
 
         self.status: int = config["status"]
-        self.part: Part | None = self.find_part()
+        # パーツはVesselManagerのタグインデックスから設定される
+        self.part: Part | None = part
 
-    def find_part(self: "PartUnit") -> Part | None:
-        """タグが一致するパーツを検索して返す"""
-        for part in self.vessel.parts.all:
-            if part.tag == self.tag:
-                return part
-        return None
+    def update(self: "PartUnit", part: Part | None) -> None:
+        """ユニットのパーツを更新する
 
-    def update(self: "PartUnit") -> None:
-        """ユニットのパーツを更新する"""
-        self.part = self.find_part()
+        Args:
+            part (Part | None): タグが一致するパーツ。機体から切り離された場合はNone
+        """
+        self.part = part
@@ -3,18 +3,76 @@ from __future__ import annotations
 import logging
 from typing import TYPE_CHECKING, Any
 
-from src.settings.config import ACTIVE, CUTOFF, GO
+from src.settings.config import CUTOFF
 from src.utils.decorators.round_output import round_output
 from src.utils.krpc_module.flight_dynamics import FlightDynamics
 
 if TYPE_CHECKING:
-    from krpc.services.spacecenter import Part
+    from collections.abc import Collection
 
     from src.utils.krpc_module.auto_pilot_manager import FlightManager
+    from src.utils.krpc_module.part_property_cache import PropertyCalls, PropertyKind
     from src.utils.krpc_module.part_unit import PartUnit
 
 logger = logging.getLogger(__name__)
 
+# part_typeごとに読み込むパーツのモジュール（Partのプロパティ名）
+PART_MODULES = {
+    "antenna": "antenna",
+    "solar_panel": "solar_panel",
+    "reaction_wheel": "reaction_wheel",
+    "engine": "engine",
+    "tank": "resources",
+    "satellite_bus": "resources",
+}
+
+# part_typeごとにパーツ自身から読み込む属性と、その種類（static/slow/liveはpart_property_cacheを参照）
+PART_ATTRIBUTES: dict[str, dict[str, PropertyKind]] = {
+    "engine": {"temperature": "live", "max_temperature": "static"},
+    "tank": {"temperature": "live", "max_temperature": "static"},
+    "fairing": {"dynamic_pressure": "live", "temperature": "live", "max_temperature": "static"},
+    "satellite_bus": {"shielded": "live"},
+}
+
+# part_typeごとにモジュールから読み込む属性と、その種類
+MODULE_ATTRIBUTES: dict[str, dict[str, PropertyKind]] = {
+    "antenna": {"power": "static", "packet_interval": "static", "packet_size": "static", "packet_resource_cost": "static"},
+    "solar_panel": {"deployed": "live", "energy_flow": "live", "sun_exposure": "live"},
+    "reaction_wheel": {"active": "slow", "available_torque": "live", "max_torque": "static"},
+    "engine": {
+        "active": "live",
+        "thrust": "live",
+        "max_thrust": "live",
+        "available_thrust": "live",
+        "vacuum_specific_impulse": "static",
+        "propellants": "static",
+    },
+}
+
+# 通信システムから読み込む属性と、その種類
+COMMUNICATION_ATTRIBUTES: dict[str, PropertyKind] = {
+    "can_communicate": "slow",
+    "can_transmit_science": "slow",
+    "signal_strength": "live",
+    "signal_delay": "live",
+    "power": "slow",
+}
+
+# get_rocket_statusの出力キーごとに、まとめて計算するユニット（同じステージのエンジンとタンクなど）
+STATUS_GROUP_UNITS = {
+    "antenna": ("antenna",),
+    "reaction_wheel": ("reaction_wheel",),
+    "satellite_bus": ("satellite_bus",),
+    "main_engine": ("main_engine", "main_tank"),
+    "main_tank": ("main_engine", "main_tank"),
+    "second_engine": ("second_engine", "second_tank"),
+    "second_tank": ("second_engine", "second_tank"),
+    "solar_panel_1": ("solar_panel_1", "solar_panel_2"),
+    "solar_panel_2": ("solar_panel_1", "solar_panel_2"),
+    "fairing_1": ("fairing_1", "fairing_2"),
+    "fairing_2": ("fairing_1", "fairing_2"),
+}
+
 
 class RocketStatusManager:
     """ロケットのステータスを管理するくらす"""
@@ -23,63 +81,25 @@ class RocketStatusManager:
         """Initialize the RocketStatusManager class."""
         self.vessel_manager = flight_manager.vessel_manager
         self.flight_manager = flight_manager
+        self.krpc = flight_manager.krpc
+        self.streams = flight_manager.telemetry_manager.streams
+        # get_rocket_statusの呼び出しごとにバッチRPCで取得したユニットの値
+        self.values: dict[str, dict[str, Any]] = {}
+        # 飛行中に変わらない値・まれにしか変わらない値のキャッシュと、変化し続ける値のストリーム（TelemetryManagerと共有する）
+        self.properties = flight_manager.telemetry_manager.properties
         self.units: list[PartUnit] = list(self.vessel_manager.units.values())
         self.flight_dynamics = FlightDynamics(self.vessel_manager.vessel)
         self.flight_info = self.vessel_manager.flight_info
         self.vessel = self.vessel_manager.vessel
-        self.solar_panels_deployed_logged = False
-
-    def active_check(
-        self: RocketStatusManager,
-        unit: PartUnit,
-        msg: str | None = None,
-        custom_cond: bool = True,
-        display_log: str | None = None,
-    ) -> None:
-        """ユニットのステータスをアクティブに設定するメソッド
-
-        指定されたユニットがアクティブ状態であるかを確認し、アクティブである場合にユニットのステータスをACTIVEに設定する
-
-        Args:
-            unit (PartUnit): チェックするユニット
-            msg (str | None): ログに表示するメッセージ（デフォルトはNone）
-            custom_cond (bool): カスタム条件（デフォルトはTrue）
-
-        Returns:
-            None
-        """
-        try:
-            if unit.part and unit.status == GO and custom_cond:
-                unit.status = ACTIVE
-                msg = msg or f"{unit.unit_name.capitalize().replace('_', ' ')} ACTIVE"
-                self.flight_manager.add_event_log(msg, display_log)
-        except Exception:
-            logger.exception("Error in active_check for unit %s", unit.unit_name)
-
-    def cutoff_check(self: RocketStatusManager, unit: PartUnit, msg: str | None = None, display_log: str | None = None) -> None:
-        """ユニットのステータスをカットオフに設定するメソッド
-
-        指定されたユニットがカットオフ状態であるかを確認し、カットオフである場合にユニットのステータスをCUTOFFに設定する
-
-        Args:
-            unit (PartUnit): チェックするユニット
-            msg (str | None): ログに表示するメッセージ（デフォルトはNone）
-
-        Returns:
-            None
-        """
-        try:
-            if not unit.part and unit.status != CUTOFF:
-                unit.status = CUTOFF
-                msg = msg or f"{unit.unit_name.capitalize().replace('_', ' ')} Cutoff."
-                self.flight_manager.add_event_log(msg, display_log)
-        except Exception:
-            logger.exception("Error in cutoff_check for unit %s", unit.unit_name)
 
     @round_output
-    def get_rocket_status(self: RocketStatusManager) -> dict:
+    def get_rocket_status(self: RocketStatusManager, groups: Collection[str] | None = None) -> dict:
         """ロケットのステータスを取得するメソッド
 
+        Args:
+            groups (Collection[str] | None): 取得する出力キー（main_engineなど）。Noneなら全て。
+                同じステージのユニットはまとめて計算するため、指定していないキーが含まれることがある
+
         Returns:
             dict: ロケットの各ステージとコンポーネントのステータスを含む辞書
                 - antenna (dict): アンテナのステータス
@@ -94,6 +114,12 @@ class RocketStatusManager:
                 - second_engine (dict): セカンドエンジンのステータス
                 - second_tank (dict): セカンドタンクのステータス
         """
+        unit_names = None if groups is None else {name for group in groups for name in STATUS_GROUP_UNITS.get(group, ())}
+
+        def selected(unit_name: str) -> bool:
+            return unit_names is None or unit_name in unit_names
+
+        self.values = self.read_unit_values(unit_names)
         status_methods = {
             "antenna": self.get_antenna_status,
             # "solar_panel_1": self.get_solar_panel_status,
@@ -104,42 +130,135 @@ class RocketStatusManager:
             # "fairing_2": self.get_fairing_status,
         }
 
-        result = {name: method(name) for name, method in status_methods.items()}
-        main_stage_status = self.get_main_stage_status()
-        second_stage_status = self.get_second_stage_status()
-        fairing_status = self.get_fairing_status("fairing_1", "fairing_2")
-        solar_panel_status = self.get_solar_panel_status("solar_panel_1", "solar_panel_2")
+        result = {name: method(name) for name, method in status_methods.items() if selected(name)}
+        if selected("main_engine"):
+            result.update(self.get_main_stage_status())
+        if selected("second_engine"):
+            result.update(self.get_second_stage_status())
+        if selected("solar_panel_1"):
+            result.update(self.get_solar_panel_status("solar_panel_1", "solar_panel_2"))
+        if selected("fairing_1"):
+            result.update(self.get_fairing_status("fairing_1", "fairing_2"))
+        return result
+
+    def read_unit_values(self: RocketStatusManager, unit_names: Collection[str] | None = None) -> dict[str, dict[str, Any]]:
+        """ユニットのステータス計算に必要な値を取得するメソッド
+
+        属性ごとに1往復する代わりに、依存関係の段ごとにPartPropertyCacheから取得する。
+        飛行中に変わらない値はパーツごとに1回だけ、変化し続ける値はストリームから読むため、
+        キャッシュが揃った後のRPCは大気圧に応じた比推力の取得と、期限切れのslowの属性の取得だけになる。
+            1. パーツのモジュール（engine、antennaなど）と通信システム
+            2. パーツ・モジュールの属性
+            3. 推進剤・リソースの値
+
+        Args:
+            unit_names (Collection[str] | None): 取得するユニット名。Noneなら全ユニット。通信システムはsatellite_busと一緒に取得する
+
+        Returns:
+            dict[str, dict[str, Any]]: ユニット名（通信システムは"comms"）ごとの属性値の辞書
+        """
+        self.vessel_manager.refresh_part_index()
+        # 切り離された・作り直されたパーツのキャッシュとストリームを破棄する
+        self.properties.sync({unit.unit_name: unit.part for unit in self.units} | {"comms": self.vessel})
+        units = [unit for unit in self.units if unit.part is not None and (unit_names is None or unit.unit_name in unit_names)]
+        read_comms = unit_names is None or "satellite_bus" in unit_names
+        pressure_atm = self.streams.snapshot("vessel")["static_pressure"] / 101325
+
+        values = self.properties.read(self._module_requests(units, read_comms))
+        values.update(self.properties.read(self._attribute_requests(units, values, read_comms, pressure_atm)))
+        values.update(self.properties.read(self._resource_requests(units, values)))
+        return self._group_unit_values(units, values)
+
+    def _module_requests(self: RocketStatusManager, units: list[PartUnit], read_comms: bool) -> dict[str, PropertyCalls]:
+        """1段目: パーツのモジュール（engine、antennaなど）と通信システムを取得する呼び出し"""
+        requests: dict[str, PropertyCalls] = {"comms": {"comms": ("static", (getattr, self.vessel, "comms"))}} if read_comms else {}
+        for unit in units:
+            module = PART_MODULES.get(unit.part_type)
+            if module:
+                requests[unit.unit_name] = {module: ("static", (getattr, unit.part, module))}
+        return requests
+
+    @staticmethod
+    def _attribute_requests(
+        units: list[PartUnit],
+        values: dict[str, Any],
+        read_comms: bool,
+        pressure_atm: float,
+    ) -> dict[str, PropertyCalls]:
+        """2段目: 1段目で取得したモジュールから、パーツ・モジュールの属性を取得する呼び出し"""
+        requests: dict[str, PropertyCalls] = {}
+        if read_comms:
+            comms = values["comms.comms"]
+            requests["comms"] = {attr: (kind, (getattr, comms, attr)) for attr, kind in COMMUNICATION_ATTRIBUTES.items()}
+        for unit in units:
+            module = values.get(f"{unit.unit_name}.{PART_MODULES.get(unit.part_type)}")
+            part_attributes = PART_ATTRIBUTES.get(unit.part_type, {})
+            module_attributes = MODULE_ATTRIBUTES.get(unit.part_type, {})
+            calls: PropertyCalls = {attr: (kind, (getattr, unit.part, attr)) for attr, kind in part_attributes.items()}
+            calls.update({attr: (kind, (getattr, module, attr)) for attr, kind in module_attributes.items()})
+            if module is not None:
+                if unit.part_type == "engine":
+                    calls["specific_impulse_at"] = ("poll", (module.specific_impulse_at, pressure_atm))
+                elif unit.part_type == "tank":
+                    calls["resource_list"] = ("static", (getattr, module, "all"))
+                elif unit.part_type == "satellite_bus":
+                    calls["current_charge"] = ("live", (module.amount, "ElectricCharge"))
+                    calls["max_charge"] = ("static", (module.max, "ElectricCharge"))
+            requests[unit.unit_name] = calls
+        return requests
 
-        return {**result, **main_stage_status, **second_stage_status, **solar_panel_status, **fairing_status}
+    @staticmethod
+    def _resource_requests(units: list[PartUnit], values: dict[str, Any]) -> dict[str, PropertyCalls]:
+        """3段目: 2段目で取得した推進剤・リソースの値を取得する呼び出し"""
+        requests: dict[str, PropertyCalls] = {}
+        for unit in units:
+            name = unit.unit_name
+            calls: PropertyCalls = {}
+            for i, propellant in enumerate(values.get(f"{name}.propellants") or []):
+                calls[f"propellant_{i}"] = ("live", (getattr, propellant, "total_resource_available"))
+            for i, resource in enumerate(values.get(f"{name}.resource_list") or []):
+                calls[f"resource_{i}_name"] = ("static", (getattr, resource, "name"))
+                calls[f"resource_{i}_amount"] = ("live", (getattr, resource, "amount"))
+                calls[f"resource_{i}_max"] = ("static", (getattr, resource, "max"))
+            if calls:
+                requests[name] = calls
+        return requests
+
+    def _group_unit_values(self: RocketStatusManager, units: list[PartUnit], values: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """"ユニット名.属性名"の値をユニットごとの辞書にまとめ、燃料の質量とリソースの一覧を計算する"""
+        unit_values: dict[str, dict[str, Any]] = {unit.unit_name: {} for unit in self.units}
+        for key, value in values.items():
+            name, attr = key.split(".", 1)
+            unit_values.setdefault(name, {})[attr] = value
+        for unit in units:
+            current = unit_values[unit.unit_name]
+            propellants = current.get("propellants") or []
+            current["fuel_mass"] = sum(current.get(f"propellant_{i}") or 0 for i in range(len(propellants)))
+            current["resources"] = [
+                {attr: current.get(f"resource_{i}_{attr}") for attr in ("name", "amount", "max")}
+                for i in range(len(current.get("resource_list") or []))
+            ]
+        return unit_values
 
     @staticmethod
-    def get_status_values(status: int, obj: Any, keys_defaults: dict[str, Any]) -> dict[str, int]:  # noqa: ANN401
+    def get_status_values(status: int, obj: dict[str, Any] | None, keys_defaults: dict[str, Any]) -> dict[str, int]:
         """オブジェクトのステータス値を取得するメソッド
 
         指定されたオブジェクトのキーごとの値を取得し、それらを辞書形式で返す。ステータスがCUTOFFの場合はデフォルト値を返す。
 
         Args:
             status (int): オブジェクトのステータス
-            obj (Any): ステータス値を取得するオブジェクト
+            obj (dict[str, Any] | None): read_unit_valuesで取得したユニットの属性値
             keys_defaults (dict[str, Any]): 各キーのデフォルト値
 
         Returns:
             dict[str, int]: オブジェクトのステータス値を含む辞書
         """
         result = {"status": status}
-        try:
-            for key, default in keys_defaults.items():
-                if status == CUTOFF:
-                    result[key] = default
-                else:
-                    # 例外処理の追加
-                    result[key] = getattr(obj, key, default)
-        except AttributeError:
-            logger.exception("AttributeError:  Setting default value for key '{%s}'", key)
-            result[key] = default
-        except Exception:
-            logger.exception("Unexpected error: Setting default value for key '{%s}'", key)
-            result[key] = default
+        values = obj or {}
+        for key, default in keys_defaults.items():
+            value = values.get(key)
+            result[key] = default if status == CUTOFF or value is None else value
         return result
 
     def get_antenna_status(self: RocketStatusManager, unit_name: str) -> dict:
@@ -158,8 +277,8 @@ class RocketStatusManager:
         keys_defaults = {"power": 0, "packet_interval": 0, "packet_size": 0, "packet_resource_cost": 0}
         unit = self.vessel_manager.get_unit_by_name(unit_name)
 
-        if unit and unit.part and hasattr(unit.part, "antenna"):
-            return self.get_status_values(status=unit.status, obj=unit.part.antenna, keys_defaults=keys_defaults)
+        if unit and unit.part:
+            return self.get_status_values(status=unit.status, obj=self.values.get(unit_name), keys_defaults=keys_defaults)
         return keys_defaults
 
     # def get_solar_panel_status(self: RocketStatusManager, unit_name: str) -> dict:
@@ -198,23 +317,14 @@ class RocketStatusManager:
         """
         results = {}
         keys_defaults = {"energy_flow": 0, "sun_exposure": 0}
-        all_deployed = True
 
         for unit_name in unit_names:
             unit = self.vessel_manager.get_unit_by_name(unit_name)
-            if unit and unit.part and hasattr(unit.part, "solar_panel") and unit.part.solar_panel:
-                self.active_check(unit=unit, custom_cond=unit.part.solar_panel.deployed)
-                results[unit_name] = self.get_status_values(unit.status, unit.part.solar_panel, keys_defaults)
-                if unit.status != ACTIVE:
-                    all_deployed = False
+            values = self.values.get(unit_name, {})
+            if unit and unit.part and values.get("solar_panel") is not None:
+                results[unit_name] = self.get_status_values(unit.status, values, keys_defaults)
             else:
                 results[unit_name] = {"status": CUTOFF, **keys_defaults}
-                all_deployed = False
-
-        if all_deployed and not self.solar_panels_deployed_logged:
-            display_log = "Both solar panels deployed successfully."
-            self.flight_manager.add_event_log(display_log=display_log)
-            self.solar_panels_deployed_logged = True  # ログが追加されたことを記録
 
         return results
 
@@ -233,7 +343,7 @@ class RocketStatusManager:
         unit = self.vessel_manager.get_unit_by_name(unit_name)
         keys_defaults = {"active": False, "available_torque": (0.0, 0.0, 0.0), "max_torque": (0.0, 0.0, 0.0)}
         if unit and unit.part:
-            return self.get_status_values(unit.status, unit.part.reaction_wheel, keys_defaults)
+            return self.get_status_values(unit.status, self.values.get(unit_name), keys_defaults)
         return keys_defaults
 
     def get_communication_status(self: RocketStatusManager) -> dict:
@@ -249,13 +359,13 @@ class RocketStatusManager:
             - signal_delay (float): 信号遅延時間
             - total_comm_power (float): 通信システムの合計電力
         """
-        comm = self.vessel.comms
+        comm = self.values.get("comms", {})
         return {
-            "can_communicate": comm.can_communicate,
-            "can_transmit_science": comm.can_transmit_science,
-            "signal_strength": comm.signal_strength,
-            "signal_delay": comm.signal_delay,
-            "total_comm_power": comm.power,
+            "can_communicate": comm.get("can_communicate"),
+            "can_transmit_science": comm.get("can_transmit_science"),
+            "signal_strength": comm.get("signal_strength"),
+            "signal_delay": comm.get("signal_delay"),
+            "total_comm_power": comm.get("power"),
         }
 
     def get_satellite_bus_status(self: RocketStatusManager, unit_name: str) -> dict:
@@ -274,12 +384,12 @@ class RocketStatusManager:
         unit = self.vessel_manager.get_unit_by_name(unit_name)
 
         if unit is not None and unit.part is not None:
-            self.active_check(unit, "Satellite Bus Active", not unit.part.shielded)
+            values = self.values.get(unit_name, {})
             bus_status = {
                 "status": unit.status,
-                "shielded": unit.part.shielded,
-                "current_charge": unit.part.resources.amount("ElectricCharge"),
-                "max_charge": unit.part.resources.max("ElectricCharge"),
+                "shielded": values.get("shielded"),
+                "current_charge": values.get("current_charge"),
+                "max_charge": values.get("max_charge"),
             }
         else:
             bus_status = {
@@ -333,16 +443,12 @@ class RocketStatusManager:
         """
         results = {}
         keys_defaults = {"dynamic_pressure": 0, "temperature": 0, "max_temperature": 0}
-        is_launching = self.flight_manager.is_launching
 
         for unit_name in unit_names:
             unit = self.vessel_manager.get_unit_by_name(unit_name)
             if unit is not None:
-                self.cutoff_check(unit=unit, msg="Fairing Jettisoned.")
-                if is_launching:
-                    self.active_check(unit=unit, custom_cond=unit.part is not None)
                 if unit.part:
-                    results[unit_name] = self.get_status_values(unit.status, unit.part, keys_defaults)
+                    results[unit_name] = self.get_status_values(unit.status, self.values.get(unit_name), keys_defaults)
                 else:
                     # unitが存在するがpartがNoneの場合
                     results[unit_name] = self.get_status_values(unit.status, None, keys_defaults)
@@ -352,12 +458,11 @@ class RocketStatusManager:
 
         return results
 
-    def get_tank_status(self: RocketStatusManager, part: Part | None, status: int) -> dict[str, Any]:
+    def get_tank_status(self: RocketStatusManager, unit: PartUnit | None) -> dict[str, Any]:
         """タンクのステータスを取得するメソッド
 
         Args:
-            part (Part | None): チェックするタンクパーツ
-            status (int): タンクのステータス
+            unit (PartUnit | None): チェックするタンクユニット
 
         Returns:
             dict[str, Any]: タンクパーツのステータスを含む辞書
@@ -374,30 +479,20 @@ class RocketStatusManager:
                     - max (float): 燃料の最大量
         """
         resource_dict = {
-            "status": status,
+            "status": unit.status if unit else 0,
             "temperature": 0,
             "max_temperature": 0,
             "lqd_oxygen": {"name": "", "amount": 0, "max": 0},
             "fuel": {"name": "", "amount": 0, "max": 0},
         }
 
-        try:
-            if part:
-                resource_dict["temperature"] = getattr(part, "temperature", 0)
-                resource_dict["max_temperature"] = getattr(part, "max_temperature", 0)
-
-                if hasattr(part, "resources") and part.resources:
-                    for resource in part.resources.all:
-                        dict_key = "lqd_oxygen" if resource.name == "LqdOxygen" else "fuel"
-                        resource_dict[dict_key] = {
-                            "name": resource.name,
-                            "amount": resource.amount,
-                            "max": resource.max,
-                        }
-        except AttributeError:
-            logger.exception("AttributeError in get_tank_status for part")
-        except Exception:
-            logger.exception("Unexpected error in get_tank_status")
+        if unit and unit.part:
+            values = self.values.get(unit.unit_name, {})
+            resource_dict["temperature"] = values.get("temperature") or 0
+            resource_dict["max_temperature"] = values.get("max_temperature") or 0
+            for resource in values.get("resources", []):
+                dict_key = "lqd_oxygen" if resource["name"] == "LqdOxygen" else "fuel"
+                resource_dict[dict_key] = resource
 
         return resource_dict
 
@@ -412,25 +507,9 @@ class RocketStatusManager:
         main_engine = self.vessel_manager.get_unit_by_name("main_engine")
         main_tank = self.vessel_manager.get_unit_by_name("main_tank")
 
-        if main_engine and main_engine.part and hasattr(main_engine.part, "engine") and main_engine.part.engine:
-            is_active = main_engine.part.engine.active
-            self.active_check(main_engine, f"{main_engine.unit_name.capitalize().replace('_', ' ')} Ignition", is_active)
-            if main_tank:
-                self.active_check(unit=main_tank, custom_cond=is_active)
-
-        if main_engine:
-            display_log_msg = "MECO main engine cutoff.\n Fairing Jettisoned."
-            self.cutoff_check(main_engine, "MECO main engine cutoff.", display_log=display_log_msg)
-        if main_tank:
-            self.cutoff_check(main_tank)
-
-        start_mass = self.vessel.mass
-        main_engine_status = self.calculate_engine_metrics(
-            main_engine.part if main_engine else None,
-            main_engine.status if main_engine else 0,
-            start_mass,
-        )
-        main_tank_status = self.get_tank_status(main_tank.part if main_tank else None, main_tank.status if main_tank else 0)
+        start_mass = self.streams.snapshot("vessel")["mass"]
+        main_engine_status = self.calculate_engine_metrics(main_engine, start_mass)
+        main_tank_status = self.get_tank_status(main_tank)
 
         return {
             "main_engine": main_engine_status,
@@ -448,37 +527,21 @@ class RocketStatusManager:
         second_engine = self.vessel_manager.get_unit_by_name("second_engine")
         second_tank = self.vessel_manager.get_unit_by_name("second_tank")
 
-        if second_engine and second_engine.part and hasattr(second_engine.part, "engine") and second_engine.part.engine:
-            is_active = second_engine.part.engine.active
-            self.active_check(second_engine, f"{second_engine.unit_name.capitalize().replace('_', ' ')} Ignition", is_active)
-            if second_tank:
-                self.active_check(unit=second_tank, custom_cond=is_active)
-
-        if second_engine:
-            self.cutoff_check(second_engine, "SECO second engine cutoff.", display_log="SECO second engine cutoff.")
-        if second_tank:
-            self.cutoff_check(second_tank)
-
-        start_mass = self.vessel.mass
+        start_mass = self.streams.snapshot("vessel")["mass"]
 
-        second_engine_status = self.calculate_engine_metrics(
-            second_engine.part if second_engine else None,
-            second_engine.status if second_engine else 0,
-            start_mass,
-        )
-        second_tank = self.get_tank_status(second_tank.part if second_tank else None, second_tank.status if second_tank else 0)
+        second_engine_status = self.calculate_engine_metrics(second_engine, start_mass)
+        second_tank = self.get_tank_status(second_tank)
 
         return {
             "second_engine": second_engine_status,
             "second_tank": second_tank,
         }
 
-    def calculate_engine_metrics(self: RocketStatusManager, part: Part | None, status: int, start_mass: float) -> dict:
+    def calculate_engine_metrics(self: RocketStatusManager, unit: PartUnit | None, start_mass: float) -> dict:
         """エンジンのメトリクスを計算するメソッド
 
         Args:
-            part (Part | None): 計算対象のエンジンパーツ
-            status (int): エンジンのステータス
+            unit (PartUnit | None): 計算対象のエンジンユニット
             start_mass (float): エンジンの開始質量
 
         Returns:
@@ -497,17 +560,18 @@ class RocketStatusManager:
                 - temperature (float): 温度
                 - max_temperature (float): 最大温度
         """
-        if part and hasattr(part, "engine") and part.engine:
-            engine = part.engine
-            thrust = engine.thrust
-            max_thrust = engine.max_thrust
-            temperature = part.temperature
-            max_temperature = part.max_temperature
-            available_thrust = engine.available_thrust
-            vac_isp = engine.vacuum_specific_impulse
-            current_pressure_atm = self.flight_info.static_pressure / 101325
-            atom_isp = engine.specific_impulse_at(pressure=current_pressure_atm)
-            fuel_mass = sum(propellant.total_resource_available for propellant in engine.propellants)
+        part = unit.part if unit else None
+        status = unit.status if unit else 0
+        values = self.values.get(unit.unit_name, {}) if unit else {}
+        if part and values.get("engine") is not None:
+            thrust = values.get("thrust") or 0
+            max_thrust = values.get("max_thrust") or 0
+            temperature = values.get("temperature") or 0
+            max_temperature = values.get("max_temperature") or 0
+            available_thrust = values.get("available_thrust") or 0
+            vac_isp = values.get("vacuum_specific_impulse") or 0
+            atom_isp = values.get("specific_impulse_at") or 0
+            fuel_mass = values["fuel_mass"]
         else:
             thrust = 0
             max_thrust = 0
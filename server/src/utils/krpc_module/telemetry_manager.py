@@ -1,32 +1,67 @@
 import logging
 import math
-from typing import TYPE_CHECKING
+from collections.abc import Collection
+from typing import TYPE_CHECKING, Any
 
 from src.utils.decorators.round_output import round_output
 from src.utils.krpc_module.flight_dynamics import FlightDynamics
+from src.utils.krpc_module.part_property_cache import PartPropertyCache
+from src.utils.krpc_module.telemetry_streams import TelemetryStreams
 
 if TYPE_CHECKING:
+    from src.utils.krpc_module.krpc_client import KrpcClient
+    from src.utils.krpc_module.part_property_cache import PropertyCalls, PropertyKind
     from src.utils.krpc_module.vessel_manager import VesselManager
 
 
 logger = logging.getLogger(__name__)
 
+# get_engine_statusで読み込む属性ごとの、読み込み元（パーツ自身かエンジンのモジュールか）・属性名・種類・値がない場合のデフォルト値
+# 種類（static/slow/live/poll）はpart_property_cacheを参照
+# キャッシュはRocketStatusManagerと共有するため、同じ呼び出しはPART_ATTRIBUTES・MODULE_ATTRIBUTESと同じ属性名・種類にする
+ENGINE_ATTRIBUTES: dict[str, tuple[str, str, "PropertyKind", Any]] = {
+    "thrust": ("module", "thrust", "live", 0),
+    "available_thrust": ("module", "available_thrust", "live", 0),
+    "max_thrust": ("module", "max_thrust", "live", 0),
+    "max_vacuum_thrust": ("module", "max_vacuum_thrust", "static", 0),
+    "temperature": ("part", "temperature", "live", 0),
+    "max_temperature": ("part", "max_temperature", "static", 0),
+    "thrust_limit": ("module", "thrust_limit", "slow", 0),
+    "isp": ("module", "isp", "live", 0),
+    "vacuum_specific_impulse": ("module", "vacuum_specific_impulse", "static", 0),
+    "propellant_names": ("module", "propellant_names", "static", []),
+    "propellant_ratios": ("module", "propellant_ratios", "static", {}),
+    "throttle": ("module", "throttle", "live", 0),
+}
+
 
 class TelemetryManager:
     """ロケットのテレメトリ情報を取得するためのクラス"""
 
-    def __init__(self: "TelemetryManager", vessel_manager: "VesselManager") -> None:
+    def __init__(self: "TelemetryManager", vessel_manager: "VesselManager", krpc: "KrpcClient") -> None:
         """Initialize the TelemetryManager class"""
         self.vessel_manager = vessel_manager
+        self.krpc = krpc
         self.orbit = self.vessel_manager.orbit
         self.vessel = self.vessel_manager.vessel
         self.flight_info = self.vessel_manager.flight_info
         self.flight_dynamics = FlightDynamics(self.vessel)
+        self.streams = TelemetryStreams(self.vessel_manager)
+        # パーツの属性のキャッシュ（RocketStatusManager・UnitStateMachineと共有し、同じ属性のストリームを重複して登録しない）
+        self.properties = PartPropertyCache(krpc)
+
+    def close(self: "TelemetryManager") -> None:
+        """登録したストリームを削除し、パーツの属性のキャッシュを破棄する"""
+        self.streams.close()
+        self.properties.close()
 
     @round_output
-    def get_vessel_telemetry(self: "TelemetryManager") -> dict | None:
+    def get_vessel_telemetry(self: "TelemetryManager", groups: Collection[str] | None = None) -> dict | None:
         """宇宙船のテレメトリ情報を返す
 
+        Args:
+            groups (Collection[str] | None): 取得するグループ（surface_infoなど）。Noneなら全て
+
         Returns:
             dict:
             - surface_info (dict): 宇宙船の表面情報
@@ -34,13 +69,14 @@ class TelemetryManager:
             - atmosphere_info (dict): 宇宙船の大気情報
             - delta_v_info (dict): 宇宙船のデルタV情報
         """
+        builders = {
+            "surface_info": self.get_surface_info,
+            "orbit_info": self.get_orbit_info,
+            "atmosphere_info": self.get_atmosphere_info,
+            "delta_v_info": self.get_delta_v_info,
+        }
         try:
-            return {
-                "surface_info": self.get_surface_info(),
-                "orbit_info": self.get_orbit_info(),
-                "atmosphere_info": self.get_atmosphere_info(),
-                "delta_v_info": self.get_delta_v_info(),
-            }
+            return {name: build() for name, build in builders.items() if groups is None or name in groups}
         except Exception:
             logger.exception("Failed to get vessel telemetry.")
 
@@ -59,16 +95,21 @@ class TelemetryManager:
             - terminal_velocity (float): 終端速度
         """
         try:
-            finfo = self.flight_info
+            values = self.streams.snapshot("atmosphere_info")
             return {
-                "angle_of_attack": finfo.angle_of_attack,
-                "sideslip_angle": finfo.sideslip_angle,
-                "mach": finfo.mach,
-                "dynamic_pressure": finfo.dynamic_pressure,
-                "atmosphere_density": finfo.atmosphere_density,
-                "atmospheric_pressure": finfo.static_pressure,
-                "atmospheric_drag": self.flight_dynamics.calculate_atmospheric_drag_acceleration(),
-                "terminal_velocity": finfo.terminal_velocity,
+                "angle_of_attack": values["angle_of_attack"],
+                "sideslip_angle": values["sideslip_angle"],
+                "mach": values["mach"],
+                "dynamic_pressure": values["dynamic_pressure"],
+                "atmosphere_density": values["atmosphere_density"],
+                "atmospheric_pressure": values["atmospheric_pressure"],
+                "atmospheric_drag": self.flight_dynamics.atmospheric_drag_acceleration(
+                    values["atmosphere_density"],
+                    values["speed"],
+                    values["drag_coefficient"],
+                    values["mass"],
+                ),
+                "terminal_velocity": values["terminal_velocity"],
             }
         except Exception:
             logger.exception("Failed to get atmosphere info.")
@@ -92,21 +133,9 @@ class TelemetryManager:
             - prograde (float): 前進方向のベクトル
         """
         try:
-            orbit = self.orbit
-            return {
-                "orbital_speed": orbit.speed,
-                "apoapsis_altitude": orbit.apoapsis_altitude,
-                "periapsis_altitude": orbit.periapsis_altitude,
-                "period": orbit.period,
-                "time_to_apoapsis": orbit.time_to_apoapsis,
-                "time_to_periapsis": orbit.time_to_periapsis,
-                "semi_major_axis": orbit.semi_major_axis,
-                "inclination": math.degrees(orbit.inclination),
-                "eccentricity": orbit.eccentricity,
-                "longitude_of_ascending_node": orbit.longitude_of_ascending_node,
-                "argument_of_periapsis": orbit.argument_of_periapsis,
-                "prograde": self.flight_info.prograde,
-            }
+            values = self.streams.snapshot("orbit_info")
+            values["inclination"] = math.degrees(values["inclination"])
+            return values
         except Exception:
             logger.exception("Failed to get orbit info.")
 
@@ -129,21 +158,9 @@ class TelemetryManager:
             - situation (VesselSituation): 宇宙船の状況
         """
         try:
-            finfo = self.flight_info
-            return {
-                "altitude_als": finfo.mean_altitude,
-                "altitude_true": finfo.surface_altitude,
-                "pitch": finfo.pitch,
-                "heading": finfo.heading,
-                "roll": finfo.roll,
-                "surface_speed": finfo.speed,
-                "vertical_speed": finfo.vertical_speed,
-                "surface_horizontal_speed": finfo.horizontal_speed,
-                "latitude": finfo.latitude,
-                "longitude": finfo.longitude,
-                "biome": self.vessel.biome,
-                "situation": str(self.vessel.situation),
-            }
+            values = self.streams.snapshot("surface_info")
+            values["situation"] = str(values["situation"])
+            return values
         except Exception:
             logger.exception("Failed to get surface info.")
 
@@ -171,29 +188,33 @@ class TelemetryManager:
             - throttle (float): スロットル
         """
         unit = self.vessel_manager.get_unit_by_name(unit_name)
-        engine = None if not unit or not unit.part or not hasattr(unit.part, "engine") or not unit.part.engine else unit.part.engine
-        current_pressure = self.flight_info.static_pressure
+        part = unit.part if unit else None
+        self.properties.sync({unit_name: part})
+        current_pressure = self.streams.snapshot("vessel")["static_pressure"]
         current_pressure_atm = current_pressure / 101325
-        return {
-            "thrust": getattr(engine, "thrust", 0),
-            "available_thrust": getattr(engine, "available_thrust", 0),
-            "max_thrust": getattr(engine, "max_thrust", 0),
-            "max_vacuum_thrust": getattr(engine, "max_vacuum_thrust", 0),
-            "temperature": getattr(engine, "temperature", 0),
-            "max_temperature": getattr(engine, "max_temperature", 0),
-            "thrust_limit": getattr(engine, "thrust_limit", 0),
-            "isp": getattr(engine, "isp", 0),
-            "specific_impulse_at": engine.specific_impulse_at(pressure=current_pressure_atm)
-            if engine and engine.specific_impulse_at
-            else 0,
-            "vacuum_specific_impulse": getattr(engine, "vacuum_specific_impulse", 0),
-            "propellant_mass": sum(propellant.total_resource_available for propellant in engine.propellants)
-            if engine and engine.propellants
-            else 0,
-            "propellant_names": getattr(engine, "propellant_names", []),
-            "propellant_ratios": getattr(engine, "propellant_ratios", {}),
-            "throttle": getattr(engine, "throttle", 0),
+
+        # 飛行中に変わらない値（最大温度・真空比推力・推進剤など）はキャッシュし、変化し続ける値はストリームから読む
+        # 存在しない属性はNoneになりデフォルト値を使う
+        engine = self.properties.read({unit_name: {"engine": ("static", (getattr, part, "engine"))}})[f"{unit_name}.engine"]
+        sources = {"part": part, "module": engine}
+        calls: PropertyCalls = {name: (kind, (getattr, sources[source], name)) for source, name, kind, _ in ENGINE_ATTRIBUTES.values()}
+        calls["propellants"] = ("static", (getattr, engine, "propellants"))
+        if engine is not None:
+            calls["specific_impulse_at"] = ("poll", (engine.specific_impulse_at, current_pressure_atm))
+        values = self.properties.read({unit_name: calls})
+        propellants = values.get(f"{unit_name}.propellants") or []
+        propellant_calls: PropertyCalls = {
+            f"propellant_{i}": ("live", (getattr, propellant, "total_resource_available")) for i, propellant in enumerate(propellants)
         }
+        propellant_totals = self.properties.read({unit_name: propellant_calls})
+
+        status = {}
+        for key, (_, name, _, default) in ENGINE_ATTRIBUTES.items():
+            value = values.get(f"{unit_name}.{name}")
+            status[key] = default if value is None else value
+        status["specific_impulse_at"] = values.get(f"{unit_name}.specific_impulse_at") or 0
+        status["propellant_mass"] = sum(total or 0 for total in propellant_totals.values())
+        return status
 
     # TODO: DRYじゃないのでリファクタリングする
     def calculate_delta_v_info(self: "TelemetryManager", engines: list[dict], stages_start_mass: list[float]) -> dict | None:
@@ -267,7 +288,7 @@ class TelemetryManager:
             main_engine_status = self.get_engine_status("main_engine")
             second_engine_status = self.get_engine_status("second_engine")
 
-            start_mass = self.vessel_manager.vessel.mass
+            start_mass = self.streams.snapshot("vessel")["mass"]
             stages_start_mass = [start_mass, start_mass]
 
             engines = [second_engine_status, main_engine_status]
@@ -0,0 +1,157 @@
+import logging
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from krpc.error import ConnectionError, RPCError
+
+from src.settings.config import TELEMETRY_STREAM_RATE
+from src.utils.krpc_module.krpc_client import STREAM_READS, rpc_caller
+
+if TYPE_CHECKING:
+    from src.utils.krpc_module.vessel_manager import VesselManager
+
+logger = logging.getLogger(__name__)
+
+# セクションごとに必要なフィールドのレジストリ
+# フィールド名 -> (ソースオブジェクト名, 属性名)
+# ソースオブジェクト名は "flight"（機体のFlight）、"orbit"（機体のOrbit）、"vessel"（機体）のいずれか
+STREAM_REGISTRY: dict[str, dict[str, tuple[str, str]]] = {
+    "surface_info": {
+        "altitude_als": ("flight", "mean_altitude"),
+        "altitude_true": ("flight", "surface_altitude"),
+        "pitch": ("flight", "pitch"),
+        "heading": ("flight", "heading"),
+        "roll": ("flight", "roll"),
+        "surface_speed": ("flight", "speed"),
+        "vertical_speed": ("flight", "vertical_speed"),
+        "surface_horizontal_speed": ("flight", "horizontal_speed"),
+        "latitude": ("flight", "latitude"),
+        "longitude": ("flight", "longitude"),
+        "biome": ("vessel", "biome"),
+        "situation": ("vessel", "situation"),
+    },
+    "orbit_info": {
+        "orbital_speed": ("orbit", "speed"),
+        "apoapsis_altitude": ("orbit", "apoapsis_altitude"),
+        "periapsis_altitude": ("orbit", "periapsis_altitude"),
+        "period": ("orbit", "period"),
+        "time_to_apoapsis": ("orbit", "time_to_apoapsis"),
+        "time_to_periapsis": ("orbit", "time_to_periapsis"),
+        "semi_major_axis": ("orbit", "semi_major_axis"),
+        "inclination": ("orbit", "inclination"),
+        "eccentricity": ("orbit", "eccentricity"),
+        "longitude_of_ascending_node": ("orbit", "longitude_of_ascending_node"),
+        "argument_of_periapsis": ("orbit", "argument_of_periapsis"),
+        "prograde": ("flight", "prograde"),
+    },
+    "atmosphere_info": {
+        "angle_of_attack": ("flight", "angle_of_attack"),
+        "sideslip_angle": ("flight", "sideslip_angle"),
+        "mach": ("flight", "mach"),
+        "dynamic_pressure": ("flight", "dynamic_pressure"),
+        "atmosphere_density": ("flight", "atmosphere_density"),
+        "atmospheric_pressure": ("flight", "static_pressure"),
+        "terminal_velocity": ("flight", "terminal_velocity"),
+        "drag_coefficient": ("flight", "drag_coefficient"),
+        "speed": ("flight", "speed"),
+        "mass": ("vessel", "mass"),
+    },
+    "flight_record": {
+        "heading": ("flight", "heading"),
+        "altitude": ("flight", "surface_altitude"),
+        "latitude": ("flight", "latitude"),
+        "longitude": ("flight", "longitude"),
+        "orbital_speed": ("orbit", "speed"),
+        "apoapsis_altitude": ("orbit", "apoapsis_altitude"),
+        "periapsis_altitude": ("orbit", "periapsis_altitude"),
+        "inclination": ("orbit", "inclination"),
+        "eccentricity": ("orbit", "eccentricity"),
+    },
+    "vessel": {
+        "mass": ("vessel", "mass"),
+        "static_pressure": ("flight", "static_pressure"),
+    },
+}
+
+
+class TelemetryStreams:
+    """kRPCストリームでテレメトリ値をキャッシュするクラス
+
+    STREAM_REGISTRYに登録されたフィールドごとに一度だけ`client.add_stream`でストリームを登録する。
+    スナップショットはクライアント側にキャッシュされた最新値を読むだけなので、RPCの往復は発生しない。
+    """
+
+    def __init__(self: "TelemetryStreams", vessel_manager: "VesselManager", rate: float = TELEMETRY_STREAM_RATE) -> None:
+        """Initialize the TelemetryStreams class.
+
+        Args:
+            vessel_manager (VesselManager): ストリームの対象となる機体を保持するVesselManager
+            rate (float): ストリームの更新レート（Hz）。0の場合はゲームの物理フレームごとに更新される
+        """
+        self.client = vessel_manager.client
+        self.rate = rate
+        self.sources: dict[str, Any] = {
+            "flight": vessel_manager.flight_info,
+            "orbit": vessel_manager.orbit,
+            "vessel": vessel_manager.vessel,
+        }
+        # 同じ(ソース, 属性)のストリームはセクション間で共有する
+        self._readers: dict[tuple[str, str], Callable[[], Any]] = {}
+        self._streams: list[Any] = []
+        self.sections: dict[str, dict[str, Callable[[], Any]]] = {
+            section: {field: self._reader(source, attribute) for field, (source, attribute) in fields.items()}
+            for section, fields in STREAM_REGISTRY.items()
+        }
+
+    def _reader(self: "TelemetryStreams", source: str, attribute: str) -> Callable[[], Any]:
+        """指定された属性の値を返す関数を取得する
+
+        ストリームの登録に失敗した属性（MODが必要なdrag_coefficientなど）は従来どおり都度RPCで取得する。
+        """
+        key = (source, attribute)
+        if key in self._readers:
+            return self._readers[key]
+
+        obj = self.sources[source]
+        try:
+            stream = self.client.add_stream(getattr, obj, attribute)
+            if self.rate:
+                stream.rate = self.rate
+            self._streams.append(stream)
+            reader: Callable[[], Any] = stream
+        except (RPCError, AttributeError):
+            logger.warning("Failed to add stream for %s.%s, falling back to polling.", source, attribute)
+
+            def reader() -> Any:  # noqa: ANN401
+                return getattr(obj, attribute)
+
+        self._readers[key] = reader
+        return reader
+
+    def snapshot(self: "TelemetryStreams", section: str) -> dict[str, Any]:
+        """指定されたセクションの全フィールドの最新値を取得する
+
+        Args:
+            section (str): STREAM_REGISTRYのセクション名
+
+        Returns:
+            dict[str, Any]: フィールド名と最新値の辞書
+        """
+        readers = self.sections[section]
+        STREAM_READS.inc(section, rpc_caller(), amount=len(readers))
+        return {field: reader() for field, reader in readers.items()}
+
+    def close(self: "TelemetryStreams") -> None:
+        """登録した全てのストリームを削除する"""
+        for stream in self._streams:
+            self._remove_stream(stream)
+        self._streams.clear()
+        self._readers.clear()
+
+    @staticmethod
+    def _remove_stream(stream: Any) -> None:  # noqa: ANN401
+        """ストリームを削除する（切断済みなどで削除できない場合は警告のみ）"""
+        try:
+            stream.remove()
+        except (RPCError, ConnectionError):
+            logger.warning("Failed to remove stream.")
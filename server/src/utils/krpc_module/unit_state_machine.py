@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING, Any
+
+from src.settings.config import ACTIVE, CUTOFF, GO, UNIT_STATE_POLL_INTERVAL
+from src.utils.krpc_module.rocket_status_manager import PART_MODULES
+
+if TYPE_CHECKING:
+    from src.utils.krpc_module.auto_pilot_manager import FlightManager
+    from src.utils.krpc_module.part_property_cache import PropertyCalls
+    from src.utils.krpc_module.part_unit import PartUnit
+    from src.utils.krpc_module.rocket_status_manager import RocketStatusManager
+
+logger = logging.getLogger(__name__)
+
+# part_typeごとに、ステータス遷移の判定に使う属性と読み込み元（パーツ自身かモジュールか）
+TRANSITION_ATTRIBUTES = {
+    "engine": ("module", "active"),
+    "solar_panel": ("module", "deployed"),
+    "satellite_bus": ("part", "shielded"),
+}
+
+# ステージのエンジンごとに、同時にアクティブにするタンクと、カットオフ時のイベントログのメッセージ・画面に表示するログ
+STAGE_UNITS = {
+    "main_engine": ("main_tank", "MECO main engine cutoff.", "MECO main engine cutoff.\n Fairing Jettisoned."),
+    "second_engine": ("second_tank", "SECO second engine cutoff.", "SECO second engine cutoff."),
+}
+
+
+class UnitStateMachine:
+    """ユニットのステータス遷移（点火・MECO/SECO・フェアリング分離・ソーラーパネル展開など）をイベント駆動で判定するクラス
+
+    遷移の判定に使う値（エンジンのactive、ソーラーパネルのdeployed、サテライトバスのshielded、ステージ番号）をkRPCストリームで購読し、
+    値が更新されたときだけtelemetryレーンのI/Oワーカーで判定してPartUnit.statusとイベントログを更新する。
+    テレメトリを要求するクライアントがいなくても、遷移はストリームの更新レートの遅れで検知される。
+    ストリーム（のコールバック）を登録できなかった値がある場合は、poll_intervalごとの判定も行う。
+    """
+
+    def __init__(self: "UnitStateMachine", flight_manager: "FlightManager", poll_interval: float = UNIT_STATE_POLL_INTERVAL) -> None:
+        """Initialize the UnitStateMachine class.
+
+        Args:
+            flight_manager (FlightManager): ユニットとイベントログを持つFlightManager
+            poll_interval (float): ストリームを購読できない値がある場合に判定する間隔（秒）
+        """
+        self.flight_manager = flight_manager
+        self.poll_interval = poll_interval
+        self.solar_panels_deployed_logged = False
+        self.polling = False
+        self._stage_polling = False
+        self._watched: RocketStatusManager | None = None
+        self._changed = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self: "UnitStateMachine") -> None:
+        """ストリームの購読と判定のタスクを開始する"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self: "UnitStateMachine") -> None:
+        """判定のタスクを停止する（ストリームはRocketStatusManagerのキャッシュと一緒に削除される）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def notify(self: "UnitStateMachine", _value: Any = None) -> None:  # noqa: ANN401
+        """遷移の判定を要求する（ストリームのコールバックとして、kRPCのストリームを受信するスレッドからも呼ばれる）"""
+        if self._loop is None:
+            return
+        with contextlib.suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def run(self: "UnitStateMachine") -> None:
+        """値の更新を待って遷移を判定し続ける"""
+        async_krpc = self.flight_manager.async_krpc
+        while True:
+            self._changed.clear()
+            try:
+                await self.flight_manager.ensure_connection_state()
+                await async_krpc.run(self.update)
+            except Exception:
+                logger.exception("Failed to update unit states")
+            timeout = self.poll_interval if self.polling else None
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._changed.wait(), timeout)
+
+    def update(self: "UnitStateMachine") -> None:
+        """遷移の判定に使う値を読み込み、各ユニットのステータスを更新する（telemetryレーンのI/Oワーカーで実行する）"""
+        status_manager = self.flight_manager.status_manager
+        values = self.read_transition_values(status_manager)
+        self.watch(status_manager)
+        for engine_name in STAGE_UNITS:
+            self.update_stage(engine_name, values)
+        self.update_fairings(("fairing_1", "fairing_2"))
+        self.update_solar_panels(("solar_panel_1", "solar_panel_2"), values)
+        self.update_satellite_bus("satellite_bus", values)
+
+    def read_transition_values(self: "UnitStateMachine", status_manager: "RocketStatusManager") -> dict[str, Any]:
+        """遷移の判定に使う値をRocketStatusManagerのキャッシュから読み込む（ストリームの登録後はRPCを送らない）
+
+        Returns:
+            dict[str, Any]: "ユニット名.属性名"と値の辞書。モジュールは"ユニット名.モジュール名"
+        """
+        vessel_manager = status_manager.vessel_manager
+        vessel_manager.refresh_part_index()
+        properties = status_manager.properties
+        properties.sync({unit.unit_name: unit.part for unit in status_manager.units})
+        units = [unit for unit in status_manager.units if unit.part is not None and unit.part_type in TRANSITION_ATTRIBUTES]
+
+        module_requests: dict[str, PropertyCalls] = {
+            unit.unit_name: {PART_MODULES[unit.part_type]: ("static", (getattr, unit.part, PART_MODULES[unit.part_type]))}
+            for unit in units
+            if TRANSITION_ATTRIBUTES[unit.part_type][0] == "module"
+        }
+        values = properties.read(module_requests)
+        requests: dict[str, PropertyCalls] = {}
+        for unit in units:
+            source, attr = TRANSITION_ATTRIBUTES[unit.part_type]
+            obj = values.get(f"{unit.unit_name}.{PART_MODULES[unit.part_type]}") if source == "module" else unit.part
+            requests[unit.unit_name] = {attr: ("live", (getattr, obj, attr))}
+        values.update(properties.read(requests))
+        return values
+
+    def watch(self: "UnitStateMachine", status_manager: "RocketStatusManager") -> None:
+        """遷移の判定に使う値のストリームにコールバックを登録する
+
+        パーツが切り離されるとキャッシュと一緒にコールバックも削除され、再接続するとRocketStatusManagerが作り直されるため、判定のたびに確認する。
+        """
+        if self._watched is not status_manager:
+            self._stage_polling = not status_manager.vessel_manager.add_stage_callback(self.notify)
+            self._watched = status_manager
+        polling = self._stage_polling
+        for unit in status_manager.units:
+            if unit.part is not None and unit.part_type in TRANSITION_ATTRIBUTES:
+                _, attr = TRANSITION_ATTRIBUTES[unit.part_type]
+                polling |= not status_manager.properties.watch(unit.unit_name, attr, self.notify)
+        self.polling = polling
+
+    def active_check(
+        self: "UnitStateMachine",
+        unit: "PartUnit",
+        msg: str | None = None,
+        custom_cond: bool = True,
+        display_log: str | None = None,
+    ) -> None:
+        """ユニットのステータスをアクティブに設定するメソッド
+
+        指定されたユニットがアクティブ状態であるかを確認し、アクティブである場合にユニットのステータスをACTIVEに設定する
+
+        Args:
+            unit (PartUnit): チェックするユニット
+            msg (str | None): ログに表示するメッセージ（デフォルトはNone）
+            custom_cond (bool): カスタム条件（デフォルトはTrue）
+            display_log (str | None): 画面に表示するログ（デフォルトはNone）
+        """
+        try:
+            if unit.part and unit.status == GO and custom_cond:
+                unit.status = ACTIVE
+                msg = msg or f"{unit.unit_name.capitalize().replace('_', ' ')} ACTIVE"
+                self.flight_manager.add_event_log(msg, display_log)
+        except Exception:
+            logger.exception("Error in active_check for unit %s", unit.unit_name)
+
+    def cutoff_check(self: "UnitStateMachine", unit: "PartUnit", msg: str | None = None, display_log: str | None = None) -> None:
+        """ユニットのステータスをカットオフに設定するメソッド
+
+        指定されたユニットがカットオフ状態であるかを確認し、カットオフである場合にユニットのステータスをCUTOFFに設定する
+
+        Args:
+            unit (PartUnit): チェックするユニット
+            msg (str | None): ログに表示するメッセージ（デフォルトはNone）
+            display_log (str | None): 画面に表示するログ（デフォルトはNone）
+        """
+        try:
+            if not unit.part and unit.status != CUTOFF:
+                unit.status = CUTOFF
+                msg = msg or f"{unit.unit_name.capitalize().replace('_', ' ')} Cutoff."
+                self.flight_manager.add_event_log(msg, display_log)
+        except Exception:
+            logger.exception("Error in cutoff_check for unit %s", unit.unit_name)
+
+    def update_stage(self: "UnitStateMachine", engine_name: str, values: dict[str, Any]) -> None:
+        """ステージのエンジンの点火（タンクも同時にアクティブにする）とカットオフを判定する"""
+        tank_name, cutoff_msg, cutoff_display_log = STAGE_UNITS[engine_name]
+        vessel_manager = self.flight_manager.vessel_manager
+        engine = vessel_manager.get_unit_by_name(engine_name)
+        tank = vessel_manager.get_unit_by_name(tank_name)
+
+        if engine and engine.part and values.get(f"{engine_name}.engine") is not None:
+            is_active = bool(values.get(f"{engine_name}.active"))
+            self.active_check(engine, f"{engine.unit_name.capitalize().replace('_', ' ')} Ignition", is_active)
+            if tank:
+                self.active_check(unit=tank, custom_cond=is_active)
+
+        if engine:
+            self.cutoff_check(engine, cutoff_msg, display_log=cutoff_display_log)
+        if tank:
+            self.cutoff_check(tank)
+
+    def update_fairings(self: "UnitStateMachine", unit_names: tuple[str, ...]) -> None:
+        """フェアリングの分離と、打ち上げ中のアクティブ化を判定する"""
+        is_launching = self.flight_manager.is_launching
+        for unit_name in unit_names:
+            unit = self.flight_manager.vessel_manager.get_unit_by_name(unit_name)
+            if unit is None:
+                continue
+            self.cutoff_check(unit=unit, msg="Fairing Jettisoned.")
+            if is_launching:
+                self.active_check(unit=unit, custom_cond=unit.part is not None)
+
+    def update_solar_panels(self: "UnitStateMachine", unit_names: tuple[str, ...], values: dict[str, Any]) -> None:
+        """ソーラーパネルの展開を判定し、全て展開したら一度だけログを追加する"""
+        all_deployed = True
+        for unit_name in unit_names:
+            unit = self.flight_manager.vessel_manager.get_unit_by_name(unit_name)
+            if unit and unit.part and values.get(f"{unit_name}.solar_panel") is not None:
+                self.active_check(unit=unit, custom_cond=bool(values.get(f"{unit_name}.deployed")))
+                if unit.status != ACTIVE:
+                    all_deployed = False
+            else:
+                all_deployed = False
+
+        if all_deployed and not self.solar_panels_deployed_logged:
+            self.flight_manager.add_event_log(display_log="Both solar panels deployed successfully.")
+            self.solar_panels_deployed_logged = True  # ログが追加されたことを記録
+
+    def update_satellite_bus(self: "UnitStateMachine", unit_name: str, values: dict[str, Any]) -> None:
+        """サテライトバスのシールド（フェアリング内）からの露出を判定する"""
+        unit = self.flight_manager.vessel_manager.get_unit_by_name(unit_name)
+        if unit is not None and unit.part is not None:
+            self.active_check(unit, "Satellite Bus Active", not values.get(f"{unit_name}.shielded"))
@@ -1,19 +1,28 @@
 import logging
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
-from krpc.services import Client
+from krpc.error import ConnectionError, RPCError
 
 from src.utils.krpc_module.part_unit import PartUnit
 
+if TYPE_CHECKING:
+    from krpc.services.spacecenter import Part
+
+    from src.utils.krpc_module.krpc_client import KrpcClient
+
 logger = logging.getLogger(__name__)
 
 
 class VesselManager:
     """ロケットの部品とKRPCのインスタンスを管理するクラス"""
 
-    def __init__(self: "VesselManager", client: Client, rocket_schema_list: list[dict]) -> None:
+    def __init__(self: "VesselManager", krpc: "KrpcClient", rocket_schema_list: list[dict]) -> None:
         """Initialize"""
-        self.client = client
-        if client.space_center is None:
+        self.krpc = krpc
+        self.client = client = krpc.client
+        if client is None or client.space_center is None:
             error_message = "client.space_center is None. Cannot access active_vessel."
             raise ValueError(error_message)
 
@@ -24,11 +33,93 @@ class VesselManager:
         self.reference_frame = self.vessel.orbit.body.reference_frame
         self.flight_info = self.vessel.flight(self.reference_frame)
         self.rocket_schema_list = rocket_schema_list
+        # アクティブな機体の切り替えを検知するストリーム（登録できない場合はNoneで、切り替えは検知しない）
+        self._active_vessel = self._add_stream(client.space_center, "active_vessel")
         self.unit_initiliaze()
 
     def unit_initiliaze(self: "VesselManager") -> None:
         """各PartUnitを初期化する"""
         self.units: dict[str, PartUnit] = {config["tag"]: PartUnit(vessel=self.vessel, config=config) for config in self.rocket_schema_list}
+        self.units_by_name: dict[str, PartUnit] = {unit.unit_name: unit for unit in self.units.values()}
+        self._part_index_lock = threading.Lock()
+        self._stage_signal = self._create_stage_signal()
+        self.rebuild_part_index()
+
+    def _add_stream(self: "VesselManager", obj: Any, attribute: str) -> Callable[[], Any] | None:  # noqa: ANN401
+        """属性のストリームを登録する。登録できない場合はNone"""
+        try:
+            return self.client.add_stream(getattr, obj, attribute)
+        except (RPCError, AttributeError):
+            logger.warning("Failed to add %s stream.", attribute)
+            return None
+
+    def _create_stage_signal(self: "VesselManager") -> Callable[[], int]:
+        """パーツ構成の変化を検知するための現在ステージ番号を返す関数を作成する
+
+        ステージング・切り離しでは必ずステージ番号が変わるため、ストリームでキャッシュした値を比較するだけで変化を検知できる。
+        """
+        stream = self._add_stream(self.vessel.control, "current_stage")
+        if stream is not None:
+            return stream
+        logger.warning("Falling back to polling current_stage.")
+        return lambda: self.vessel.control.current_stage
+
+    def active_vessel_changed(self: "VesselManager") -> bool:
+        """アクティブな機体がこのVesselManagerの機体から切り替わったか（ストリームのキャッシュを比較するだけでRPCは送らない）
+
+        切り替わった場合、機体に紐づくストリーム・タグインデックスは全て古くなるため、VesselManagerごと作り直す。
+        """
+        return self._active_vessel is not None and self._active_vessel() != self.vessel
+
+    def rebuild_part_index(self: "VesselManager") -> None:
+        """タグとパーツの対応（タグインデックス）を作り直し、各PartUnitに反映する
+
+        全パーツの一覧を1回で取得し、全パーツのtagを1回のバッチリクエストで読み込んでローカルで対応付ける（タグの数によらず2往復）。
+        同じタグのパーツが複数ある場合は、パーツの一覧で最初のパーツを使う。
+        """
+        with self._part_index_lock:
+            self.last_stage = self._stage_signal()
+            parts = self.vessel.parts.all
+            tags = self.krpc.batch_read({str(index): (getattr, part, "tag") for index, part in enumerate(parts)})
+            parts_by_tag: dict[str, Part] = {}
+            for index, part in enumerate(parts):
+                parts_by_tag.setdefault(tags[str(index)], part)
+            self.part_index = {tag: parts_by_tag[tag] for tag in self.units if tag in parts_by_tag}
+            for tag, unit in self.units.items():
+                unit.update(self.part_index.get(tag))
+            logger.info("Part index rebuilt at stage %s (%s/%s units found).", self.last_stage, len(self.part_index), len(self.units))
+
+    def invalidate_part_index(self: "VesselManager") -> None:
+        """タグインデックスを無効化し、次の参照時に作り直す"""
+        self.last_stage = None
+
+    def refresh_part_index(self: "VesselManager") -> None:
+        """ステージ番号が変わっていればタグインデックスを作り直す"""
+        if self._stage_signal() != self.last_stage:
+            self.rebuild_part_index()
+
+    def add_stage_callback(self: "VesselManager", callback: Callable[[int], None]) -> bool:
+        """ステージ番号が変わったときに呼ばれるコールバックを登録する（kRPCのストリームを受信するスレッドで呼ばれる）
+
+        Returns:
+            bool: 登録できた場合はTrue。ストリームを登録できずにポーリングしている場合はFalse
+        """
+        add_callback = getattr(self._stage_signal, "add_callback", None)
+        if add_callback is None:
+            return False
+        add_callback(callback)
+        return True
+
+    def close(self: "VesselManager") -> None:
+        """ステージ番号とアクティブな機体のストリームを削除する"""
+        for stream in (self._stage_signal, self._active_vessel):
+            remove = getattr(stream, "remove", None)
+            if remove is None:
+                continue
+            try:
+                remove()
+            except (RPCError, ConnectionError):
+                logger.warning("Failed to remove vessel stream.")
 
     def set_all_units_status(self: "VesselManager", status: int) -> None:
         """全てのPartUnitのステータスを更新する
@@ -70,8 +161,5 @@ class VesselManager:
         Returns:
             PartUnit|None: 一致するPartUnit、またはNone
         """
-        for unit in self.units.values():
-            if unit.unit_name == unit_name:
-                unit.update()
-                return unit
-        return None
+        self.refresh_part_index()
+        return self.units_by_name.get(unit_name)
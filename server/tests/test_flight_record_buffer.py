@@ -0,0 +1,83 @@
+import time
+from pathlib import Path
+
+from src.utils.commons.event_timeline import EventTimeline
+from src.utils.commons.flight_record_buffer import FlightRecordBuffer
+from src.utils.commons.flight_record_store import FlightRecordStore
+
+
+def event_record(time: str, launch_relative_time: int, event: str) -> dict:
+    """テスト用のイベントレコードを作成する"""
+    return {"time": time, "launch_relative_time": launch_relative_time, "event": event}
+
+
+def restart(database_url: str, records: list[dict]) -> tuple[FlightRecordBuffer, FlightRecordStore]:
+    """FlightManagerの起動時と同じ手順で、ストアのイベントと既存のレコードを読み込んだバッファを作成する"""
+    store = FlightRecordStore(database_url)
+    stored_events = store.range()
+    buffer = FlightRecordBuffer(100, EventTimeline(store))
+    buffer.restore(sorted([*records, *stored_events], key=lambda record: record["time"]), stored_events)
+    return buffer, store
+
+
+def wait_for_stored(store: FlightRecordStore, count: int) -> list[dict]:
+    """タイムラインの書き込みスレッドがイベントを保存するまで待つ"""
+    deadline = time.monotonic() + 5
+    while len(records := store.range()) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return records
+
+
+def test_append_event_after_restart_does_not_collide_with_stored_events(tmp_path: Path) -> None:
+    """保存済みのイベントがあるストアで再起動した後に追加したイベントが、既存のイベントと重複せずに保存される"""
+    database_url = f"sqlite:///{tmp_path / 'flight_record.db'}"
+    store = FlightRecordStore(database_url)
+    store.insert_many([
+        {**event_record("00:00:01", -10, "ignition"), "sequence": 2},
+        {**event_record("00:00:11", 0, "liftoff"), "sequence": 5},
+    ])
+    store.engine.dispose()
+
+    # 飛行記録（イベント以外）は再起動のたびに1から振り直されるため、保存済みのイベントの番号と重なる
+    snapshots = [{"time": f"00:00:0{i}", "launch_relative_time": i - 11} for i in range(3)]
+    buffer, store = restart(database_url, snapshots)
+
+    sequence = buffer.append(event_record("00:01:00", 49, "meco"))
+
+    stored = wait_for_stored(store, 3)
+    assert [record["event"] for record in stored] == ["ignition", "liftoff", "meco"]
+    assert [record["sequence"] for record in stored] == [record["sequence"] for record in buffer.timeline.range()]
+    assert sequence > 5
+    assert store.find("sequence", sequence)[0]["event"] == "meco"
+
+    # 付け直した番号でストアのイベントを更新・検索できる
+    liftoff = buffer.timeline.range(0, 0)[0]
+    assert store.update("sequence", liftoff["sequence"], {"note": "nominal"}) == 1
+    assert store.find("sequence", liftoff["sequence"])[0] == {**liftoff, "note": "nominal"}
+
+    # 2回目の再起動でも番号が重複しない
+    store.engine.dispose()
+    buffer, store = restart(database_url, snapshots)
+    assert buffer.append(event_record("00:02:00", 109, "seco")) > sequence
+    assert [record["sequence"] for record in wait_for_stored(store, 4)] == [record["sequence"] for record in buffer.timeline.range()]
+
+
+def test_display_log_record_is_kept_after_restart(tmp_path: Path) -> None:
+    """画面表示用のログだけのレコード（リフトオフ・最大動圧など）も保存され、再起動後の飛行記録に残る"""
+    database_url = f"sqlite:///{tmp_path / 'flight_record.db'}"
+    buffer, store = restart(database_url, [])
+    buffer.append(event_record("00:00:01", -10, "ignition"))
+    sequence = buffer.append({"time": "00:00:11", "launch_relative_time": 0, "display_log": "Liftoff!"})
+
+    # closeは書き込み待ちのレコードを保存し終えてから戻る
+    buffer.timeline.close()
+    assert [record["sequence"] for record in store.range()] == [1, sequence]
+    # タイムライン（イベントの一覧）にはイベントを含むレコードだけが載る
+    assert [record["event"] for record in buffer.timeline.range()] == ["ignition"]
+
+    store.engine.dispose()
+    buffer, store = restart(database_url, [])
+    records, events, _ = buffer.snapshot_since(0)
+    assert [record.get("display_log") for record in records] == [None, "Liftoff!"]
+    assert [record["event"] for record in events] == ["ignition"]
+    assert buffer.append(event_record("00:01:00", 49, "meco")) > sequence
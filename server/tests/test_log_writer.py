@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from src.utils.commons.log_writer import LogWriter
+
+
+def test_close_writes_pending_data_and_rotates_with_header(tmp_path: Path) -> None:
+    """closeで書き込み待ちのバイト列を書き込み、上限を超えたファイルは切り替えて新しいファイルにもヘッダーを書き込む"""
+    path = tmp_path / "flight.bin"
+    # 1件ずつ書き込み・closeして、既存のファイルへの追記と書き込みの境界でのファイルの切り替えを確認する
+    for i in range(5):
+        writer = LogWriter(path, header=b"HEAD", max_bytes=4 + 8 * 3)
+        writer.write(i.to_bytes(8, "little"))
+        writer.close()
+
+    rotated = (tmp_path / "flight.bin.1").read_bytes()
+    current = path.read_bytes()
+    assert rotated == b"HEAD" + b"".join(i.to_bytes(8, "little") for i in range(3))
+    assert current == b"HEAD" + b"".join(i.to_bytes(8, "little") for i in range(3, 5))